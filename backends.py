@@ -0,0 +1,147 @@
+#Model backends used by the extraction scripts.
+#A backend has a model_name and generate_content(prompt, stream=False), the same interface as genai.GenerativeModel.
+#GeminiBackend calls the real API, ReplayBackend serves recorded responses offline with configurable
+#latency, jitter and error injection, so the pipeline can be load-tested without an API key.
+#
+#Select with environment variables:
+#   AUTOLAB_BACKEND=gemini (default) or replay
+#   AUTOLAB_REPLAY_LATENCY, AUTOLAB_REPLAY_JITTER (seconds), AUTOLAB_REPLAY_ERROR_RATE (0..1)
+
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DIMENSION_RECORDINGS = [
+    "dimensions_and_entities.json",
+    "dimensions_and_entities_prompt2.json",
+    "extracted_dimensions_prompt2.json",
+]
+GEOMETRY_RECORDINGS = ["fifthTask.json", "sixthTask2.json"]
+# A recording given as a tuple of files is served as one response with their keys merged
+COMBINED_RECORDINGS = [
+    ("dimensions_and_entities.json", "fifthTask.json"),
+    ("dimensions_and_entities_prompt2.json", "sixthTask2.json"),
+]
+
+
+class GeminiBackend:
+    def __init__(self, model_name: str):
+        # Same form as genai.GenerativeModel.model_name, so existing cache entries still match
+        self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    # Configured on first use, so importing a script does not need the API key
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+
+                load_dotenv()
+                api_key = os.environ.get("gemini_api_key")
+                if not api_key:
+                    raise RuntimeError("The 'gemini_api_key' environment variable is not set. "
+                                       "Please check your .env file or environment variables.")
+                genai.configure(api_key=api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        return self._get_model().generate_content(prompt, stream=stream, **kwargs)
+
+
+class ReplayBackend:
+    def __init__(self, recordings: list, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: int = None, model_name: str = "replay", chunk_size: int = 64):
+        self.model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.errors = 0
+        self._responses = [_load_recording(path) for path in recordings]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            text = self._responses[self.calls % len(self._responses)]
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return text, delay, fail
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        text, delay, fail = self._next()
+        usage = _estimate_usage(prompt, text)
+        if not stream:
+            time.sleep(delay)
+            if fail:
+                _raise_injected_error(self._random)
+            return SimpleNamespace(text=text, usage_metadata=usage)
+        return self._stream(text, delay, fail, usage)
+
+    # The latency is spread over the chunks, like a real stream that takes a while to generate
+    def _stream(self, text: str, delay: float, fail: bool, usage):
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        for i, chunk in enumerate(chunks):
+            time.sleep(delay / len(chunks))
+            if fail and i == len(chunks) // 2:
+                _raise_injected_error(self._random)
+            yield SimpleNamespace(text=chunk, usage_metadata=usage)
+
+
+def _load_recording(path) -> str:
+    data = {}
+    for part in (path if isinstance(path, (list, tuple)) else [path]):
+        if not os.path.isabs(part):
+            part = os.path.join(REPO_DIR, part)
+        with open(part, "r") as f:
+            data.update(json.load(f))
+    # Wrapped the way the model usually answers
+    return "```json\n" + json.dumps(data, indent=4) + "\n```"
+
+
+# Rough token counts (about 4 characters per token, images count as a fixed 258 like Gemini does)
+def _estimate_usage(prompt, text: str):
+    parts = prompt if isinstance(prompt, (list, tuple)) else [prompt]
+    prompt_tokens = sum(len(part) // 4 if isinstance(part, str) else 258 for part in parts)
+    response_tokens = len(text) // 4
+    return SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=response_tokens,
+                           total_token_count=prompt_tokens + response_tokens)
+
+
+# Injected errors use the same exception types the real API raises for quota and server errors
+def _raise_injected_error(rng: random.Random):
+    from google.api_core import exceptions
+
+    if rng.random() < 0.5:
+        raise exceptions.ResourceExhausted("Resource has been exhausted (injected by ReplayBackend)")
+    raise exceptions.ServiceUnavailable("The service is currently unavailable (injected by ReplayBackend)")
+
+
+# Backend for a script, chosen by AUTOLAB_BACKEND. recordings are the files the replay backend serves.
+def create_backend(model_name: str, recordings: list):
+    load_dotenv()
+    kind = os.environ.get("AUTOLAB_BACKEND", "gemini").lower()
+    if kind == "gemini":
+        return GeminiBackend(model_name)
+    if kind == "replay":
+        return ReplayBackend(
+            recordings,
+            latency=float(os.environ.get("AUTOLAB_REPLAY_LATENCY", "0")),
+            jitter=float(os.environ.get("AUTOLAB_REPLAY_JITTER", "0")),
+            error_rate=float(os.environ.get("AUTOLAB_REPLAY_ERROR_RATE", "0")),
+            model_name=f"replay:{model_name}",
+        )
+    raise ValueError(f"Unknown AUTOLAB_BACKEND '{kind}', expected 'gemini' or 'replay'")
@@ -0,0 +1,99 @@
+#Runs an extraction function over many images with a bounded pool of worker threads.
+#The model calls are mostly network wait, so threads are enough to keep several requests in flight.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from entity_binary import recording_outputs
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+
+@dataclass
+class ImageResult:
+    image_path: str
+    output_filename: str
+    data: Optional[dict] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def list_images(image_directory: str) -> list:
+    return sorted(
+        os.path.join(image_directory, f)
+        for f in os.listdir(image_directory)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def _run_one(extract_fn: Callable, image_path: str, output_filename: str, job_store=None) -> ImageResult:
+    result = ImageResult(image_path, output_filename)
+    if job_store is not None:
+        job_store.start(image_path)
+    start = time.perf_counter()
+    with recording_outputs() as written:
+        try:
+            result.data = extract_fn(image_path, output_filename)
+            if result.data is None:
+                result.error = "Extraction returned no data, see the log above"
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - start
+    if job_store is not None:
+        # Extractors that write their JSON themselves (secondTask) do not go through write_output
+        job_store.finish(image_path, written or [output_filename], result.error, result.seconds)
+    return result
+
+
+# Calls extract_fn(image_path, output_filename) for every image with at most max_in_flight calls running at once.
+# extract_fn should return the extracted data, or None on failure. Results come back in input order.
+# With a job_store (see job_store.py) progress is recorded, and images it already has as done are skipped.
+def run_batch(image_paths: list, extract_fn: Callable, output_for: Callable, max_in_flight: int = 4,
+              job_store=None) -> list:
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+
+    if job_store is not None:
+        job_store.add(image_paths)
+        todo = job_store.todo(image_paths)
+        # todo also has the done images whose output files are gone, so the skipped ones are those still in place
+        print(f"Job store {job_store.path}: skipping {len(image_paths) - len(todo)} images (done with their outputs "
+              f"in place, or failed), {len(todo)} to run")
+        image_paths = todo
+
+    results = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        futures = {
+            pool.submit(_run_one, extract_fn, path, output_for(path), job_store): i
+            for i, path in enumerate(image_paths)
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            status = "ok" if result.ok else f"FAILED ({result.error})"
+            print(f"[{len(results)}/{len(futures)}] {result.image_path}: {status} in {result.seconds:.2f}s")
+    elapsed = time.perf_counter() - start
+
+    ordered = [results[i] for i in range(len(image_paths))]
+    print_summary(ordered, elapsed)
+    return ordered
+
+
+def print_summary(results: list, elapsed: float):
+    failed = [r for r in results if not r.ok]
+    per_image = sum(r.seconds for r in results) / len(results) if results else 0.0
+    throughput = len(results) / elapsed if elapsed > 0 else 0.0
+
+    print("\n--- Batch Summary ---")
+    print(f"Images: {len(results)}  Succeeded: {len(results) - len(failed)}  Failed: {len(failed)}")
+    print(f"Wall time: {elapsed:.2f}s  Throughput: {throughput:.2f} images/s  Mean latency: {per_image:.2f}s")
+    for r in failed:
+        print(f"  {r.image_path}: {r.error}")
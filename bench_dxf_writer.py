@@ -0,0 +1,71 @@
+#Compares write time and file size of the ezdxf path (ezdxf.new(setup=True) + saveas) with fast_dxf.
+#Run: python bench_dxf_writer.py [entity counts...]
+
+import os
+import sys
+import tempfile
+import time
+
+import ezdxf
+import numpy as np
+
+from contours import add_polylines, chain_contours
+from entity_store import EntityStore
+from fast_dxf import write_fast_dxf
+
+
+# Random mix of lines, circles and arcs plus closed square profiles for the polyline path
+def synthetic_store(n: int, seed: int = 0) -> EntityStore:
+    rng = np.random.default_rng(seed)
+    entities = []
+    for _ in range(n // 4):
+        x, y = rng.uniform(0, 1000, 2).tolist()
+        entities.append({"type": "LINE", "params": {"start_point": [x, y], "end_point": [x + 10, y + 5]}})
+        entities.append({"type": "CIRCLE", "params": {"center": [x, y], "radius": 3.0}})
+        entities.append({"type": "ARC", "params": {"center": [x, y], "radius": 6.0, "start_angle": 30.0,
+                                                   "end_angle": 150.0}})
+        entities.append({"type": "LINE", "params": {"start_point": [x, y], "end_point": [x, y + 20]}})
+    return EntityStore.from_json({"entities": entities})
+
+
+def write_ezdxf(store: EntityStore, polylines: list, path: str):
+    doc = ezdxf.new(setup=True)
+    msp = doc.modelspace()
+    add_polylines(msp, polylines)
+    store.add_to_modelspace(msp)
+    doc.saveas(path)
+
+
+def time_writer(write, store: EntityStore, polylines: list, path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        write(store, polylines, path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(counts: list):
+    print(f"{'entities':>9} {'writer':>6} {'seconds':>9} {'bytes':>11} {'entities/s':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in counts:
+            # chain_contours takes the chained segments out of the store, so both writers get the polylines plus
+            # the segments left over, the same output the scripts write
+            store = synthetic_store(n)
+            polylines = chain_contours(store)
+            repeat = 3 if n <= 10000 else 1
+            total = len(store) + len(polylines)
+            fast = lambda store, polylines, path: write_fast_dxf(store, path, polylines)
+            for name, write in (("ezdxf", write_ezdxf), ("fast", fast)):
+                path = os.path.join(tmp, f"{name}_{n}.dxf")
+                seconds = time_writer(write, store, polylines, path, repeat)
+                size = os.path.getsize(path)
+                print(f"{total:>9} {name:>6} {seconds:>9.4f} {size:>11} {total / seconds:>11.0f}")
+
+            # The fast output must load back with the same number of entities
+            loaded = ezdxf.readfile(os.path.join(tmp, f"fast_{n}.dxf"))
+            assert len(loaded.modelspace()) == total
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10, 1000, 10000, 100000])
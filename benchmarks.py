@@ -0,0 +1,179 @@
+#End-to-end benchmark of everything that happens after the model returns: JSON extraction from the raw
+#response text, geometry cleanup, json_to_dxf, doc.saveas and the ezdxf drawing Frontend render.
+#Cleanup is timed on its own; json_to_dxf and build_doc are timed without it, so a regression in one shows up
+#in its own stage.
+#The entity sets are the recorded responses in the repo, tiled side by side up to 1k, 10k and 100k entities.
+#Results are written as JSON so two runs (e.g. before and after a change) can be compared:
+#   python benchmarks.py [--sizes 1000 10000] [--output results.json] [--compare baseline.json]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import ezdxf
+import numpy as np
+
+from dxf_preview import render_doc
+from entity_store import EntityStore
+from geometry_cleanup import clean_geometry
+from dxf_writer import build_doc, json_to_dxf, prepare_store
+from sixthTask2 import parse_response
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+RECORDINGS = ["fifthTask.json", "sixthTask2.json"]
+STAGES = ["extract_json", "clean_geometry", "json_to_dxf", "build_doc", "saveas", "render"]
+# A stage counts as a regression when its median is this much slower than the baseline
+REGRESSION_RATIO = 1.2
+
+
+def load_recordings(paths: list = RECORDINGS) -> list:
+    entities = []
+    for path in paths:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), path), "r") as f:
+            entities.extend(json.load(f).get("entities", []))
+    return entities
+
+
+def _shifted(entity: dict, dx: float, dy: float) -> dict:
+    params = dict(entity.get("params", {}))
+    for key in ("start_point", "end_point", "center"):
+        if key in params:
+            params[key] = [params[key][0] + dx, params[key][1] + dy]
+    return {"type": entity.get("type"), "params": params}
+
+
+# The recorded drawings repeated on a grid until there are n entities
+def scaled_entities(entities: list, n: int) -> dict:
+    store = EntityStore.from_json({"entities": entities})
+    bbox = store.bbox() or (0.0, 0.0, 1.0, 1.0)
+    pitch_x = (bbox[2] - bbox[0]) * 1.2 + 1.0
+    pitch_y = (bbox[3] - bbox[1]) * 1.2 + 1.0
+    copies = -(-n // len(entities))
+    columns = max(1, int(np.ceil(np.sqrt(copies))))
+
+    out = []
+    for copy in range(copies):
+        dx, dy = (copy % columns) * pitch_x, (copy // columns) * pitch_y
+        out.extend(_shifted(entity, dx, dy) for entity in entities)
+    return {"entities": out[:n]}
+
+
+def _time(fn, repeat: int) -> list:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _build_doc(data: dict, clean: bool = True):
+    return build_doc(prepare_store(data, clean))
+
+
+# Times every stage for one entity count, returns {stage: {"median": s, "min": s, "runs": [...]}}
+def bench_size(entities: list, n: int, directory: str, repeat: int) -> dict:
+    data = scaled_entities(entities, n)
+    raw_text = "```json\n" + json.dumps(data, indent=4) + "\n```"
+    dxf_path = os.path.join(directory, f"bench_{n}.dxf")
+    png_path = os.path.join(directory, f"bench_{n}.png")
+    doc = _build_doc(data)
+    # clean_geometry works in place, so every run gets its own copy of the parsed store
+    store = EntityStore.from_json(data)
+    store.drop_invalid()
+    copies = iter([store.copy() for _ in range(repeat)])
+
+    runs = {}
+    # json_to_dxf reports what it did with print, which would drown the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        runs["extract_json"] = _time(lambda: parse_response(raw_text), repeat)
+        runs["clean_geometry"] = _time(lambda: clean_geometry(next(copies)), repeat)
+        runs["json_to_dxf"] = _time(lambda: json_to_dxf(data, dxf_path, clean=False), repeat)
+        runs["build_doc"] = _time(lambda: _build_doc(data, clean=False), repeat)
+        runs["saveas"] = _time(lambda: doc.saveas(dxf_path), repeat)
+        runs["render"] = _time(lambda: render_doc(doc, png_path), repeat)
+
+    return {
+        stage: {"median": statistics.median(times), "min": min(times), "runs": times}
+        for stage, times in runs.items()
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_benchmarks(sizes: list = DEFAULT_SIZES, repeat: int = None) -> dict:
+    entities = load_recordings()
+    results = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "ezdxf": ezdxf.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            # Large sets take long enough per run that one run is already stable
+            runs = repeat or (5 if n <= 10000 else 1)
+            results["sizes"][str(n)] = bench_size(entities, n, tmp, runs)
+            print_size(n, results["sizes"][str(n)])
+    return results
+
+
+def print_size(n: int, stages: dict):
+    print(f"\n{n} entities")
+    for stage in STAGES:
+        median = stages[stage]["median"]
+        print(f"  {stage:<14} {median * 1000:>10.2f} ms  {n / median:>12.0f} entities/s")
+
+
+# Prints the median of every stage against a baseline result file, returns the regressed (size, stage) pairs
+def compare(results: dict, baseline: dict, ratio: float = REGRESSION_RATIO) -> list:
+    regressions = []
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'}:")
+    for size, stages in results["sizes"].items():
+        for stage, timing in stages.items():
+            old = baseline.get("sizes", {}).get(size, {}).get(stage)
+            if old is None:
+                continue
+            change = timing["median"] / old["median"]
+            flag = ""
+            if change > ratio:
+                regressions.append((size, stage))
+                flag = "  REGRESSION"
+            print(f"  {size:>7} {stage:<14} {old['median'] * 1000:>10.2f} -> {timing['median'] * 1000:>10.2f} ms"
+                  f"  x{change:.2f}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JSON extraction, DXF conversion and rendering")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="earlier result file to check for regressions")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            if compare(results, json.load(f)):
+                sys.exit(1)
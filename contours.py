@@ -0,0 +1,121 @@
+#Joins LINE and ARC segments that share endpoints into LWPOLYLINE profiles.
+#Arcs become polyline segments with a bulge value, so a closed outline of many segments is written as one entity.
+
+import math
+
+import numpy as np
+
+from entity_store import EntityStore
+from geometry_cleanup import DEFAULT_TOLERANCE, close_pairs, connected_components
+
+
+# Removes every chain of two or more connected segments from the store and returns them as
+# LWPOLYLINE entities: {"type": "LWPOLYLINE", "params": {"points": [[x, y, bulge], ...], "closed": bool}}
+def chain_contours(store: EntityStore, tol: float = DEFAULT_TOLERANCE) -> list:
+    lines, arcs = store.lines, store.arcs
+    n_lines = len(lines)
+    n_segments = n_lines + len(arcs)
+    if n_segments < 2:
+        return []
+
+    start_angle = np.radians(arcs["start_angle"])
+    end_angle = np.radians(arcs["end_angle"])
+    radius = arcs["radius"][:, None]
+    arc_start = arcs["center"] + radius * np.column_stack([np.cos(start_angle), np.sin(start_angle)])
+    arc_end = arcs["center"] + radius * np.column_stack([np.cos(end_angle), np.sin(end_angle)])
+
+    # Arcs run anti clockwise, the bulge is the tangent of a quarter of the included angle
+    sweep = np.mod(arcs["end_angle"] - arcs["start_angle"], 360.0)
+    bulges = np.concatenate([np.zeros(n_lines), np.tan(np.radians(sweep) / 4.0)])
+
+    starts = np.concatenate([lines["start"], arc_start])
+    ends = np.concatenate([lines["end"], arc_end])
+
+    # Endpoints closer than tol are the same node of the graph
+    points = np.concatenate([starts, ends])
+    pairs = close_pairs(points / tol)
+    pairs = pairs[np.hypot(*(points[pairs[:, 0]] - points[pairs[:, 1]]).T) <= tol]
+    nodes = connected_components(len(points), pairs)
+    start_node = nodes[:n_segments].tolist()
+    end_node = nodes[n_segments:].tolist()
+
+    adjacency = {}
+    for segment in range(n_segments):
+        adjacency.setdefault(start_node[segment], []).append(segment)
+        adjacency.setdefault(end_node[segment], []).append(segment)
+
+    used = [False] * n_segments
+    chains = []
+
+    # Open chains start at nodes where the profile ends or branches, what is left afterwards are closed loops
+    for node, segments in adjacency.items():
+        if len(segments) == 2:
+            continue
+        for segment in segments:
+            if not used[segment]:
+                chains.append(_walk(segment, node, adjacency, start_node, end_node, used))
+    for segment in range(n_segments):
+        if not used[segment]:
+            chains.append(_walk(segment, start_node[segment], adjacency, start_node, end_node, used))
+
+    polylines = []
+    chained = np.zeros(n_segments, dtype=bool)
+    for chain, closed in chains:
+        if len(chain) < 2:
+            continue
+        polyline = []
+        for segment, forward in chain:
+            x, y = (starts if forward else ends)[segment].tolist()
+            polyline.append([x, y, float(bulges[segment]) if forward else -float(bulges[segment])])
+            chained[segment] = True
+        if not closed:
+            last, forward = chain[-1]
+            x, y = (ends if forward else starts)[last].tolist()
+            polyline.append([x, y, 0.0])
+        polylines.append({"type": "LWPOLYLINE", "params": {"points": polyline, "closed": closed}})
+
+    store.lines = lines[~chained[:n_lines]]
+    store.arcs = arcs[~chained[n_lines:]]
+    return polylines
+
+
+# Follows connected segments from first_segment, leaving it through the end not at from_node.
+# Only continues through nodes with exactly two segments, so branches end a chain.
+def _walk(first_segment: int, from_node: int, adjacency: dict, start_node: list, end_node: list, used: list):
+    chain = []
+    segment, node = first_segment, from_node
+    closed = False
+    while True:
+        used[segment] = True
+        forward = start_node[segment] == node
+        chain.append((segment, forward))
+        node = end_node[segment] if forward else start_node[segment]
+
+        segments = adjacency[node]
+        if len(segments) != 2:
+            break
+        segment = segments[0] if segments[1] == segment else segments[1]
+        if used[segment]:
+            closed = node == from_node
+            break
+    return chain, closed
+
+
+# Signed area enclosed by a closed polyline, including the circular segments added by bulges
+def polyline_area(points: list) -> float:
+    area = 0.0
+    for i, (x1, y1, bulge) in enumerate(points):
+        x2, y2 = points[(i + 1) % len(points)][:2]
+        area += (x1 * y2 - x2 * y1) / 2.0
+        if bulge:
+            chord = math.hypot(x2 - x1, y2 - y1)
+            angle = 4.0 * math.atan(bulge)
+            radius = chord / (2.0 * math.sin(angle / 2.0))
+            area += radius * radius * (angle - math.sin(angle)) / 2.0
+    return area
+
+
+def add_polylines(msp, polylines: list):
+    for polyline in polylines:
+        params = polyline["params"]
+        msp.add_lwpolyline(params["points"], format="xyb", close=params.get("closed", False))
@@ -0,0 +1,94 @@
+#Headless PNG previews of DXF files, for servers and batch jobs where plt.show() cannot run.
+#Uses matplotlib's Agg canvas directly (no pyplot), and every process keeps one figure that is cleared and reused per file.
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import ezdxf
+from ezdxf.addons.drawing import Frontend, RenderContext
+from ezdxf.addons.drawing.config import Configuration
+from ezdxf.addons.drawing.matplotlib import MatplotlibBackend
+from ezdxf.addons.drawing.properties import LayoutProperties
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+DEFAULT_DPI = 100
+DEFAULT_SIZE_INCHES = (6.4, 4.8)
+
+_figure = None
+_axes = None
+
+
+def _get_axes(size_inches: tuple):
+    global _figure, _axes
+    if _figure is None:
+        _figure = Figure()
+        FigureCanvasAgg(_figure)
+        _axes = _figure.add_axes((0, 0, 1, 1))
+    _figure.set_size_inches(*size_inches)
+    _axes.clear()
+    return _figure, _axes
+
+
+# Renders the modelspace of doc to png_path on a white background.
+# A RenderContext reads layers and styles from its document, so a new one is made per document.
+def render_doc(doc, png_path: str, dpi: int = DEFAULT_DPI, size_inches: tuple = DEFAULT_SIZE_INCHES):
+    figure, axes = _get_axes(size_inches)
+    msp = doc.modelspace()
+    layout_properties = LayoutProperties.from_layout(msp)
+    layout_properties.set_colors("#FFFFFF")
+
+    Frontend(RenderContext(doc), MatplotlibBackend(axes, adjust_figure=False), Configuration()).draw_layout(
+        msp, finalize=True, layout_properties=layout_properties)
+    figure.savefig(png_path, dpi=dpi, facecolor=axes.get_facecolor())
+
+
+def render_dxf(dxf_path: str, png_path: str = None, dpi: int = DEFAULT_DPI,
+               size_inches: tuple = DEFAULT_SIZE_INCHES) -> str:
+    png_path = png_path or os.path.splitext(dxf_path)[0] + ".png"
+    render_doc(ezdxf.readfile(dxf_path), png_path, dpi, size_inches)
+    return png_path
+
+
+def _render_one(args):
+    dxf_path, png_path, dpi, size_inches = args
+    start = time.perf_counter()
+    try:
+        render_dxf(dxf_path, png_path, dpi, size_inches)
+        return dxf_path, None, time.perf_counter() - start
+    except Exception as e:
+        return dxf_path, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+# Renders every .dxf in input_directory to a PNG thumbnail in output_directory using a process pool.
+# Returns a list of (dxf_path, error or None, seconds).
+def render_directory(input_directory: str, output_directory: str = None, dpi: int = DEFAULT_DPI,
+                     size_inches: tuple = DEFAULT_SIZE_INCHES, workers: int = None) -> list:
+    output_directory = output_directory or input_directory
+    os.makedirs(output_directory, exist_ok=True)
+    jobs = []
+    for name in sorted(os.listdir(input_directory)):
+        if name.lower().endswith(".dxf"):
+            png_path = os.path.join(output_directory, os.path.splitext(name)[0] + ".png")
+            jobs.append((os.path.join(input_directory, name), png_path, dpi, size_inches))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // 64)))
+    elapsed = time.perf_counter() - start
+
+    failed = [r for r in results if r[1] is not None]
+    print(f"Rendered {len(results) - len(failed)}/{len(results)} DXF files in {elapsed:.2f}s")
+    for dxf_path, error, _ in failed:
+        print(f"  {dxf_path}: {error}")
+    return results
+
+
+if __name__ == "__main__":
+    # python dxf_preview.py <dxf directory> [output directory] [dpi]
+    input_dir = sys.argv[1] if len(sys.argv) > 1 else "."
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    dpi = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_DPI
+    render_directory(input_dir, output_dir, dpi=dpi)
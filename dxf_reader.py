@@ -0,0 +1,291 @@
+#Reads LINE, CIRCLE and ARC geometry back out of DXF files without loading the whole document.
+#The file is read as a stream of group code/value tags with ezdxf's low-level taggers: only the ENTITIES section is
+#looked at, and for the supported types only the few values the schema needs are picked out. No entity objects or
+#document are built, so memory stays flat for multi-MB customer files (ezdxf's iterdxf add-on builds every entity
+#and was 5-8x slower here). 2D polylines (LWPOLYLINE, POLYLINE) are split into their LINE and ARC segments,
+#paper space is ignored, and other entity types are counted and skipped.
+#diff_stores compares two entity sets with a tolerance, e.g. a regenerated drawing against the last DXF written.
+#
+#   python dxf_reader.py drawing.dxf [output json]
+#   python dxf_reader.py old.dxf new.dxf --diff
+#   python dxf_reader.py --check      (reads back a drawing with mirrored entities and compares it with ezdxf)
+
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from ezdxf.lldxf.tagger import ascii_tags_loader, binary_tags_loader
+
+from entity_store import ARC_DTYPE, CIRCLE_DTYPE, LINE_DTYPE, EntityStore
+from geometry_cleanup import DEFAULT_ANGLE_TOLERANCE, DEFAULT_TOLERANCE, close_pairs
+
+BINARY_SENTINEL = b"AutoCAD Binary DXF"
+# Group codes kept per entity: points (10/20, 11/21), radius, angles, bulge, flags, paper space, extrusion z
+_WANTED_CODES = frozenset((10, 20, 11, 21, 40, 42, 50, 51, 67, 70, 230))
+_READ_TYPES = frozenset(("LINE", "CIRCLE", "ARC", "LWPOLYLINE", "POLYLINE", "VERTEX", "SEQEND"))
+
+
+def _line(start: tuple, end: tuple) -> dict:
+    return {"type": "LINE", "params": {"start_point": list(start), "end_point": list(end)}}
+
+
+def _arc(center: tuple, radius: float, start_angle: float, end_angle: float) -> dict:
+    return {"type": "ARC", "params": {"center": list(center), "radius": radius,
+                                      "start_angle": start_angle, "end_angle": end_angle}}
+
+
+# Segment from p to q with a polyline bulge (tan of a quarter of the included angle, positive anti-clockwise)
+def _bulge_segment(p: tuple, q: tuple, bulge: float) -> dict:
+    if abs(bulge) < 1e-12:
+        return _line(p, q)
+    dx, dy = q[0] - p[0], q[1] - p[1]
+    offset = (1 - bulge * bulge) / (4 * bulge)
+    center = ((p[0] + q[0]) / 2 - dy * offset, (p[1] + q[1]) / 2 + dx * offset)
+    radius = math.hypot(p[0] - center[0], p[1] - center[1])
+    if bulge < 0:
+        p, q = q, p
+    return _arc(center, radius, math.degrees(math.atan2(p[1] - center[1], p[0] - center[0])) % 360.0,
+                math.degrees(math.atan2(q[1] - center[1], q[0] - center[0])) % 360.0)
+
+
+# Segments of a 2D polyline given as [(x, y, bulge), ...]. An extrusion of (0, 0, -1) mirrors the x axis.
+def _polyline_segments(vertices: list, closed: bool, mirrored: bool) -> list:
+    if mirrored:
+        vertices = [(-x, y, -bulge) for x, y, bulge in vertices]
+    if closed and len(vertices) > 2:
+        vertices = vertices + vertices[:1]
+    return [_bulge_segment(a[:2], b[:2], a[2]) for a, b in zip(vertices, vertices[1:]) if a[:2] != b[:2]]
+
+
+# LINE endpoints are in world coordinates. CIRCLE and ARC are in their object coordinate system, which an extrusion
+# of (0, 0, -1) mirrors in x (and turns the angles the other way).
+def _simple_entity(type_: str, tags: dict):
+    if type_ == "LINE":
+        return _line((tags.get(10, 0.0), tags.get(20, 0.0)), (tags.get(11, 0.0), tags.get(21, 0.0)))
+    mirrored = tags.get(230, 1.0) < 0
+    center = (-tags.get(10, 0.0) if mirrored else tags.get(10, 0.0), tags.get(20, 0.0))
+    if type_ == "CIRCLE":
+        return {"type": "CIRCLE", "params": {"center": list(center), "radius": tags.get(40, 0.0)}}
+    start, end = tags.get(50, 0.0), tags.get(51, 0.0)
+    if mirrored:
+        start, end = (180.0 - end) % 360.0, (180.0 - start) % 360.0
+    return _arc(center, tags.get(40, 0.0), start, end)
+
+
+# (group code, value) tags of the file. ASCII files are streamed; the binary tagger needs the whole file in memory.
+def _tags(dxf_filename: str):
+    with open(dxf_filename, "rb") as f:
+        binary = f.read(len(BINARY_SENTINEL)) == BINARY_SENTINEL
+    if binary:
+        with open(dxf_filename, "rb") as f:
+            yield from binary_tags_loader(f.read())
+        return
+    with open(dxf_filename, encoding="cp1252", errors="replace") as f:
+        yield from ascii_tags_loader(f)
+
+
+# Yields the modelspace geometry of a DXF file as {"type", "params"} dicts, one entity at a time.
+# skipped (a dict) receives counts of the entity types that have no equivalent in the schema.
+def iter_dxf_entities(dxf_filename: str, skipped: dict = None):
+    in_section = in_entities = False
+    type_ = None
+    # Tags of the current entity, as {code: value} for plain entities and a list for LWPOLYLINE vertices
+    tags = {}
+    vertices = []
+    # The POLYLINE header (flags, extrusion) while its VERTEX entities are read
+    polyline = None
+
+    def finish():
+        nonlocal polyline
+        if type_ is None or tags.get(67) == 1:
+            return []
+        if type_ in ("LINE", "CIRCLE", "ARC"):
+            return [_simple_entity(type_, tags)]
+        if type_ == "LWPOLYLINE":
+            return _polyline_segments(vertices, int(tags.get(70, 0)) & 1, tags.get(230, 1.0) < 0)
+        if type_ == "POLYLINE":
+            flags = int(tags.get(70, 0))
+            # 3D polylines and meshes are not 2D geometry
+            polyline = None if flags & (8 | 16 | 64) else {"tags": dict(tags), "vertices": []}
+            if polyline is None and skipped is not None:
+                skipped["POLYLINE"] = skipped.get("POLYLINE", 0) + 1
+        elif type_ == "VERTEX" and polyline is not None:
+            # Spline frame control points are not on the curve
+            if not int(tags.get(70, 0)) & 16:
+                polyline["vertices"].append((tags.get(10, 0.0), tags.get(20, 0.0), tags.get(42, 0.0)))
+        elif type_ == "SEQEND" and polyline is not None:
+            header, points = polyline["tags"], polyline["vertices"]
+            polyline = None
+            return _polyline_segments(points, int(header.get(70, 0)) & 1, header.get(230, 1.0) < 0)
+        return []
+
+    for code, value in _tags(dxf_filename):
+        if code == 0:
+            if in_entities:
+                yield from finish()
+            if value == "SECTION":
+                in_section = True
+            elif value == "ENDSEC":
+                if in_entities:
+                    return
+                in_section = False
+            type_ = value if in_entities and value in _READ_TYPES else None
+            if in_entities and type_ is None and skipped is not None and value not in ("ENDSEC", "SEQEND", "VERTEX"):
+                skipped[value] = skipped.get(value, 0) + 1
+            tags = {}
+            vertices = []
+        elif code == 2 and in_section and not in_entities and value == "ENTITIES":
+            in_entities = True
+        elif type_ is not None and code in _WANTED_CODES:
+            number = float(value)
+            if type_ == "LWPOLYLINE" and code in (10, 20, 42):
+                if code == 10:
+                    vertices.append((number, 0.0, 0.0))
+                elif vertices:
+                    x, y, bulge = vertices[-1]
+                    vertices[-1] = (x, number, bulge) if code == 20 else (x, y, number)
+            elif code not in tags:
+                tags[code] = number
+
+
+# The geometry of a DXF file as an EntityStore. Rows are collected as flat tuples and the arrays filled once.
+def read_dxf(dxf_filename: str, skipped: dict = None) -> EntityStore:
+    rows = {"LINE": [], "CIRCLE": [], "ARC": []}
+    for entity in iter_dxf_entities(dxf_filename, skipped):
+        params = entity["params"]
+        if entity["type"] == "LINE":
+            rows["LINE"].append((*params["start_point"], *params["end_point"]))
+        elif entity["type"] == "CIRCLE":
+            rows["CIRCLE"].append((*params["center"], params["radius"]))
+        else:
+            rows["ARC"].append((*params["center"], params["radius"], params["start_angle"], params["end_angle"]))
+
+    lines = np.array(rows["LINE"], dtype="f8").reshape(-1, 4)
+    circles = np.array(rows["CIRCLE"], dtype="f8").reshape(-1, 3)
+    arcs = np.array(rows["ARC"], dtype="f8").reshape(-1, 5)
+    store = EntityStore(np.zeros(len(lines), LINE_DTYPE), np.zeros(len(circles), CIRCLE_DTYPE),
+                        np.zeros(len(arcs), ARC_DTYPE))
+    store.lines["start"], store.lines["end"] = lines[:, :2], lines[:, 2:]
+    store.circles["center"], store.circles["radius"] = circles[:, :2], circles[:, 2]
+    store.arcs["center"], store.arcs["radius"] = arcs[:, :2], arcs[:, 2]
+    store.arcs["start_angle"], store.arcs["end_angle"] = arcs[:, 3], arcs[:, 4]
+    return store
+
+
+# Comparable coordinates per entity type, divided by their tolerances. Lines are compared regardless of
+# direction, and arc angles regardless of full turns (the last two arc columns are angles).
+def _keys(store: EntityStore, tol: float, angle_tol_deg: float) -> dict:
+    start, end = store.lines["start"], store.lines["end"]
+    swap = (start[:, 0] > end[:, 0]) | ((start[:, 0] == end[:, 0]) & (start[:, 1] > end[:, 1]))
+    first = np.where(swap[:, None], end, start)
+    second = np.where(swap[:, None], start, end)
+    return {
+        "lines": np.column_stack([first, second]) / tol,
+        "circles": np.column_stack([store.circles["center"], store.circles["radius"]]) / tol,
+        "arcs": np.column_stack([
+            np.column_stack([store.arcs["center"], store.arcs["radius"]]) / tol,
+            np.mod(store.arcs["start_angle"], 360.0) / angle_tol_deg,
+            np.mod(store.arcs["end_angle"], 360.0) / angle_tol_deg,
+        ]),
+    }
+
+
+# Pairs (i, j) of rows from old and new keys that agree in every column. Candidates come from
+# geometry_cleanup.close_pairs on the first three columns, the remaining columns are checked afterwards.
+def _matching_pairs(old_keys: np.ndarray, new_keys: np.ndarray, turn: float = None) -> np.ndarray:
+    n_old = len(old_keys)
+    keys = np.concatenate([old_keys, new_keys])
+    pairs = close_pairs(keys[:, :3])
+    pairs = pairs[(pairs[:, 0] < n_old) & (pairs[:, 1] >= n_old)]
+    delta = np.abs(keys[pairs[:, 0]] - keys[pairs[:, 1]])
+    if turn is not None:
+        delta[:, 3:] = np.minimum(delta[:, 3:], turn - delta[:, 3:])
+    pairs = pairs[(delta <= 1.0).all(axis=1)]
+    pairs[:, 1] -= n_old
+    return pairs
+
+
+# Matches the entities of two stores one to one within the tolerances. Returns the entities only in old
+# ("removed"), only in new ("added"), and how many are in both ("unchanged").
+def diff_stores(old: EntityStore, new: EntityStore, tol: float = DEFAULT_TOLERANCE,
+                angle_tol_deg: float = DEFAULT_ANGLE_TOLERANCE) -> dict:
+    old_keys, new_keys = _keys(old, tol, angle_tol_deg), _keys(new, tol, angle_tol_deg)
+    removed, added = EntityStore(), EntityStore()
+    unchanged = 0
+    for table in ("lines", "circles", "arcs"):
+        turn = 360.0 / angle_tol_deg if table == "arcs" else None
+        old_matched = np.zeros(len(old_keys[table]), dtype=bool)
+        new_matched = np.zeros(len(new_keys[table]), dtype=bool)
+        for i, j in _matching_pairs(old_keys[table], new_keys[table], turn).tolist():
+            if not old_matched[i] and not new_matched[j]:
+                old_matched[i] = new_matched[j] = True
+        unchanged += int(old_matched.sum())
+        setattr(removed, table, getattr(old, table)[~old_matched])
+        setattr(added, table, getattr(new, table)[~new_matched])
+    return {"removed": removed, "added": added, "unchanged": unchanged}
+
+
+# Writes entities with extrusion (0, 0, -1) next to plain ones, reads them back and compares with the world
+# coordinates ezdxf computes. Returns the problems found (empty if the reader agrees).
+def check_extrusion(dxf_filename: str = "dxf_reader_check.dxf") -> list:
+    import ezdxf
+    from ezdxf.math import Vec3
+
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    expected = []
+    for extrusion in ((0, 0, 1), (0, 0, -1)):
+        attribs = {"extrusion": extrusion}
+        # LINE points are world coordinates whatever the extrusion is
+        msp.add_line((1, 2), (3, 4), dxfattribs=attribs)
+        expected.append(_line((1.0, 2.0), (3.0, 4.0)))
+        circle = msp.add_circle((5, 6), 2, dxfattribs=attribs)
+        center = circle.ocs().to_wcs(Vec3(5, 6))
+        expected.append({"type": "CIRCLE", "params": {"center": [center.x, center.y], "radius": 2.0}})
+        arc = msp.add_arc((7, 8), 3, 10, 80, dxfattribs=attribs)
+        center = arc.ocs().to_wcs(Vec3(7, 8))
+        start, end = (arc.end_point, arc.start_point) if extrusion[2] < 0 else (arc.start_point, arc.end_point)
+        expected.append(_arc((center.x, center.y), 3.0,
+                             math.degrees(math.atan2(start.y - center.y, start.x - center.x)) % 360.0,
+                             math.degrees(math.atan2(end.y - center.y, end.x - center.x)) % 360.0))
+        polyline = msp.add_lwpolyline([(0, 0, 0, 0, 1), (4, 0)], format="xyseb", dxfattribs=attribs)
+        points = [polyline.ocs().to_wcs(Vec3(x, y)) for x, y in polyline.get_points("xy")]
+        expected.append(_bulge_segment((points[0].x, points[0].y), (points[1].x, points[1].y),
+                                       -1.0 if extrusion[2] < 0 else 1.0))
+    doc.saveas(dxf_filename)
+    try:
+        result = diff_stores(EntityStore.from_json({"entities": expected}), read_dxf(dxf_filename), tol=1e-6,
+                             angle_tol_deg=1e-6)
+    finally:
+        os.remove(dxf_filename)
+    return [f"{label}: {json.dumps(entity)}" for label in ("removed", "added")
+            for entity in result[label].to_json()["entities"]]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--check":
+        problems = check_extrusion()
+        print("\n".join(problems) if problems else "Mirrored entities read back correctly")
+        sys.exit(1 if problems else 0)
+    if len(sys.argv) > 3 and sys.argv[3] == "--diff":
+        start = time.perf_counter()
+        result = diff_stores(read_dxf(sys.argv[1]), read_dxf(sys.argv[2]))
+        print(f"{result['unchanged']} unchanged, {len(result['removed'])} removed, {len(result['added'])} added "
+              f"({time.perf_counter() - start:.2f}s)")
+        for label in ("removed", "added"):
+            for entity in result[label].to_json()["entities"]:
+                print(f"{label}: {json.dumps(entity)}")
+    else:
+        dxf_file = sys.argv[1] if len(sys.argv) > 1 else "sixthTask3.dxf"
+        output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(os.path.basename(dxf_file))[0] + "_from_dxf.json"
+        skipped = {}
+        start = time.perf_counter()
+        data = read_dxf(dxf_file, skipped).to_json()
+        with open(output_file, 'w') as f:
+            json.dump(data, f, indent=4)
+        print(f"Read {len(data['entities'])} entities from {dxf_file} in {time.perf_counter() - start:.2f}s into {output_file}")
+        if skipped:
+            print(f"Skipped: {', '.join(f'{count} {type_}' for type_, count in sorted(skipped.items()))}")
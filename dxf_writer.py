@@ -0,0 +1,86 @@
+#Writes the {"entities": [...]} schema (or an EntityStore) as a DXF file. Shared by the extraction scripts, so every
+#output goes through the same steps: invalid entities are dropped, the geometry is cleaned up (geometry_cleanup.py),
+#connected chains can be written as polylines, and entity types other than LINE, CIRCLE and ARC are added one by one
+#(ANGULAR_DIMENSION; anything else is reported and skipped).
+
+import ezdxf
+
+from contours import add_polylines, chain_contours
+from entity_store import EntityStore
+from fast_dxf import write_fast_dxf
+from geometry_cleanup import clean_geometry
+
+
+# The store to write: a copy of data with invalid entities dropped and, with clean=True, cleaned up
+def prepare_store(data, clean: bool = True) -> EntityStore:
+    store = data.copy() if isinstance(data, EntityStore) else EntityStore.from_json(data)
+    dropped = store.drop_invalid()
+    if dropped:
+        print(f"Skipped {dropped} invalid entities")
+    if clean:
+        report = clean_geometry(store)
+        print(f"Geometry cleanup merged {report['merged_entities']} entities "
+              f"and snapped {report['snapped_endpoints']} endpoints")
+    return store
+
+
+# Adds entities of the types EntityStore keeps in store.other
+def add_other_entities(msp, entities: list):
+    for entity in entities:
+        etype = entity.get("type")
+        params = entity.get("params", {})
+
+        if etype == "ANGULAR_DIMENSION":
+            try:
+                dim = msp.add_arc_dim_cra(
+                    center=params["center"],
+                    radius=params["radius"],
+                    start_angle=params["start_angle"],
+                    end_angle=params["end_angle"],
+                    distance=params.get("distance", 2),
+                    dimstyle=params.get("dimstyle", "EZ_CURVED"),
+                )
+                dim.render()
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Skipped invalid {etype} ({type(e).__name__}: {e})")
+
+        else:
+            print(f"Unsupported entity type: {etype}")
+
+
+# The ezdxf document for a prepared store, with polylines=True connected LINE/ARC chains become LWPOLYLINEs
+def build_doc(store: EntityStore, polylines: bool = False, dxfversion: str = "R2013"):
+    doc = ezdxf.new(dxfversion, setup=True)
+    msp = doc.modelspace()
+    if polylines:
+        contours = chain_contours(store)
+        add_polylines(msp, contours)
+        print(f"Chained segments into {len(contours)} polylines")
+    store.add_to_modelspace(msp)
+    add_other_entities(msp, store.other)
+    return doc
+
+
+# clean=True snaps near-coincident endpoints and merges duplicate entities before writing,
+# polylines=True writes connected LINE/ARC chains as single LWPOLYLINE entities,
+# fast=True streams a minimal R12 file instead of building an ezdxf document (for bulk conversion).
+# data can also be an EntityStore, e.g. one read from a binary file (see entity_binary.py); it is not modified.
+# Returns the ezdxf document (None with fast=True), e.g. for a preview.
+def json_to_dxf(data, dxf_filename: str, clean: bool = True, polylines: bool = False, fast: bool = False,
+                dxfversion: str = "R2013"):
+    store = prepare_store(data, clean)
+
+    if fast:
+        contours = chain_contours(store) if polylines else []
+        if polylines:
+            print(f"Chained segments into {len(contours)} polylines")
+        if store.other:
+            print(f"Fast writer skipped {len(store.other)} unsupported entities")
+        write_fast_dxf(store, dxf_filename, contours)
+        print(f"Successfully converted JSON to DXF: {dxf_filename}")
+        return None
+
+    doc = build_doc(store, polylines, dxfversion)
+    doc.saveas(dxf_filename)
+    print(f"Successfully converted JSON to DXF: {dxf_filename}")
+    return doc
@@ -0,0 +1,178 @@
+#Binary storage for extracted entities: an uncompressed .npz holding the EntityStore arrays as they are in memory.
+#One file can hold a whole batch of drawings: the line, circle and arc arrays of all drawings are stored end to end
+#with offset arrays saying which rows belong to which drawing. Because the members are stored uncompressed they
+#can be memory-mapped, so EntityArchive opens a large batch without reading it and only touches the rows of the
+#drawings that are asked for. Everything that is not a line, circle or arc (dimensions, entity names, other entity
+#types) goes into a small JSON blob per drawing.
+#
+#The scripts still write JSON by default; AUTOLAB_OUTPUT_FORMAT picks what write_output writes:
+#   json (default), npz, or both
+
+import json
+import os
+import threading
+import zipfile
+from contextlib import contextmanager
+
+import numpy as np
+
+from entity_store import ARC_DTYPE, CIRCLE_DTYPE, LINE_DTYPE, EntityStore
+
+OUTPUT_FORMATS = ("json", "npz", "both")
+
+_TABLES = (("lines", LINE_DTYPE), ("circles", CIRCLE_DTYPE), ("arcs", ARC_DTYPE))
+
+_local = threading.local()
+
+
+# The parts of a data dict that are not lines, circles or arcs, as one JSON document: the other keys ("fields"),
+# the order of all keys, so the dict reads back as it was written, and the entities of other types
+def _extra(data, store: EntityStore) -> bytes:
+    extra = {}
+    if data is not None:
+        fields = {key: value for key, value in data.items() if key != "entities"}
+        if fields:
+            extra["fields"] = fields
+        if list(data) != ["entities"]:
+            extra["order"] = list(data)
+    if store.other:
+        extra["other"] = store.other
+    return json.dumps(extra, separators=(",", ":")).encode("utf-8") if extra else b""
+
+
+# Writes drawings ({name: data dict or EntityStore}) to one .npz file
+def save_batch(path: str, drawings: dict):
+    names = list(drawings)
+    stores, extras = [], []
+    for name in names:
+        item = drawings[name]
+        store = item if isinstance(item, EntityStore) else EntityStore.from_json(item)
+        stores.append(store)
+        extras.append(_extra(item if isinstance(item, dict) else None, store))
+
+    arrays = {"names": np.array(names, dtype=str) if names else np.zeros(0, dtype="U1")}
+    for table, dtype in _TABLES:
+        parts = [getattr(store, table) for store in stores]
+        arrays[table] = np.concatenate(parts).astype(dtype, copy=False) if parts else np.zeros(0, dtype)
+        arrays[table + "_offsets"] = np.cumsum([0] + [len(part) for part in parts], dtype=np.int64)
+    arrays["extra"] = np.frombuffer(b"".join(extras), dtype=np.uint8)
+    arrays["extra_offsets"] = np.cumsum([0] + [len(extra) for extra in extras], dtype=np.int64)
+
+    # Written next to the target and renamed, so readers never see half a file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def save(data, path: str):
+    save_batch(path, {"": data})
+
+
+# Memory-maps the members of an uncompressed .npz (copy on write, so stores read from it can be edited)
+def _map_members(path: str) -> dict:
+    members = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed, it cannot be memory-mapped")
+            # The local file header is 30 bytes plus its own copies of the name and extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len(".npy")]
+            if int(np.prod(shape)) == 0:
+                members[name] = np.zeros(shape, dtype)
+            else:
+                members[name] = np.memmap(path, dtype=dtype, mode="c", offset=f.tell(), shape=shape,
+                                          order="F" if fortran_order else "C")
+    return members
+
+
+# Read access to a file written by save_batch. Nothing is parsed until a drawing is asked for.
+class EntityArchive:
+    def __init__(self, path: str):
+        self.path = path
+        self._arrays = _map_members(path)
+        self.names = [str(name) for name in self._arrays["names"]]
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def _rows(self, table: str, i: int) -> np.ndarray:
+        offsets = self._arrays[table + "_offsets"]
+        return self._arrays[table][offsets[i]:offsets[i + 1]]
+
+    def _extra(self, i: int) -> dict:
+        blob = self._rows("extra", i)
+        return json.loads(bytes(blob).decode("utf-8")) if len(blob) else {}
+
+    # Lines, circles and arcs of a drawing as views into the file
+    def store(self, name: str = "") -> EntityStore:
+        i = self._index[name]
+        return EntityStore(lines=self._rows("lines", i), circles=self._rows("circles", i),
+                           arcs=self._rows("arcs", i), other=self._extra(i).get("other", []))
+
+    # The drawing as the data dict it was saved from, with the same keys (entities in line, circle, arc order)
+    def data(self, name: str = "") -> dict:
+        i = self._index[name]
+        extra = self._extra(i)
+        fields = extra.get("fields", {})
+        entities = self.store(name).to_json()["entities"]
+        return {key: entities if key == "entities" else fields[key] for key in extra.get("order", ["entities"])}
+
+
+def load(path: str) -> dict:
+    archive = EntityArchive(path)
+    return archive.data(archive.names[0])
+
+
+def load_store(path: str) -> EntityStore:
+    archive = EntityArchive(path)
+    return archive.store(archive.names[0])
+
+
+# Saves a script's result in the format picked by AUTOLAB_OUTPUT_FORMAT and returns the paths it wrote.
+# output_filename is the .json name; the binary file gets the same name with .npz. The variable is read on every
+# call, so a typo only fails the scripts that actually write output.
+def write_output(data: dict, output_filename: str, fmt: str = None) -> list:
+    fmt = fmt or os.environ.get("AUTOLAB_OUTPUT_FORMAT", "json").lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}', expected one of {', '.join(OUTPUT_FORMATS)}")
+    written = []
+    if fmt in ("json", "both"):
+        with open(output_filename, 'w') as f:
+            json.dump(data, f, indent=4)
+        written.append(output_filename)
+    if fmt in ("npz", "both"):
+        npz_filename = os.path.splitext(output_filename)[0] + ".npz"
+        save(data, npz_filename)
+        written.append(npz_filename)
+    recorded = getattr(_local, "paths", None)
+    if recorded is not None:
+        recorded.extend(written)
+    return written
+
+
+# Collects the paths write_output writes in this thread while the block runs. The extraction scripts call
+# write_output deep inside, batch runs and the watch daemon use this to record the real outputs in the job store.
+@contextmanager
+def recording_outputs():
+    previous = getattr(_local, "paths", None)
+    _local.paths = paths = []
+    try:
+        yield paths
+    finally:
+        _local.paths = previous
@@ -0,0 +1,195 @@
+#Columnar storage for extracted entities: one NumPy structured array per entity type.
+#Validation, transforms and bounding boxes run over whole arrays instead of one dict at a time.
+
+import json
+
+import numpy as np
+
+LINE_DTYPE = np.dtype([("start", "f8", (2,)), ("end", "f8", (2,))])
+CIRCLE_DTYPE = np.dtype([("center", "f8", (2,)), ("radius", "f8")])
+ARC_DTYPE = np.dtype([("center", "f8", (2,)), ("radius", "f8"), ("start_angle", "f8"), ("end_angle", "f8")])
+
+
+class EntityStore:
+    def __init__(self, lines=None, circles=None, arcs=None, other=None):
+        self.lines = lines if lines is not None else np.zeros(0, LINE_DTYPE)
+        self.circles = circles if circles is not None else np.zeros(0, CIRCLE_DTYPE)
+        self.arcs = arcs if arcs is not None else np.zeros(0, ARC_DTYPE)
+        # Entity types without a column layout (e.g. ANGULAR_DIMENSION) are kept as plain dicts
+        self.other = other if other is not None else []
+
+    @classmethod
+    def from_json(cls, data: dict) -> "EntityStore":
+        # Collect flat rows of floats first, filling the structured arrays from 2D blocks is much
+        # faster than letting NumPy convert nested tuples
+        lines, circles, arcs, other = [], [], [], []
+        for entity in data.get("entities", []):
+            type_ = entity.get("type")
+            params = entity.get("params", {})
+            if type_ == "LINE":
+                start = params.get("start_point", [0, 0])
+                end = params.get("end_point", [0, 0])
+                lines.append((start[0], start[1], end[0], end[1]))
+            elif type_ == "CIRCLE":
+                center = params.get("center", [0, 0])
+                circles.append((center[0], center[1], params.get("radius", 0)))
+            elif type_ == "ARC":
+                center = params.get("center", [0, 0])
+                arcs.append((center[0], center[1], params.get("radius", 0),
+                             params.get("start_angle", 0), params.get("end_angle", 0)))
+            else:
+                other.append(entity)
+
+        line_rows = _rows(lines, 4)
+        circle_rows = _rows(circles, 3)
+        arc_rows = _rows(arcs, 5)
+
+        store = cls(
+            np.zeros(len(line_rows), LINE_DTYPE),
+            np.zeros(len(circle_rows), CIRCLE_DTYPE),
+            np.zeros(len(arc_rows), ARC_DTYPE),
+            other,
+        )
+        store.lines["start"] = line_rows[:, 0:2]
+        store.lines["end"] = line_rows[:, 2:4]
+        store.circles["center"] = circle_rows[:, 0:2]
+        store.circles["radius"] = circle_rows[:, 2]
+        store.arcs["center"] = arc_rows[:, 0:2]
+        store.arcs["radius"] = arc_rows[:, 2]
+        store.arcs["start_angle"] = arc_rows[:, 3]
+        store.arcs["end_angle"] = arc_rows[:, 4]
+        return store
+
+    @classmethod
+    def from_file(cls, json_file: str) -> "EntityStore":
+        with open(json_file, "r") as f:
+            return cls.from_json(json.load(f))
+
+    def to_json(self) -> dict:
+        entities = []
+        for start, end in zip(self.lines["start"].tolist(), self.lines["end"].tolist()):
+            entities.append({"type": "LINE", "params": {"start_point": start, "end_point": end}})
+        for center, radius in zip(self.circles["center"].tolist(), self.circles["radius"].tolist()):
+            entities.append({"type": "CIRCLE", "params": {"center": center, "radius": radius}})
+        for center, radius, start_angle, end_angle in zip(
+                self.arcs["center"].tolist(), self.arcs["radius"].tolist(),
+                self.arcs["start_angle"].tolist(), self.arcs["end_angle"].tolist()):
+            entities.append({"type": "ARC", "params": {
+                "center": center, "radius": radius, "start_angle": start_angle, "end_angle": end_angle,
+            }})
+        entities.extend(self.other)
+        return {"entities": entities}
+
+    def copy(self) -> "EntityStore":
+        return EntityStore(self.lines.copy(), self.circles.copy(), self.arcs.copy(), list(self.other))
+
+    def __len__(self) -> int:
+        return len(self.lines) + len(self.circles) + len(self.arcs) + len(self.other)
+
+    # Boolean masks of the valid rows: finite numbers, non-zero line length, positive radius
+    def valid_masks(self) -> dict:
+        lines_ok = (
+            np.isfinite(self.lines["start"]).all(axis=1)
+            & np.isfinite(self.lines["end"]).all(axis=1)
+            & (self.lines["start"] != self.lines["end"]).any(axis=1)
+        )
+        circles_ok = np.isfinite(self.circles["center"]).all(axis=1) & (self.circles["radius"] > 0)
+        arcs_ok = (
+            np.isfinite(self.arcs["center"]).all(axis=1)
+            & (self.arcs["radius"] > 0)
+            & np.isfinite(self.arcs["start_angle"])
+            & np.isfinite(self.arcs["end_angle"])
+        )
+        return {"lines": lines_ok, "circles": circles_ok, "arcs": arcs_ok}
+
+    # Removes invalid rows and returns how many were dropped
+    def drop_invalid(self) -> int:
+        masks = self.valid_masks()
+        dropped = sum(int((~mask).sum()) for mask in masks.values())
+        self.lines = self.lines[masks["lines"]]
+        self.circles = self.circles[masks["circles"]]
+        self.arcs = self.arcs[masks["arcs"]]
+        return dropped
+
+    def translate(self, dx: float, dy: float):
+        offset = np.array([dx, dy], dtype="f8")
+        self.lines["start"] += offset
+        self.lines["end"] += offset
+        self.circles["center"] += offset
+        self.arcs["center"] += offset
+
+    def scale(self, factor: float, origin=(0.0, 0.0)):
+        if factor <= 0:
+            raise ValueError("Scale factor must be positive")
+        origin = np.asarray(origin, dtype="f8")
+        for array, field in ((self.lines, "start"), (self.lines, "end"),
+                             (self.circles, "center"), (self.arcs, "center")):
+            array[field] = (array[field] - origin) * factor + origin
+        self.circles["radius"] *= factor
+        self.arcs["radius"] *= factor
+
+    # Moves the drawing so the bottom-left corner of its bounding box is at (0, 0)
+    def shift_origin_to_bbox(self):
+        bbox = self.bbox()
+        if bbox is not None:
+            self.translate(-bbox[0], -bbox[1])
+
+    # (xmin, ymin, xmax, ymax) over all lines, circles and arcs, or None when the store is empty
+    def bbox(self):
+        mins = []
+        maxs = []
+        if len(self.lines):
+            points = np.concatenate([self.lines["start"], self.lines["end"]])
+            mins.append(points.min(axis=0))
+            maxs.append(points.max(axis=0))
+        if len(self.circles):
+            radius = self.circles["radius"][:, None]
+            mins.append((self.circles["center"] - radius).min(axis=0))
+            maxs.append((self.circles["center"] + radius).max(axis=0))
+        if len(self.arcs):
+            arc_min, arc_max = _arc_extents(self.arcs)
+            mins.append(arc_min.min(axis=0))
+            maxs.append(arc_max.max(axis=0))
+        if not mins:
+            return None
+        lo = np.min(mins, axis=0)
+        hi = np.max(maxs, axis=0)
+        return float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])
+
+    def add_to_modelspace(self, msp):
+        for start, end in zip(self.lines["start"].tolist(), self.lines["end"].tolist()):
+            msp.add_line(start, end)
+        for center, radius in zip(self.circles["center"].tolist(), self.circles["radius"].tolist()):
+            msp.add_circle(center, radius)
+        for center, radius, start_angle, end_angle in zip(
+                self.arcs["center"].tolist(), self.arcs["radius"].tolist(),
+                self.arcs["start_angle"].tolist(), self.arcs["end_angle"].tolist()):
+            msp.add_arc(center, radius, start_angle, end_angle)
+
+
+def _rows(rows: list, width: int) -> np.ndarray:
+    return np.array(rows, dtype="f8").reshape(-1, width)
+
+
+# Per-arc bounding boxes. Arcs run anti clockwise from start_angle to end_angle, so the box is
+# spanned by the two end points plus every axis crossing (0, 90, 180, 270 degrees) inside the sweep.
+def _arc_extents(arcs: np.ndarray):
+    center = arcs["center"]
+    radius = arcs["radius"]
+    start = np.radians(arcs["start_angle"])
+    end = np.radians(arcs["end_angle"])
+
+    ends_x = center[:, 0:1] + radius[:, None] * np.cos(np.stack([start, end], axis=1))
+    ends_y = center[:, 1:2] + radius[:, None] * np.sin(np.stack([start, end], axis=1))
+
+    sweep = np.mod(arcs["end_angle"] - arcs["start_angle"], 360.0)
+    sweep[sweep == 0] = 360.0
+    cardinals = np.array([0.0, 90.0, 180.0, 270.0])
+    inside = np.mod(cardinals[None, :] - arcs["start_angle"][:, None], 360.0) <= sweep[:, None]
+
+    # Axis crossings at 0/90/180/270 degrees push the box out to center +/- radius
+    xmin = np.where(inside[:, 2], center[:, 0] - radius, ends_x.min(axis=1))
+    xmax = np.where(inside[:, 0], center[:, 0] + radius, ends_x.max(axis=1))
+    ymin = np.where(inside[:, 3], center[:, 1] - radius, ends_y.min(axis=1))
+    ymax = np.where(inside[:, 1], center[:, 1] + radius, ends_y.max(axis=1))
+    return np.stack([xmin, ymin], axis=1), np.stack([xmax, ymax], axis=1)
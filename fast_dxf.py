@@ -0,0 +1,98 @@
+#Minimal DXF writer for bulk conversion.
+#Streams an R12 file with only a header and an ENTITIES section straight to the file handle,
+#instead of building an ezdxf document with every standard style, linetype and dimstyle in it.
+#Supports LINE, CIRCLE, ARC and polylines (written as R12 POLYLINE/VERTEX with bulges).
+
+from entity_store import EntityStore
+
+HEADER = "0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n0\nENDSEC\n0\nSECTION\n2\nENTITIES\n"
+FOOTER = "0\nENDSEC\n0\nEOF\n"
+
+
+class FastDXFWriter:
+    def __init__(self, stream, layer: str = "0"):
+        self.stream = stream
+        self.layer = layer
+        self.count = 0
+        stream.write(HEADER)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_line(self, start, end):
+        self.stream.write(
+            f"0\nLINE\n8\n{self.layer}\n10\n{_num(start[0])}\n20\n{_num(start[1])}\n30\n0.0\n"
+            f"11\n{_num(end[0])}\n21\n{_num(end[1])}\n31\n0.0\n"
+        )
+        self.count += 1
+
+    def add_circle(self, center, radius: float):
+        self.stream.write(
+            f"0\nCIRCLE\n8\n{self.layer}\n10\n{_num(center[0])}\n20\n{_num(center[1])}\n30\n0.0\n40\n{_num(radius)}\n"
+        )
+        self.count += 1
+
+    def add_arc(self, center, radius: float, start_angle: float, end_angle: float):
+        self.stream.write(
+            f"0\nARC\n8\n{self.layer}\n10\n{_num(center[0])}\n20\n{_num(center[1])}\n30\n0.0\n40\n{_num(radius)}\n"
+            f"50\n{_num(start_angle)}\n51\n{_num(end_angle)}\n"
+        )
+        self.count += 1
+
+    # points are [x, y, bulge] like LWPOLYLINE in the entities schema
+    def add_polyline(self, points: list, closed: bool = False):
+        parts = [f"0\nPOLYLINE\n8\n{self.layer}\n66\n1\n10\n0.0\n20\n0.0\n30\n0.0\n70\n{1 if closed else 0}\n"]
+        for point in points:
+            x, y = point[0], point[1]
+            bulge = point[2] if len(point) > 2 else 0.0
+            parts.append(f"0\nVERTEX\n8\n{self.layer}\n10\n{_num(x)}\n20\n{_num(y)}\n30\n0.0\n")
+            if bulge:
+                parts.append(f"42\n{_num(bulge)}\n")
+        parts.append(f"0\nSEQEND\n8\n{self.layer}\n")
+        self.stream.write("".join(parts))
+        self.count += 1
+
+    # Writes every LINE, CIRCLE and ARC of the store with one string join per entity type
+    def add_store(self, store: EntityStore):
+        layer = self.layer
+        lines = store.lines
+        self.stream.write("".join(
+            f"0\nLINE\n8\n{layer}\n10\n{x1!r}\n20\n{y1!r}\n30\n0.0\n11\n{x2!r}\n21\n{y2!r}\n31\n0.0\n"
+            for (x1, y1), (x2, y2) in zip(lines["start"].tolist(), lines["end"].tolist())
+        ))
+        circles = store.circles
+        self.stream.write("".join(
+            f"0\nCIRCLE\n8\n{layer}\n10\n{x!r}\n20\n{y!r}\n30\n0.0\n40\n{r!r}\n"
+            for (x, y), r in zip(circles["center"].tolist(), circles["radius"].tolist())
+        ))
+        arcs = store.arcs
+        self.stream.write("".join(
+            f"0\nARC\n8\n{layer}\n10\n{x!r}\n20\n{y!r}\n30\n0.0\n40\n{r!r}\n50\n{a1!r}\n51\n{a2!r}\n"
+            for (x, y), r, a1, a2 in zip(arcs["center"].tolist(), arcs["radius"].tolist(),
+                                         arcs["start_angle"].tolist(), arcs["end_angle"].tolist())
+        ))
+        self.count += len(lines) + len(circles) + len(arcs)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.write(FOOTER)
+            self.stream = None
+
+
+def _num(value) -> str:
+    return repr(float(value))
+
+
+# Writes the store and optional LWPOLYLINE entities (as returned by contours.chain_contours) to dxf_filename.
+# Returns the number of entities written; entity types the writer does not know are skipped.
+def write_fast_dxf(store: EntityStore, dxf_filename: str, polylines: list = ()) -> int:
+    with open(dxf_filename, "w", encoding="ascii", newline="\n") as f:
+        with FastDXFWriter(f) as writer:
+            for polyline in polylines:
+                params = polyline["params"]
+                writer.add_polyline(params["points"], params.get("closed", False))
+            writer.add_store(store)
+            return writer.count
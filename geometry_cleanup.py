@@ -0,0 +1,327 @@
+#Cleans up model output before it is written to DXF: snaps near-coincident endpoints together,
+#drops duplicate circles and arcs that lie on another circle or arc, and merges overlapping collinear lines.
+#Candidate pairs come from a grid hash, so only entities in neighbouring cells are ever compared.
+
+import itertools
+import math
+
+import numpy as np
+
+from entity_store import ARC_DTYPE, CIRCLE_DTYPE, EntityStore
+
+DEFAULT_TOLERANCE = 1e-2
+DEFAULT_ANGLE_TOLERANCE = 0.1
+
+
+# Cleans the store in place and returns how many entities/points each step changed
+def clean_geometry(store: EntityStore, tol: float = DEFAULT_TOLERANCE,
+                   angle_tol_deg: float = DEFAULT_ANGLE_TOLERANCE) -> dict:
+    report = {
+        "duplicate_circles": _drop_duplicate_circles(store, tol),
+        "contained_arcs": _drop_contained_arcs(store, tol, angle_tol_deg),
+    }
+    report["snapped_endpoints"], report["collapsed_lines"] = _snap_line_endpoints(store, tol)
+    report["merged_lines"] = _merge_collinear_lines(store, tol, angle_tol_deg)
+    report["merged_entities"] = (report["duplicate_circles"] + report["contained_arcs"]
+                                 + report["collapsed_lines"] + report["merged_lines"])
+    return report
+
+
+# Array of pairs (i, j), i < j, of rows whose coordinates differ by at most 1 in every column.
+# Coordinates must already be divided by their tolerance. Each row is bucketed into an integer grid
+# cell, and only rows in the same or a neighbouring cell are compared, using sorted cell hashes.
+def close_pairs(coords: np.ndarray) -> np.ndarray:
+    n, dims = coords.shape
+    if n < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    cells = np.floor(coords).astype(np.int64)
+    weights = _HASH_WEIGHTS[:dims]
+    # Integer overflow only causes hash collisions, and those are filtered by the distance check
+    with np.errstate(over="ignore"):
+        point_keys = (cells * weights).sum(axis=1)
+    order = np.argsort(point_keys, kind="stable")
+    unique_keys, first_index, key_counts = np.unique(point_keys[order], return_index=True, return_counts=True)
+
+    found = []
+    for offset in itertools.product((-1, 0, 1), repeat=dims):
+        with np.errstate(over="ignore"):
+            query = ((cells + np.array(offset)) * weights).sum(axis=1)
+        slot = np.minimum(np.searchsorted(unique_keys, query), len(unique_keys) - 1)
+        counts = np.where(unique_keys[slot] == query, key_counts[slot], 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        first = np.repeat(np.arange(n), counts)
+        position = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(first_index[slot], counts) + position]
+        keep = first < second
+        first, second = first[keep], second[keep]
+        close = np.all(np.abs(coords[first] - coords[second]) <= 1.0, axis=1)
+        found.append(np.column_stack([first[close], second[close]]))
+
+    if not found:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(found), axis=0)
+
+
+_HASH_WEIGHTS = np.array([73856093, 19349663, 83492791], dtype=np.int64)
+
+
+# Connected components of the graph given by pairs, labelled by their smallest row index
+def connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    labels = np.arange(n)
+    if len(pairs) == 0:
+        return labels
+    while True:
+        left, right = labels[pairs[:, 0]], labels[pairs[:, 1]]
+        low = np.minimum(left, right)
+        updated = labels.copy()
+        np.minimum.at(updated, left, low)
+        np.minimum.at(updated, right, low)
+        # Pointer jumping until every row points straight at its root
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+# Row indices grouped by label, only for labels shared by more than one row
+def _groups(labels: np.ndarray) -> list:
+    order = np.argsort(labels, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(labels[order]) != 0])
+    ends = np.r_[starts[1:], len(labels)]
+    shared = ends - starts > 1
+    return [order[start:end] for start, end in zip(starts[shared].tolist(), ends[shared].tolist())]
+
+
+def _drop_duplicate_circles(store: EntityStore, tol: float) -> int:
+    circles = store.circles
+    coords = np.column_stack([circles["center"], circles["radius"]]) / tol
+    keep = np.ones(len(circles), dtype=bool)
+    keep[close_pairs(coords)[:, 1]] = False
+    store.circles = circles[keep]
+    return int((~keep).sum())
+
+
+# An arc is dropped when a circle or a longer arc with the same center and radius already covers it
+def _drop_contained_arcs(store: EntityStore, tol: float, angle_tol_deg: float) -> int:
+    arcs = store.arcs
+    circles = store.circles
+    if len(arcs) == 0:
+        return 0
+
+    coords = np.concatenate([
+        np.column_stack([circles["center"], circles["radius"]]),
+        np.column_stack([arcs["center"], arcs["radius"]]),
+    ]) / tol
+    n_circles = len(circles)
+    sweep = np.mod(arcs["end_angle"] - arcs["start_angle"], 360.0)
+    sweep[sweep == 0] = 360.0
+
+    keep = np.ones(len(arcs), dtype=bool)
+    for i, j in close_pairs(coords).tolist():
+        if j < n_circles:
+            continue
+        if i < n_circles:
+            keep[j - n_circles] = False
+            continue
+        a, b = i - n_circles, j - n_circles
+        if not (keep[a] and keep[b]):
+            continue
+        if _arc_within(arcs, sweep, b, a, angle_tol_deg):
+            keep[b] = False
+        elif _arc_within(arcs, sweep, a, b, angle_tol_deg):
+            keep[a] = False
+
+    store.arcs = arcs[keep]
+    return int((~keep).sum())
+
+
+def _arc_within(arcs: np.ndarray, sweep: np.ndarray, inner: int, outer: int, angle_tol_deg: float) -> bool:
+    offset = (arcs["start_angle"][inner] - arcs["start_angle"][outer]) % 360.0
+    if offset > 360.0 - angle_tol_deg:
+        offset -= 360.0
+    return offset >= -angle_tol_deg and offset + sweep[inner] <= sweep[outer] + angle_tol_deg
+
+
+def _normalize(angle: np.ndarray) -> np.ndarray:
+    return np.mod(angle, 360.0)
+
+
+# Unions (start, end) angle intervals with end > start, start in [0, 360), including the join across 0 degrees
+def _union_intervals(intervals: list, tol: float) -> list:
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + tol:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    if len(merged) > 1 and merged[-1][1] + tol >= merged[0][0] + 360.0:
+        first = merged.pop(0)
+        merged[-1][1] = max(merged[-1][1], first[1] + 360.0)
+    return merged
+
+
+# Joins arcs that lie on the same circle and overlap or touch. Arcs covering the whole circle, or lying on a circle
+# that is already there, are replaced by that circle. Returns how many entities were removed.
+def join_arcs(store: EntityStore, tol: float = DEFAULT_TOLERANCE, angle_tol_deg: float = DEFAULT_ANGLE_TOLERANCE) -> int:
+    arcs, circles = store.arcs, store.circles
+    if len(arcs) == 0:
+        return 0
+    n_arcs = len(arcs)
+    coords = np.concatenate([
+        np.column_stack([arcs["center"], arcs["radius"]]),
+        np.column_stack([circles["center"], circles["radius"]]),
+    ]) / tol
+    labels = connected_components(len(coords), close_pairs(coords))
+
+    new_arcs, new_circles = [], []
+    for label in np.unique(labels[:n_arcs]):
+        members = np.flatnonzero(labels == label)
+        arc_rows = members[members < n_arcs]
+        if len(members) > len(arc_rows):
+            # On an existing circle, which covers these arcs already
+            continue
+        group = arcs[arc_rows]
+        center = group["center"].mean(axis=0)
+        radius = float(group["radius"].mean())
+        start = _normalize(group["start_angle"])
+        sweep = _normalize(group["end_angle"] - group["start_angle"])
+        sweep[sweep == 0] = 360.0
+        merged = _union_intervals(list(zip(start, start + sweep)), angle_tol_deg)
+        if any(end - begin >= 360.0 - angle_tol_deg for begin, end in merged):
+            new_circles.append((center[0], center[1], radius))
+            continue
+        new_arcs.extend((center[0], center[1], radius, begin, end % 360.0) for begin, end in merged)
+
+    before = len(store)
+    store.arcs = np.zeros(len(new_arcs), ARC_DTYPE)
+    if new_arcs:
+        rows = np.array(new_arcs, dtype="f8")
+        store.arcs["center"], store.arcs["radius"] = rows[:, :2], rows[:, 2]
+        store.arcs["start_angle"], store.arcs["end_angle"] = rows[:, 3], rows[:, 4]
+    if new_circles:
+        added = np.zeros(len(new_circles), CIRCLE_DTYPE)
+        rows = np.array(new_circles, dtype="f8")
+        added["center"], added["radius"] = rows[:, :2], rows[:, 2]
+        store.circles = np.concatenate([circles, added])
+    return before - len(store)
+
+
+# Line endpoints closer than tol are moved to a shared point. Arc endpoints take part as fixed
+# anchors: lines snap onto them, because moving an arc end would mean changing its angles.
+# Returns the number of moved endpoints and the number of lines that collapsed to a point.
+def _snap_line_endpoints(store: EntityStore, tol: float) -> tuple:
+    lines = store.lines
+    arcs = store.arcs
+    n_line_points = 2 * len(lines)
+    if n_line_points == 0:
+        return 0, 0
+
+    start = np.radians(arcs["start_angle"])
+    end = np.radians(arcs["end_angle"])
+    radius = arcs["radius"][:, None]
+    anchors = np.concatenate([
+        arcs["center"] + radius * np.column_stack([np.cos(start), np.sin(start)]),
+        arcs["center"] + radius * np.column_stack([np.cos(end), np.sin(end)]),
+    ])
+    points = np.concatenate([lines["start"], lines["end"], anchors])
+
+    pairs = close_pairs(points / tol)
+    pairs = pairs[np.hypot(*(points[pairs[:, 0]] - points[pairs[:, 1]]).T) <= tol]
+    labels = connected_components(len(points), pairs)
+
+    # Anchors have the highest indices, so a group containing one uses it as its target
+    is_anchor = np.arange(len(points)) >= n_line_points
+    targets = np.zeros_like(points)
+    counts = np.bincount(labels, minlength=len(points)).astype("f8")
+    np.add.at(targets, labels, points)
+    targets /= np.maximum(counts, 1.0)[:, None]
+    anchor_rows = np.flatnonzero(is_anchor)
+    targets[labels[anchor_rows]] = points[anchor_rows]
+
+    snapped = targets[labels[:n_line_points]]
+    moved = np.any(snapped != points[:n_line_points], axis=1)
+    lines["start"] = snapped[:len(lines)]
+    lines["end"] = snapped[len(lines):]
+
+    # Snapping can collapse very short lines to a point
+    nonzero = np.any(lines["start"] != lines["end"], axis=1)
+    store.lines = lines[nonzero]
+    return int(moved.sum()), int((~nonzero).sum())
+
+
+# Collinear lines whose extents overlap are replaced by a single line covering all of them
+def _merge_collinear_lines(store: EntityStore, tol: float, angle_tol_deg: float) -> int:
+    lines = store.lines
+    if len(lines) < 2:
+        return 0
+
+    delta = lines["end"] - lines["start"]
+    theta = np.mod(np.arctan2(delta[:, 1], delta[:, 0]), math.pi)
+    normal = np.column_stack([-np.sin(theta), np.cos(theta)])
+    rho = np.einsum("ij,ij->i", lines["start"], normal)
+
+    # A line at almost 180 degrees is the same as one at almost 0 with the opposite offset,
+    # so lines near the wrap are added a second time on the other side
+    angle_tol = math.radians(angle_tol_deg)
+    wrap = np.flatnonzero(theta > math.pi - angle_tol)
+    coords = np.concatenate([
+        np.column_stack([theta / angle_tol, rho / tol]),
+        np.column_stack([(theta[wrap] - math.pi) / angle_tol, -rho[wrap] / tol]),
+    ])
+    owner = np.concatenate([np.arange(len(lines)), wrap])
+
+    labels = connected_components(len(lines), owner[close_pairs(coords)])
+
+    keep = np.ones(len(lines), dtype=bool)
+    for members in _groups(labels):
+        _merge_group(lines, members, keep, tol)
+
+    store.lines = lines[keep]
+    return int((~keep).sum())
+
+
+def _merge_group(lines: np.ndarray, members: np.ndarray, keep: np.ndarray, tol: float):
+    lengths = np.hypot(*(lines["end"][members] - lines["start"][members]).T)
+    ref = members[np.argmax(lengths)]
+    origin = lines["start"][ref]
+    direction = (lines["end"][ref] - origin) / lengths.max()
+
+    t0 = (lines["start"][members] - origin) @ direction
+    t1 = (lines["end"][members] - origin) @ direction
+    lo = np.minimum(t0, t1)
+    hi = np.maximum(t0, t1)
+    order = np.argsort(lo)
+
+    current = members[order[0]]
+    current_lo, current_hi = lo[order[0]], hi[order[0]]
+    for k in order[1:]:
+        if lo[k] < current_hi - tol:
+            # Overlapping, extend the current line and drop this one
+            if hi[k] > current_hi:
+                current_hi = hi[k]
+            keep[members[k]] = False
+            continue
+        _set_line(lines, current, origin, direction, current_lo, current_hi)
+        current, current_lo, current_hi = members[k], lo[k], hi[k]
+    _set_line(lines, current, origin, direction, current_lo, current_hi)
+
+
+def _set_line(lines: np.ndarray, row: int, origin: np.ndarray, direction: np.ndarray, lo: float, hi: float):
+    # Only rewrite lines that actually grew, untouched lines keep their exact coordinates
+    start, end = lines["start"][row], lines["end"][row]
+    t_start, t_end = (start - origin) @ direction, (end - origin) @ direction
+    if abs(min(t_start, t_end) - lo) <= 1e-12 and abs(max(t_start, t_end) - hi) <= 1e-12:
+        return
+    if t_start <= t_end:
+        lines["start"][row] = origin + direction * lo
+        lines["end"][row] = origin + direction * hi
+    else:
+        lines["start"][row] = origin + direction * hi
+        lines["end"][row] = origin + direction * lo
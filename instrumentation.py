@@ -0,0 +1,193 @@
+#Per-call timing and token instrumentation for the extractors.
+#An extractor decorated with @instrumented gets a CallRecord for the duration of the call. The shared helpers
+#(preprocess_image, generate_text, stream_text) and the stage() blocks in the scripts add their timings to it:
+#image_load, preprocess, model, json_parse, dxf_write, plus upload bytes and prompt/response token counts.
+#A call that raises or returns None is recorded with status "error".
+#Finished records are appended to a JSON-lines log, and running totals are written as a Prometheus text file
+#(for the node_exporter textfile collector).
+#
+#   AUTOLAB_METRICS=0 turns it off, AUTOLAB_METRICS_DIR sets where the two files go (default: current directory)
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LOG_FILENAME = "autolab_metrics.jsonl"
+PROMETHEUS_FILENAME = "autolab_metrics.prom"
+
+_local = threading.local()
+
+
+class CallRecord:
+    def __init__(self, function: str, image_path: str = None):
+        self.function = function
+        self.image_path = image_path
+        self.started = time.time()
+        self.stages = {}
+        self.values = {}
+        self.error = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.error = f"{name}: {type(e).__name__}: {e}"
+            raise
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_value(self, name: str, value):
+        self.values[name] = self.values.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        return {
+            "timestamp": self.started,
+            "function": self.function,
+            "image_path": self.image_path,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "stages": self.stages,
+            **self.values,
+        }
+
+
+def current_record():
+    return getattr(_local, "record", None)
+
+
+# Times the block as a stage of the current call; does nothing outside an instrumented call
+@contextmanager
+def stage(name: str):
+    record = current_record()
+    if record is None:
+        yield
+        return
+    with record.stage(name):
+        yield
+
+
+def add_time(name: str, seconds: float):
+    record = current_record()
+    if record is not None:
+        record.add_time(name, seconds)
+
+
+def add_value(name: str, value):
+    record = current_record()
+    if record is not None:
+        record.add_value(name, value)
+
+
+# Token counts from a response's usage_metadata (Gemini responses and ReplayBackend both have it)
+def add_usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    add_value("prompt_tokens", getattr(usage, "prompt_token_count", 0) or 0)
+    add_value("response_tokens", getattr(usage, "candidates_token_count", 0) or 0)
+
+
+class MetricsSink:
+    def __init__(self, directory: str = "."):
+        self.log_path = os.path.join(directory, LOG_FILENAME)
+        self.prometheus_path = os.path.join(directory, PROMETHEUS_FILENAME)
+        self.calls = {}
+        self.stage_seconds = {}
+        self.stage_counts = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def write(self, record: CallRecord):
+        line = json.dumps(record.to_dict())
+        status = "error" if record.error else "ok"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a") as f:
+                f.write(line + "\n")
+
+            key = (record.function, status)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            for name, seconds in record.stages.items():
+                key = (record.function, name)
+                self.stage_seconds[key] = self.stage_seconds.get(key, 0.0) + seconds
+                self.stage_counts[key] = self.stage_counts.get(key, 0) + 1
+            for name, value in record.values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    key = (record.function, name)
+                    self.totals[key] = self.totals.get(key, 0) + value
+            self._write_prometheus()
+
+    def _write_prometheus(self):
+        lines = [
+            "# HELP autolab_calls_total Extraction calls by function and status",
+            "# TYPE autolab_calls_total counter",
+        ]
+        for (function, status), count in sorted(self.calls.items()):
+            lines.append(f'autolab_calls_total{{function="{function}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP autolab_stage_seconds Time spent in each stage of an extraction call",
+            "# TYPE autolab_stage_seconds summary",
+        ]
+        for (function, name), seconds in sorted(self.stage_seconds.items()):
+            labels = f'function="{function}",stage="{name}"'
+            lines.append(f"autolab_stage_seconds_sum{{{labels}}} {seconds:.6f}")
+            lines.append(f"autolab_stage_seconds_count{{{labels}}} {self.stage_counts[(function, name)]}")
+
+        lines += [
+            "# HELP autolab_total Running totals of recorded values (upload bytes, tokens, cache hits)",
+            "# TYPE autolab_total counter",
+        ]
+        for (function, name), value in sorted(self.totals.items()):
+            lines.append(f'autolab_total{{function="{function}",name="{name}"}} {value}')
+
+        # Written to a temporary file and renamed, so a scraper never reads half a file
+        tmp_path = self.prometheus_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prometheus_path)
+
+
+default_sink = None if os.environ.get("AUTOLAB_METRICS") == "0" else MetricsSink(
+    os.environ.get("AUTOLAB_METRICS_DIR", "."))
+
+
+# Records one CallRecord per call of the decorated extractor. The first argument is taken as the image path.
+def instrumented(function=None, sink=None):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            target = sink or default_sink
+            if target is None:
+                return fn(*args, **kwargs)
+
+            # Only a path (or a list of paths) is recorded, some instrumented helpers take an image as first argument
+            subject = args[0] if args else kwargs.get("image_path")
+            record = CallRecord(fn.__name__, subject if isinstance(subject, (str, list)) else None)
+            previous = current_record()
+            _local.record = record
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+                # The extractors catch their own exceptions and return None when they fail
+                if result is None:
+                    record.error = record.error or "returned no data"
+                return result
+            except Exception as e:
+                record.error = record.error or f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                record.add_time("total", time.perf_counter() - start)
+                _local.record = previous
+                target.write(record)
+        return wrapper
+
+    return decorate(function) if function is not None else decorate
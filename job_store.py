@@ -0,0 +1,113 @@
+#Persistent record of a directory run, so an interrupted batch can pick up where it stopped.
+#One SQLite row per image with its content hash, status, attempt count, output paths and timing.
+#   pending -> running -> done | failed
+#A rerun skips images that are done (unless the file changed or the output is gone), runs pending ones and
+#ones left running by a crash, and leaves failed ones alone until requeue_failed() puts them back.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB = "autolab_jobs.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    image_path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output_paths TEXT,
+    error TEXT,
+    seconds REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class JobStore:
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        # One connection shared by the worker threads, every statement runs under the lock
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # Registers the images. A known image whose content changed goes back to pending.
+    def add(self, image_paths: list):
+        now = time.time()
+        hashes = [(path, content_hash(path)) for path in image_paths]
+        with self._lock:
+            self._db.execute("BEGIN")
+            for path, digest in hashes:
+                row = self._db.execute("SELECT content_hash FROM jobs WHERE image_path = ?", (path,)).fetchone()
+                if row is None:
+                    self._db.execute(
+                        "INSERT INTO jobs (image_path, content_hash, status, created, updated) VALUES (?, ?, 'pending', ?, ?)",
+                        (path, digest, now, now))
+                elif row[0] != digest:
+                    self._db.execute(
+                        "UPDATE jobs SET content_hash = ?, status = 'pending', attempts = 0, error = NULL, updated = ? "
+                        "WHERE image_path = ?", (digest, now, path))
+            self._db.execute("COMMIT")
+
+    # The images out of image_paths that still need to run, in the given order
+    def todo(self, image_paths: list) -> list:
+        rows = {path: (status, outputs) for path, status, outputs in
+                self._execute("SELECT image_path, status, output_paths FROM jobs")}
+        out = []
+        for path in image_paths:
+            status, outputs = rows.get(path, ("pending", None))
+            if status in ("pending", "running"):
+                out.append(path)
+            elif status == "done" and not all(os.path.exists(p) for p in json.loads(outputs or "[]")):
+                out.append(path)
+        return out
+
+    def start(self, image_path: str):
+        self._execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, updated = ? WHERE image_path = ?",
+                      (time.time(), image_path))
+
+    def finish(self, image_path: str, output_paths: list, error: str = None, seconds: float = None):
+        self._execute(
+            "UPDATE jobs SET status = ?, output_paths = ?, error = ?, seconds = ?, updated = ? WHERE image_path = ?",
+            ("failed" if error else "done", json.dumps(output_paths), error, seconds, time.time(), image_path))
+
+    # Puts failed images (all of them, or the given ones) back to pending, returns how many
+    def requeue_failed(self, image_paths: list = None) -> int:
+        sql = "UPDATE jobs SET status = 'pending', error = NULL, updated = ? WHERE status = 'failed'"
+        with self._lock:
+            if image_paths is None:
+                return self._db.execute(sql, (time.time(),)).rowcount
+            now = time.time()
+            return sum(self._db.execute(sql + " AND image_path = ?", (now, path)).rowcount for path in image_paths)
+
+    # Forgets every image, so the next run starts over
+    def clear(self) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM jobs").rowcount
+
+    def failed(self) -> list:
+        return self._execute("SELECT image_path, attempts, error FROM jobs WHERE status = 'failed' ORDER BY image_path")
+
+    def counts(self) -> dict:
+        return dict(self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
@@ -0,0 +1,182 @@
+#Finds and parses the JSON object in a model response, repairing the usual defects instead of failing.
+#Handles responses with or without a ```json block and with text around it. When plain json.loads fails, a single
+#pass over the text rewrites it into valid JSON:
+#   - trailing commas before } or ]
+#   - single-quoted strings (as in the prompt examples), unquoted keys, Python True/False/None, // and /* */ comments
+#   - a response cut off mid-way: the text is cut back to the last complete value and the open brackets are
+#     closed. A list item that is an object (e.g. an entity) is kept only if it is complete, a half-written one
+#     is dropped whole, even when it is the first item.
+
+import json
+import re
+
+FENCE = "```json"
+LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null",
+            "NaN": "null", "Infinity": "null", "-Infinity": "null"}
+_TOKEN_CHARS = frozenset("+-._")
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"[\w+\-.]+")
+_STRINGS = {'"': re.compile(r'"(?:[^"\\]|\\.)*"', re.S), "'": re.compile(r"'(?:[^'\\]|\\.)*'", re.S)}
+_decoder = json.JSONDecoder()
+
+
+# Index of the first { or [ of the JSON, looking inside the ```json block if there is one
+def find_json_start(raw_text: str) -> int:
+    fence = raw_text.find(FENCE)
+    start = fence + len(FENCE) if fence != -1 else 0
+    candidates = [i for i in (raw_text.find("{", start), raw_text.find("[", start)) if i != -1]
+    return min(candidates) if candidates else -1
+
+
+# Returns the parsed JSON in raw_text. Raises json.JSONDecodeError if there is nothing usable in it.
+def parse_model_json(raw_text: str):
+    data, repairs = parse_with_repairs(raw_text)
+    if repairs:
+        print(f"Repaired model JSON: {', '.join(repairs)}")
+    return data
+
+
+# Like parse_model_json, also returns the list of repairs that were needed (empty for valid JSON)
+def parse_with_repairs(raw_text: str):
+    start = find_json_start(raw_text)
+    if start == -1:
+        raise json.JSONDecodeError("No JSON object found in the response", raw_text, 0)
+
+    # Valid JSON is handled by the C decoder; anything after the closing bracket (like the closing fence) is ignored
+    try:
+        data, _ = _decoder.raw_decode(raw_text, start)
+        return data, []
+    except json.JSONDecodeError:
+        pass
+
+    repaired, repairs = repair_json(raw_text, start)
+    try:
+        return json.loads(repaired), repairs
+    except json.JSONDecodeError as e:
+        raise json.JSONDecodeError(f"Could not repair JSON ({e.msg})", raw_text, start) from e
+
+
+class _Container:
+    __slots__ = ("closer", "expect_key", "is_record", "before")
+
+    def __init__(self, closer: str, is_record: bool, before: tuple):
+        self.closer = closer
+        self.expect_key = closer == "}"
+        # An object that is an item of a list, like one entity
+        self.is_record = is_record
+        # The cut point just before the container was opened
+        self.before = before
+
+
+# Rewrites the JSON starting at text[start] into valid JSON in one pass. Returns (json text, repairs).
+def repair_json(text: str, start: int = 0):
+    out = []
+    stack = []
+    repairs = set()
+    # Where to cut if the text ends early: (length of out, closers to append). Moved after every complete value
+    # and every opening bracket; a list item that is still open at the end overrides it (see below).
+    cut = None
+    n = len(text)
+    i = start
+
+    def complete():
+        nonlocal cut
+        cut = (len(out), "".join(c.closer for c in reversed(stack)))
+
+    def drop_trailing_comma():
+        j = len(out) - 1
+        while j >= 0 and out[j].isspace():
+            j -= 1
+        if j >= 0 and out[j] == ",":
+            del out[j]
+            repairs.add("trailing commas")
+
+    while i < n:
+        ch = text[i]
+        top = stack[-1] if stack else None
+
+        if ch.isspace():
+            end = _WHITESPACE.match(text, i).end()
+            out.append(text[i:end])
+            i = end
+        elif ch == "{" or ch == "[":
+            before = (len(out), "".join(c.closer for c in reversed(stack)))
+            stack.append(_Container("}" if ch == "{" else "]", ch == "{" and top is not None and top.closer == "]",
+                                    before))
+            out.append(ch)
+            i += 1
+            complete()
+        elif ch == "}" or ch == "]":
+            if top is None:
+                break
+            drop_trailing_comma()
+            stack.pop()
+            out.append(top.closer)
+            i += 1
+            if not stack:
+                return "".join(out), sorted(repairs)
+            complete()
+        elif ch == ",":
+            out.append(",")
+            if top is not None and top.closer == "}":
+                top.expect_key = True
+            i += 1
+        elif ch == ":":
+            out.append(":")
+            if top is not None:
+                top.expect_key = False
+            i += 1
+        elif ch == '"' or ch == "'":
+            match = _STRINGS[ch].match(text, i)
+            # An unterminated string means the text was cut off inside it
+            if match is None:
+                break
+            if ch == "'":
+                repairs.add("single quotes")
+                body = match.group()[1:-1].replace("\\'", "'").replace('"', '\\"')
+                out.append('"' + body + '"')
+            else:
+                out.append(match.group())
+            i = match.end()
+            if top is not None and top.expect_key:
+                continue
+            complete()
+        elif ch == "/" and i + 1 < n and text[i + 1] in "/*":
+            repairs.add("comments")
+            if text[i + 1] == "/":
+                end = text.find("\n", i)
+                i = n if end == -1 else end
+            else:
+                end = text.find("*/", i + 2)
+                i = n if end == -1 else end + 2
+        elif ch in _TOKEN_CHARS or ch.isalnum():
+            end = _TOKEN.match(text, i).end()
+            token = text[i:end]
+            # A number or word running into the end of the text may be cut short
+            if end >= n:
+                break
+            i = end
+            if top is not None and top.expect_key:
+                repairs.add("unquoted keys")
+                out.append(json.dumps(token))
+                continue
+            if token in LITERALS:
+                if LITERALS[token] != token:
+                    repairs.add("python literals")
+                out.append(LITERALS[token])
+            else:
+                out.append(token)
+            complete()
+        else:
+            # Stray characters such as the closing ``` of a fence
+            i += 1
+
+    repairs.add("truncated")
+    if cut is None:
+        return "".join(out), sorted(repairs)
+    # Cut off inside a list item: drop the outermost unfinished one, with everything written into it
+    records = [c for c in stack if c.is_record]
+    length, closers = records[0].before if records else cut
+    del out[length:]
+    drop_trailing_comma()
+    return "".join(out) + closers, sorted(repairs)
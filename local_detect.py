@@ -0,0 +1,509 @@
+#Local detection of straight lines and full circles in clean line art, so the model only has to supply the rest.
+#The drawing is thresholded against the local mean brightness; lines are found with a Hough transform over the ink
+#pixels (votes accumulated with np.bincount, peaks taken one at a time and their pixels removed from the
+#accumulator), and the ink left over is split into connected components, which are tested as circles with a
+#least-squares fit and angular coverage. Lines that end in an arrowhead (dimension lines, leaders) and the extension
+#lines their arrows point at are dimensioning, not geometry: they are left out of the entities.
+#
+#The local pass cannot read the dimensions, so it works in pixels, and it cannot fit arcs, fillets or free curves.
+#extract_with_local_pass keeps the lines and circles it found and asks the model only for what is missing: the
+#image goes out with the found entities listed, and the model answers with the ids of listed entities that are not
+#geometry after all (annotation the detector took for lines), the entities that are not listed (in the same pixel
+#coordinates) and the drawing units per pixel, read off the dimensions. That answer is a fraction of a full
+#extraction. The model call is skipped altogether when the local entities explain the ink (at least min_coverage
+#of it; text, dimensions and unexplained shapes count against it) and the caller gives units_per_pixel. When the
+#local pass finds too little, or the model's answer is unusable, the whole drawing is extracted by the model
+#(sixthTask3.extract_json) instead.
+#The result uses the {"entities": [...]} schema of json_to_dxf in drawing units, origin at the bottom-left corner
+#of the geometry and y up, like the model path.
+
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from dxf_writer import json_to_dxf
+from entity_binary import write_output
+from entity_store import CIRCLE_DTYPE, LINE_DTYPE, EntityStore
+from geometry_cleanup import connected_components
+from instrumentation import instrumented, stage
+from json_extract import parse_model_json
+from prompts import CAD_GEOMETRY_V2, prompt_parts
+from reconstruction_quality import distance_transform
+from response_cache import generate_text
+
+DEFAULT_MAX_EDGE = 1200
+DEFAULT_MIN_COVERAGE = 0.95
+# Below this share of the ink explained the local entities are not worth keeping, the model extracts everything
+MIN_PARTIAL_COVERAGE = 0.3
+THETA_STEP_DEG = 0.5
+# Share of a candidate line's length that must be ink
+MIN_LINE_FILL = 0.7
+# Share of the sectors around a fitted circle that must have ink (5 degree sectors, fewer on circles too small
+# to put a pixel in each)
+MIN_CIRCLE_COVERAGE = 0.9
+# Hough peaks that turned out not to be lines before giving up
+MAX_MISSES = 2000
+# Smallest component (bounding box diagonal, pixels) tried as a circle
+MIN_CIRCLE_SIZE = 14.0
+# Pixels of arrowhead needed on each side of a line end, per pixel of arrow length and stroke width
+MIN_ARROW_FILL = 0.1
+# Circles smaller than this share of the image diagonal may be letters. They are text when a component of
+# TEXT_SIZE_RATIO to 1 / TEXT_SIZE_RATIO times their size is less than TEXT_GAP times their size away (outside
+# their box, not inside it like a concentric circle)
+MAX_TEXT_SIZE = 0.03
+TEXT_SIZE_RATIO = 0.5
+TEXT_GAP = 0.5
+# Local threshold: window radius in pixels, and how much darker than the window mean (grey levels) ink is
+INK_RADIUS = 10
+INK_CONTRAST = 40
+
+
+# Mean of a over the (2 * radius + 1) square around each pixel, from an integral image
+def box_mean(a: np.ndarray, radius: int) -> np.ndarray:
+    size = 2 * radius + 1
+    total = np.pad(a, radius + 1, mode="edge").cumsum(0).cumsum(1)
+    window = total[size:, size:] - total[:-size, size:] - total[size:, :-size] + total[:-size, :-size]
+    return window[:a.shape[0], :a.shape[1]] / (size * size)
+
+
+def load_image(image_path: str, max_edge: int = DEFAULT_MAX_EDGE) -> Image.Image:
+    img = ImageOps.exif_transpose(Image.open(image_path)).convert("L")
+    scale = min(1.0, max_edge / max(img.size))
+    if scale < 1.0:
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+    return img
+
+
+# Pixels clearly darker than their neighbourhood. A global threshold takes the shaded faces and the background
+# gradient of CAD screenshots for ink, a local one keeps the strokes drawn over them.
+def ink_mask(img: Image.Image) -> np.ndarray:
+    gray = np.asarray(img, dtype=np.float64)
+    return gray < box_mean(gray, INK_RADIUS) - INK_CONTRAST
+
+
+# Typical stroke width in pixels, from the distance between the middle of the strokes and the paper
+def stroke_width(mask: np.ndarray) -> float:
+    if not mask.any():
+        return 1.0
+    inside = distance_transform(~mask, cap=16)[mask]
+    return max(1.0, 2.0 * float(np.percentile(inside, 90)) - 1.0)
+
+
+class _Hough:
+    def __init__(self, xs: np.ndarray, ys: np.ndarray, shape: tuple):
+        self.thetas = np.radians(np.arange(0.0, 180.0, THETA_STEP_DEG))
+        self.cos, self.sin = np.cos(self.thetas), np.sin(self.thetas)
+        self.max_rho = int(math.ceil(math.hypot(*shape)))
+        self.n_rho = 2 * self.max_rho + 1
+        self.xs, self.ys = xs, ys
+        self.votes = np.zeros(len(self.thetas) * self.n_rho, dtype=np.int64)
+        self.vote(np.arange(len(xs)), 1)
+
+    # Adds (sign=1) or removes (sign=-1) the votes of the given pixels, in chunks to bound memory
+    def vote(self, indices: np.ndarray, sign: int):
+        offsets = np.arange(len(self.thetas)) * self.n_rho
+        for start in range(0, len(indices), 4096):
+            chunk = indices[start:start + 4096]
+            rho = np.rint(np.outer(self.xs[chunk], self.cos) + np.outer(self.ys[chunk], self.sin)).astype(np.int64)
+            cells = (rho + self.max_rho + offsets).ravel()
+            counts = np.bincount(cells, minlength=len(self.votes))
+            self.votes += counts if sign > 0 else -counts
+
+    def clear(self, t: int, rho: int, width: float):
+        reach = int(math.ceil(width))
+        for dt in (-1, 0, 1):
+            row = ((t + dt) % len(self.thetas)) * self.n_rho
+            low, high = max(0, rho - reach + self.max_rho), min(self.n_rho, rho + reach + self.max_rho + 1)
+            self.votes[row + low:row + high] = 0
+
+    def peak(self):
+        cell = int(np.argmax(self.votes))
+        t, r = divmod(cell, self.n_rho)
+        return cell, int(self.votes[cell]), t, r - self.max_rho
+
+
+# Splits sorted positions along a line into runs without gaps longer than max_gap
+def _runs(positions: np.ndarray, max_gap: float) -> list:
+    breaks = np.flatnonzero(np.diff(positions) > max_gap) + 1
+    return np.split(np.arange(len(positions)), breaks)
+
+
+# Returns the segments and, for every ink pixel (in np.nonzero order), the index of the segment it belongs to or -1
+def detect_lines(mask: np.ndarray, width: float, min_length: float, max_lines: int = 500):
+    ys, xs = np.nonzero(mask)
+    xs, ys = xs.astype(np.float64), ys.astype(np.float64)
+    hough = _Hough(xs, ys, mask.shape)
+    free = np.ones(len(xs), dtype=bool)
+    owner = np.full(len(xs), -1, dtype=np.int64)
+    lines = []
+    tolerance = width / 2 + 1
+    misses = 0
+
+    while len(lines) < max_lines and misses < MAX_MISSES:
+        cell, votes, t, rho = hough.peak()
+        if votes < min_length:
+            break
+        c, s = hough.cos[t], hough.sin[t]
+        near = np.flatnonzero(free & (np.abs(xs * c + ys * s - rho) <= tolerance))
+        along = ys[near] * c - xs[near] * s
+        order = np.argsort(along)
+        near, along = near[order], along[order]
+
+        found = False
+        for run in _runs(along, 2 * width + 2):
+            length = along[run[-1]] - along[run[0]]
+            # A real line is long and mostly ink along its length (a stroke of width w gives about w pixels per step)
+            if length < min_length or len(run) < MIN_LINE_FILL * length * max(1.0, width - 1):
+                continue
+            pixels = near[run]
+            segment = _fit_segment(xs[pixels], ys[pixels], width)
+            if segment is None:
+                continue
+            owner[pixels] = len(lines)
+            lines.append(segment)
+            free[pixels] = False
+            hough.vote(pixels, -1)
+            found = True
+        if not found:
+            # Nothing usable at this peak (a piece of a circle, or scattered pixels that happen to be collinear),
+            # stop it and its neighbours winning again
+            hough.clear(t, rho, width)
+            misses += 1
+    return lines, owner
+
+
+# Least-squares line through the pixels, from the first to the last pixel along it. Returns None when the pixels
+# bend away from the line by more than a quarter of a stroke (the part of a circle that grazes a Hough line).
+def _fit_segment(xs: np.ndarray, ys: np.ndarray, width: float):
+    center = np.array([xs.mean(), ys.mean()])
+    points = np.column_stack([xs, ys]) - center
+    direction, normal = np.linalg.svd(points, full_matrices=False)[2]
+    along = points @ direction
+    half = (along.max() - along.min()) / 2
+    bend = np.polyfit(along, points @ normal, 2)[0] * half * half
+    if abs(bend) > width / 4:
+        return None
+    return center + along.min() * direction, center + along.max() * direction
+
+
+# Labels of the 8-connected components of mask, -1 outside it
+def _components(mask: np.ndarray) -> np.ndarray:
+    index = np.full(mask.shape, -1, dtype=np.int64)
+    index[mask] = np.arange(int(mask.sum()))
+    h, w = mask.shape
+    pairs = []
+    # Right, down, down-right and down-left neighbours
+    for dy, dx in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        a = index[:h - dy, max(0, -dx):w - max(0, dx)]
+        b = index[dy:, max(0, dx):w + min(0, dx)]
+        both = (a >= 0) & (b >= 0)
+        pairs.append(np.column_stack([a[both], b[both]]))
+    labels = np.full(mask.shape, -1, dtype=np.int64)
+    labels[mask] = connected_components(int(mask.sum()), np.concatenate(pairs))
+    return labels
+
+
+# Algebraic circle fit: returns (cx, cy, r, mean absolute residual)
+def _fit_circle(xs: np.ndarray, ys: np.ndarray):
+    a = np.column_stack([xs, ys, np.ones_like(xs)])
+    b = -(xs ** 2 + ys ** 2)
+    (d, e, f), *_ = np.linalg.lstsq(a, b, rcond=None)
+    cx, cy = -d / 2, -e / 2
+    r2 = cx ** 2 + cy ** 2 - f
+    if r2 <= 0:
+        return None
+    r = math.sqrt(r2)
+    return cx, cy, r, float(np.abs(np.hypot(xs - cx, ys - cy) - r).mean())
+
+
+def _coverage(xs: np.ndarray, ys: np.ndarray, cx: float, cy: float, r: float) -> float:
+    count = int(np.clip(math.pi * r, 8, 72))
+    sectors = np.floor((np.arctan2(ys - cy, xs - cx) + math.pi) / (2 * math.pi) * count).astype(np.int64) % count
+    return len(np.unique(sectors)) / count
+
+
+# Pixels of ink within width of the circle, as (xs, ys)
+def _ring(ink: np.ndarray, cx: float, cy: float, r: float, width: float):
+    reach = r + width
+    top, left = max(0, int(cy - reach)), max(0, int(cx - reach))
+    window = ink[top:int(cy + reach) + 2, left:int(cx + reach) + 2]
+    ys, xs = np.nonzero(window)
+    xs, ys = xs + float(left), ys + float(top)
+    near = np.abs(np.hypot(xs - cx, ys - cy) - r) <= width
+    return xs[near], ys[near]
+
+
+# Whether the components in indices (together) have another component of about their size right next to them,
+# like a letter or digit among others (an O or 0 fits a circle well). Boxes are (xmin, ymin, xmax, ymax) rows.
+def _in_text_run(boxes: np.ndarray, indices: list) -> bool:
+    box = np.concatenate([boxes[indices, :2].min(axis=0), boxes[indices, 2:].max(axis=0)])
+    size = max(box[2] - box[0], box[3] - box[1]) + 1
+    sizes = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]) + 1
+    gaps = np.maximum(np.maximum(boxes[:, 0] - box[2], box[0] - boxes[:, 2]),
+                      np.maximum(boxes[:, 1] - box[3], box[1] - boxes[:, 3]))
+    near = (sizes >= TEXT_SIZE_RATIO * size) & (sizes <= size / TEXT_SIZE_RATIO) & (np.abs(gaps) <= TEXT_GAP * size)
+    near[indices] = False
+    return bool(near.any())
+
+
+# Full circles among the components of the ink left after line detection. Components that fit one circle
+# (a circle cut into arcs by a centre line) are combined. Components smaller than min_size (arrowheads) are not tried,
+# small circles in a run of text are letters. The angular coverage is measured on ink (default: mask), so a circle that lost short pieces
+# to lines running across it still counts as full.
+def detect_circles(mask: np.ndarray, width: float, min_size: float, ink: np.ndarray = None):
+    ink = mask if ink is None else ink
+    labels = _components(mask)
+    text_size = MAX_TEXT_SIZE * math.hypot(*mask.shape)
+    ys, xs = np.nonzero(mask)
+    comp = labels[ys, xs]
+    order = np.argsort(comp, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(comp[order]) != 0])
+    groups = np.split(order, starts[1:])
+    boxes = np.array([[xs[g].min(), ys[g].min(), xs[g].max(), ys[g].max()] for g in groups], dtype=np.float64)
+
+    fits = []
+    for i, group in enumerate(groups):
+        gx, gy = xs[group].astype(np.float64), ys[group].astype(np.float64)
+        if math.hypot(gx.max() - gx.min(), gy.max() - gy.min()) < min_size:
+            continue
+        fit = _fit_circle(gx, gy)
+        if fit is not None and fit[3] <= width:
+            fits.append([fit, group, i])
+
+    # Combine arcs of the same circle
+    circles = []
+    used = np.zeros(mask.shape, dtype=bool)
+    while fits:
+        (cx, cy, r, _), group, index = fits.pop(0)
+        members = [group]
+        indices = [index]
+        rest = []
+        for other in fits:
+            ox, oy, o_r, _ = other[0]
+            if math.hypot(ox - cx, oy - cy) <= 2 * width and abs(o_r - r) <= 2 * width:
+                members.append(other[1])
+                indices.append(other[2])
+            else:
+                rest.append(other)
+        pixels = np.concatenate(members)
+        px, py = xs[pixels].astype(np.float64), ys[pixels].astype(np.float64)
+        fit = _fit_circle(px, py)
+        fits_well = fit is not None and fit[3] <= width
+        if fits_well and 2 * fit[2] < text_size:
+            fits_well = not _in_text_run(boxes, indices)
+        if fits_well and _coverage(*_ring(ink, *fit[:3], width), *fit[:3]) >= MIN_CIRCLE_COVERAGE:
+            circles.append(fit[:3])
+            used[py.astype(np.int64), px.astype(np.int64)] = True
+            fits = rest
+        else:
+            fits = [f for f in fits if not any(f[1] is m for m in members)]
+    return circles, used
+
+
+# Whether the ink near the end of a line (start, going towards end) is an arrowhead: filled on both sides of the
+# line over the first arrow_length pixels. Text next to a line end lies beyond it or on one side only.
+def _has_arrowhead(start: np.ndarray, end: np.ndarray, xs: np.ndarray, ys: np.ndarray, width: float,
+                   arrow_length: float) -> bool:
+    u = (end - start) / max(np.linalg.norm(end - start), 1e-9)
+    along = (xs - start[0]) * u[0] + (ys - start[1]) * u[1]
+    across = (ys - start[1]) * u[0] - (xs - start[0]) * u[1]
+    near = (along >= -width) & (along <= arrow_length) & (np.abs(across) <= arrow_length / 2)
+    needed = max(3.0, MIN_ARROW_FILL * arrow_length * width)
+    return (near & (across > 0)).sum() >= needed and (near & (across < 0)).sum() >= needed
+
+
+def _distance_to_segment(point: np.ndarray, start: np.ndarray, end: np.ndarray) -> float:
+    d = end - start
+    t = np.clip(np.dot(point - start, d) / max(np.dot(d, d), 1e-9), 0.0, 1.0)
+    return float(np.linalg.norm(point - (start + t * d)))
+
+
+# Indices of the lines that are dimensioning: lines with an arrowhead at either end (dimension lines, leaders) and
+# lines about perpendicular to one that pass through the tip of its arrow (extension lines). residual is the ink
+# that is neither a line nor a circle, where the arrowheads are.
+def detect_dimensions(lines: list, residual: np.ndarray, width: float, arrow_length: float) -> set:
+    ys, xs = np.nonzero(residual)
+    xs, ys = xs.astype(np.float64), ys.astype(np.float64)
+    tips = []
+    for i, (start, end) in enumerate(lines):
+        for a, b in ((start, end), (end, start)):
+            if _has_arrowhead(a, b, xs, ys, width, arrow_length):
+                tips.append((i, a, b - a))
+    dimensions = {i for i, _, _ in tips}
+
+    reach = 2 * width + 1
+    for j, (start, end) in enumerate(lines):
+        if j in dimensions:
+            continue
+        direction = (end - start) / max(np.linalg.norm(end - start), 1e-9)
+        for i, tip, arrow_direction in tips:
+            cos = abs(np.dot(direction, arrow_direction)) / max(np.linalg.norm(arrow_direction), 1e-9)
+            if cos < 0.5 and _distance_to_segment(tip, start, end) <= reach:
+                dimensions.add(j)
+                break
+    return dimensions
+
+
+# Detects lines and circles in the image. Returns (store, report): the entities in pixels of img with the origin at
+# its bottom-left corner and y up, and how much of the ink they explain ("coverage"; dimensioning, text and anything
+# else left over count as not explained).
+def detect_entities(img: Image.Image):
+    mask = ink_mask(img)
+    width = stroke_width(mask)
+    diagonal = math.hypot(*mask.shape)
+    min_length = max(10.0, 0.03 * diagonal)
+
+    lines, owner = detect_lines(mask, width, min_length)
+    line_labels = np.full(mask.shape, -1, dtype=np.int64)
+    line_labels[mask] = owner
+    line_mask = line_labels >= 0
+    # Holes are often much smaller than the shortest line worth detecting, but should still be larger than the
+    # round letters and digits of the text
+    circles, circle_mask = detect_circles(mask & ~line_mask, width, max(MIN_CIRCLE_SIZE, 7 * width), mask)
+
+    arrow_length = max(8 * width, 0.015 * diagonal)
+    dimensions = detect_dimensions(lines, mask & ~line_mask & ~circle_mask, width, arrow_length)
+    geometry_mask = line_mask & ~np.isin(line_labels, list(dimensions))
+    lines = [line for i, line in enumerate(lines) if i not in dimensions]
+
+    ink = int(mask.sum())
+    explained = int((geometry_mask | circle_mask).sum())
+    report = {
+        "lines": len(lines),
+        "circles": len(circles),
+        "dimension_lines": len(dimensions),
+        "stroke_width_px": width,
+        "ink_pixels": ink,
+        "coverage": explained / ink if ink else 0.0,
+    }
+
+    # Pixel rows grow downwards, drawings grow upwards
+    height = mask.shape[0]
+    store = EntityStore(
+        lines=np.zeros(len(lines), LINE_DTYPE),
+        circles=np.zeros(len(circles), CIRCLE_DTYPE),
+    )
+    if lines:
+        ends = np.array([[start, end] for start, end in lines])
+        ends[:, :, 1] = height - ends[:, :, 1]
+        store.lines["start"], store.lines["end"] = ends[:, 0], ends[:, 1]
+    if circles:
+        fits = np.array(circles)
+        store.circles["center"] = np.column_stack([fits[:, 0], height - fits[:, 1]])
+        store.circles["radius"] = fits[:, 2]
+    return store, report
+
+
+COMPLETION_INSTRUCTIONS = """
+            **Partly extracted drawing:** The image is {width} x {height} pixels. The lines and circles below were
+            measured from it by a simple detector, in pixels with (0, 0) at the bottom-left corner of the image and
+            y pointing up. Ignore the origin rule above and use these same pixel coordinates. Do not repeat the
+            listed entities. Return:
+            - "entities": only the entities missing from the list (arcs, fillets, curves and anything else).
+            - "remove": the ids of listed entities that are not part of the object (dimension, extension, leader
+              or centre lines, text, or short lines that are really pieces of a curve).
+            - "units_per_pixel": the drawing units per pixel, worked out from the dimensions in the drawing.
+
+            Detected:
+            {entities}
+"""
+
+
+# Asks the model to check the local entities, add the ones the local pass did not find and give the scale.
+# Returns (store in pixels of img, drawing units per pixel). Raises ValueError when the answer is unusable.
+@instrumented
+def complete_with_model(img: Image.Image, found: EntityStore):
+    from sixthTask3 import model
+
+    listed = [{"id": i, "type": entity["type"],
+               "params": {k: np.round(v, 1).tolist() for k, v in entity["params"].items()}}
+              for i, entity in enumerate(found.to_json()["entities"])]
+    prompt = prompt_parts("cad_geometry", CAD_GEOMETRY_V2.version) + [COMPLETION_INSTRUCTIONS.format(width=img.width, height=img.height,
+                                                            entities=json.dumps(listed)), img]
+    data = generate_text(model, prompt, parse=_parse_completion)
+    scale = data["units_per_pixel"]
+
+    remove = {i for i in data.get("remove", []) if isinstance(i, int) and not isinstance(i, bool)}
+    keep = np.array([i not in remove for i in range(len(found))], dtype=bool)
+    missing = EntityStore.from_json(data)
+    missing.drop_invalid()
+    lines = len(found.lines)
+    store = EntityStore(
+        lines=np.concatenate([found.lines[keep[:lines]], missing.lines]),
+        circles=np.concatenate([found.circles[keep[lines:]], missing.circles]),
+        arcs=missing.arcs,
+        other=missing.other,
+    )
+    print(f"The model removed {int((~keep).sum())} and added {len(missing)} entities, "
+          f"{scale:.5g} drawing units per pixel")
+    return store, float(scale)
+
+
+# The model's answer to COMPLETION_INSTRUCTIONS, which must have a usable scale (raises ValueError otherwise, so
+# the answer is not cached)
+def _parse_completion(raw_text: str) -> dict:
+    data = parse_model_json(raw_text)
+    scale = data.get("units_per_pixel") if isinstance(data, dict) else None
+    if isinstance(scale, bool) or not isinstance(scale, (int, float)) or not math.isfinite(scale) or scale <= 0:
+        raise ValueError(f"no usable drawing scale ({scale!r})")
+    return data
+
+
+# Keeps the lines and circles the local pass finds and asks the model for the rest (see above). Writes the JSON and
+# DXF like the scripts do and returns the data, or None on failure. units_per_pixel is the drawing scale when the
+# caller knows it (pixels of the image downscaled to DEFAULT_MAX_EDGE); then a drawing the local entities explain
+# fully needs no model call.
+@instrumented
+def extract_with_local_pass(image_path: str, output_filename: str, min_coverage: float = DEFAULT_MIN_COVERAGE,
+                            units_per_pixel: float = None):
+    from sixthTask3 import extract_json
+
+    print(f"\n--- Analyzing image with a local pass first: {image_path} ---")
+    if not os.path.exists(image_path):
+        print(f"Error: Image file not found at {image_path}")
+        return None
+
+    with stage("local_detect"):
+        img = load_image(image_path)
+        store, report = detect_entities(img)
+    print(f"Local pass: {report['lines']} lines, {report['circles']} circles, "
+          f"{report['dimension_lines']} dimension lines, {report['coverage']:.1%} of the ink explained")
+
+    if not len(store) or report["coverage"] < MIN_PARTIAL_COVERAGE:
+        print("Too little found locally, the model extracts the whole drawing")
+        return extract_json(image_path, output_filename)
+
+    if report["coverage"] < min_coverage or units_per_pixel is None:
+        try:
+            store, model_scale = complete_with_model(img, store)
+        except Exception as e:
+            print(f"Completing the local entities failed ({type(e).__name__}: {e}), "
+                  f"the model extracts the whole drawing instead")
+            return extract_json(image_path, output_filename)
+        if not len(store):
+            print("Nothing left after the model's corrections, the model extracts the whole drawing")
+            return extract_json(image_path, output_filename)
+        if units_per_pixel is None:
+            units_per_pixel = model_scale
+    else:
+        print("The local entities explain the drawing, no model call")
+
+    store.shift_origin_to_bbox()
+    store.scale(units_per_pixel)
+    data = store.to_json()
+    write_output(data, output_filename)
+    with stage("dxf_write"):
+        json_to_dxf(data, output_filename.replace(".json", ".dxf"))
+    return data
+
+
+if __name__ == "__main__":
+    # python local_detect.py <image> [output json] [units per pixel]
+    image_file = sys.argv[1] if len(sys.argv) > 1 else r"D:\AutoLab\cad_image\circles.png"
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(os.path.basename(image_file))[0] + "_local.json"
+    scale_arg = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    extract_with_local_pass(image_file, output_file, units_per_pixel=scale_arg)
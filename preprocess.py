@@ -0,0 +1,107 @@
+#Shrinks drawings before they are sent to the model: grayscale, crop to the drawing, binarize and downscale.
+#Smaller images upload faster and use fewer tokens per request.
+#Only clean line drawings (screenshots, scans, exports: paper and ink with few grey pixels in between) are binarized
+#by default. Phone photos, shaded renders and coloured backgrounds are mostly grey, one global threshold would wipe
+#out parts of them, so they are only cropped and downscaled; binarize=True or False overrides the check.
+#Binarizing happens at full resolution, before the downscale, so the threshold is applied to the pixels it was
+#computed from.
+
+import io
+import os
+import time
+
+from PIL import Image, ImageOps
+
+from instrumentation import add_time, add_value
+
+DEFAULT_MAX_EDGE = 1600
+# Grey levels counted as neither paper nor ink, and the share of such pixels up to which an image is a line drawing
+MIDTONES = (48, 208)
+LINE_DRAWING_MAX_MIDTONES = 0.15
+
+
+# binarize=None binarizes line drawings only (see above)
+def preprocess_image(image_path: str, max_edge: int = DEFAULT_MAX_EDGE, binarize: bool = None,
+                     padding: int = 8) -> Image.Image:
+    start = time.perf_counter()
+    original = Image.open(image_path)
+    original.load()
+    before_bytes = os.path.getsize(image_path)
+    before_size = original.size
+    loaded = time.perf_counter()
+    add_time("image_load", loaded - start)
+
+    # Phone photos are often stored sideways with an EXIF rotation flag
+    img = ImageOps.exif_transpose(original).convert("L")
+    threshold = otsu_threshold(img)
+
+    # Dark pixels are ink, crop to their bounding box plus a small margin
+    ink = img.point(lambda v: 255 if v < threshold else 0)
+    bbox = ink.getbbox()
+    if bbox is not None:
+        left, top, right, bottom = bbox
+        img = img.crop((
+            max(left - padding, 0),
+            max(top - padding, 0),
+            min(right + padding, img.width),
+            min(bottom + padding, img.height),
+        ))
+
+    if binarize is None:
+        binarize = is_line_drawing(img)
+    if binarize:
+        img = img.point(lambda v: 255 if v >= threshold else 0)
+
+    longest = max(img.size)
+    if max_edge and longest > max_edge:
+        scale = max_edge / longest
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+
+    after_bytes = len(encode_for_upload(img))
+    add_time("preprocess", time.perf_counter() - loaded)
+    add_value("source_bytes", before_bytes)
+    add_value("upload_bytes", after_bytes)
+    print(f"Pre-processed {image_path}: {before_size[0]}x{before_size[1]} -> {img.width}x{img.height}, "
+          f"{before_bytes} -> {after_bytes} bytes{' (binarized)' if binarize else ''}")
+    return img
+
+
+# Whether a grayscale image is paper and ink with few grey pixels in between
+def is_line_drawing(img: Image.Image) -> bool:
+    hist = img.histogram()[:256]
+    total = sum(hist)
+    return total > 0 and sum(hist[MIDTONES[0]:MIDTONES[1]]) / total <= LINE_DRAWING_MAX_MIDTONES
+
+
+# Otsu's method on the grayscale histogram, picks the threshold that best separates ink from paper
+def otsu_threshold(img: Image.Image) -> int:
+    hist = img.histogram()[:256]
+    total = sum(hist)
+    sum_all = sum(i * count for i, count in enumerate(hist))
+
+    weight_bg = 0
+    sum_bg = 0
+    best_threshold = 128
+    best_variance = -1.0
+    for i, count in enumerate(hist):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = i + 1
+    return best_threshold
+
+
+# In-memory images are uploaded by the Gemini SDK as lossless WebP, so that is the size that matters
+def encode_for_upload(img: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format="webp", lossless=True)
+    return buffer.getvalue()
@@ -0,0 +1,200 @@
+#Versioned prompt templates for the extraction scripts.
+#A template is registered under a name and a version; a changed text is registered as a new version, so scripts
+#pin the wording they were tuned with and response cache entries (keyed on the prompt text) stay valid.
+#The instructions are sent inline, before the image. Server-side context caching is not used: the API only caches
+#contexts of at least 1024 tokens (gemini-2.5-flash, more for other models) and these templates are about 600, so
+#every request would fall back to the inline text anyway. Keeping the instructions first also keeps the shared
+#prefix the API's implicit caching looks for, should the templates grow past that size.
+
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: int
+    text: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, version: int, text: str) -> PromptTemplate:
+        template = PromptTemplate(name, version, text)
+        with self._lock:
+            if (name, version) in self._templates and self._templates[(name, version)].text != text:
+                raise ValueError(f"Prompt {template.key} is already registered with a different text, "
+                                 f"register the change as a new version")
+            self._templates[(name, version)] = template
+        return template
+
+    # The given version, or the latest one
+    def get(self, name: str, version: int = None) -> PromptTemplate:
+        if version is None:
+            versions = [v for (n, v) in self._templates if n == name]
+            if not versions:
+                raise KeyError(f"No prompt registered as '{name}'")
+            version = max(versions)
+        return self._templates[(name, version)]
+
+
+registry = PromptRegistry()
+
+
+# The prompt parts to put before the per-call parts (the image) for the template
+def prompt_parts(name: str, version: int = None) -> list:
+    return [registry.get(name, version).text]
+
+
+# --- Templates ---
+# The texts are kept exactly as they were inline in the scripts, so earlier response cache entries still match.
+
+# sixthTask2
+CAD_GEOMETRY_V1 = registry.register("cad_geometry", 1, """
+            You are an expert CAD analyst and programmer specializing in converting 2D drawings into structured vector data readable by software like ezdxf. Your task is to analyze the provided CAD drawing image and extract detailed geometric information for each individual entity.
+
+            **Instructions & Rules:**
+            1.  **Coordinate System:** Assume the origin (0, 0) is at the bottom-left corner of the object's primary bounding box. All coordinates must be relative to this origin.
+            2.  **Output Format:** Your response MUST be a single, clean JSON object. Do not include any explanatory text, comments, or markdown formatting like ```json.
+            3.  **Entity Schema:** The JSON object must have a single root key "entities", which is a list of objects. Each object in the list represents a single geometric entity and must have two keys: "type" and "params".
+            4.  **Parameter Extraction:** Infer the geometric parameters (coordinates, radii, angles, etc.) as precisely as possible from the visual information and dimensions in the drawing. Angles are in degrees.
+
+            For an arc, you know that arc always rotates anti clockwise, so for C shaped arc, the start angle is 90 and the end angle is 270. Formirrored C, the start angle is 270 and the end angle is 90. 
+
+            **JSON Schema and Examples:**
+            {
+              "entities": [
+                {
+                  "type": "LINE",
+                  "params": {
+                    "start_point": [x1, y1],
+                    "end_point": [x2, y2]
+                  }
+                },
+                {
+                  "type": "CIRCLE",
+                  "params": {
+                    "center": [cx, cy],
+                    "radius": r
+                  }
+                },
+                {
+                  "type": "ARC",
+                  "params": {
+                    "center": [cx, cy],
+                    "radius": r,
+                    "start_angle": angle1,
+                    "end_angle": angle2
+                  }
+                }
+              ]
+            }
+
+            Now, analyze the attached image and generate the JSON output based on these instructions.
+            """)
+
+# sixthTask3: adds the semicircle angle rule
+CAD_GEOMETRY_V2 = registry.register("cad_geometry", 2, """
+            You are an expert CAD analyst and programmer specializing in converting 2D drawings into structured vector data readable by software like ezdxf. Your task is to analyze the provided CAD drawing image and extract detailed geometric information for each individual entity.
+
+            **Instructions & Rules:**
+            1.  **Coordinate System:** Assume the origin (0, 0) is at the bottom-left corner of the object's primary bounding box. All coordinates must be relative to this origin.
+            2.  **Output Format:** Your response MUST be a single, clean JSON object. Do not include any explanatory text, comments, or markdown formatting like ```json.
+            3.  **Entity Schema:** The JSON object must have a single root key "entities", which is a list of objects. Each object in the list represents a single geometric entity and must have two keys: "type" and "params".
+            4.  **Parameter Extraction:** Infer the geometric parameters (coordinates, radii, angles, etc.) as precisely as possible from the visual information and dimensions in the drawing. Angles are in degrees.
+
+            For an arc, you know that arc always rotates anti clockwise, so for C shaped arc, the start angle is 90 and the end angle is 270. For mirrored C, the start angle is 270 and the end angle is 90. 
+            For semi circle(top part) the start angle must be 0 and the end angle should be 180 whereas for bottom half, the start angle should be 180 and the end angle must be 0
+
+            **JSON Schema and Examples:**
+            {
+              "entities": [
+                {
+                  "type": "LINE",
+                  "params": {
+                    "start_point": [x1, y1],
+                    "end_point": [x2, y2]
+                  }
+                },
+                {
+                  "type": "CIRCLE",
+                  "params": {
+                    "center": [cx, cy],
+                    "radius": r
+                  }
+                },
+                {
+                  "type": "ARC",
+                  "params": {
+                    "center": [cx, cy],
+                    "radius": r,
+                    "start_angle": angle1,
+                    "end_angle": angle2
+                  }
+                }
+              ]
+            }
+
+            Now, analyze the attached image and generate the JSON output based on these instructions.
+            """)
+
+# fifthTask: the schema also has ANGULAR_DIMENSION entities
+CAD_GEOMETRY_ANGULAR_V1 = registry.register("cad_geometry_angular", 1, """
+            You are an expert CAD analyst and programmer specializing in converting 2D drawings into structured vector data readable by software like ezdxf. Your task is to analyze the provided CAD drawing image and extract detailed geometric information for each individual entity.
+
+            **Instructions & Rules:**
+            1.  **Coordinate System:** Assume the origin (0, 0) is at the bottom-left corner of the object's primary bounding box. All coordinates must be relative to this origin.
+            2.  **Output Format:** Your response MUST be a single, clean JSON object. Do not include any explanatory text, comments, or markdown formatting like ```json.
+            3.  **Entity Schema:** The JSON object must have a single root key "entities", which is a list of objects. Each object in the list represents a single geometric entity and must have two keys: "type" and "params".
+            4.  **Parameter Extraction:** Infer the geometric parameters (coordinates, radii, angles, etc.) as precisely as possible from the visual information and dimensions in the drawing. Angles are in degrees.
+
+            **JSON Schema and Examples:**
+
+            {
+              "entities": [
+                {
+                  "type": "LINE",
+                  "params": {
+                    "start_point": [x1, y1],
+                    "end_point": [x2, y2]
+                  }
+                },
+                {
+                  "type": "CIRCLE",
+                  "params": {
+                    "center": [cx, cy],
+                    "radius": r
+                  }
+                },
+                {
+                  "type": "ARC",
+                  "params": {
+                    "center": [cx, cy],
+                    "radius": r,
+                    "start_angle": angle1,
+                    "end_angle": angle2
+                  }
+                },
+                {
+                  "type": "ANGULAR_DIMENSION",
+                  "params": {
+                    "center": [x, y],
+                    "radius": r,
+                    "start_angle": angle1,
+                    "end_angle": angle2,
+                    "distance": d,
+                    "dimstyle": "EZ_CURVED"
+                  }
+                },
+              ]
+            }
+
+            Now, analyze the attached image and generate the JSON output based on these instructions.
+            """)
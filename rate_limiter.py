@@ -0,0 +1,174 @@
+#Shared scheduler in front of model calls, so batch runs go as fast as the quota allows without losing images.
+#   - token buckets for requests per minute and tokens per minute
+#   - at most `concurrency` calls in flight, adjusted AIMD-style: +1 after a run of successes, halved on a quota
+#     error (429) or an overloaded server (503)
+#   - quota errors (429) and server errors (5xx) are retried with exponential backoff and full jitter
+#
+#   AUTOLAB_RPM, AUTOLAB_TPM and AUTOLAB_MAX_CONCURRENCY set the limits, AUTOLAB_RATE_LIMIT=0 turns it off
+
+import os
+import random
+import threading
+import time
+
+from instrumentation import add_time, add_value
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Statuses that mean the service wants less traffic, the concurrency is halved on these
+THROTTLE_STATUS = {429, 503}
+# Gemini counts an image as 258 tokens; the response size is unknown up front, so a typical one is assumed
+IMAGE_TOKENS = 258
+EXPECTED_RESPONSE_TOKENS = 1000
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Blocks until amount is available and takes it. Requests larger than the bucket wait for a full bucket.
+    def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.rate
+            time.sleep(wait)
+
+    # Corrects an earlier estimate once the real amount is known; the balance may go negative
+    def adjust(self, amount: float):
+        with self._lock:
+            self._refill()
+            self.available -= amount
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float = 60, tokens_per_minute: float = 1_000_000,
+                 max_concurrency: int = 8, min_concurrency: int = 1, max_retries: int = 6,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.retries = 0
+        self.failures = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def _enter(self):
+        with self._condition:
+            while self.in_flight >= self.concurrency:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def _leave(self, status: str):
+        with self._condition:
+            self.in_flight -= 1
+            if status == "ok":
+                # Additive increase: one more slot after a full window of successful calls
+                self._successes += 1
+                if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                    self.concurrency += 1
+                    self._successes = 0
+            elif status == "throttled":
+                # Multiplicative decrease on quota and overload errors
+                self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+                self._successes = 0
+            self._condition.notify_all()
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # Ends a call started with call(..., hold=True); error is the exception that ended it, if any
+    def release(self, error: Exception = None):
+        if error is None:
+            self._leave("ok")
+        else:
+            self._leave("throttled" if error_status(error) in THROTTLE_STATUS else "error")
+
+    # Runs fn() within the limits and retries it on transient errors. Other errors, and the last
+    # transient one once max_retries is used up, are raised to the caller.
+    # With hold=True the concurrency slot stays taken after fn() returns, until release() is called
+    # (for streams, which are still in flight after the first chunk).
+    def call(self, fn, estimated_tokens: float = EXPECTED_RESPONSE_TOKENS, hold: bool = False):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            self._enter()
+            self.requests.acquire()
+            self.tokens.acquire(estimated_tokens)
+            add_time("rate_limit_wait", time.perf_counter() - start)
+            try:
+                result = fn()
+            except Exception as e:
+                status = error_status(e)
+                if status is None:
+                    self._leave("error")
+                    raise
+                self._leave("throttled" if status in THROTTLE_STATUS else "error")
+                if attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                self.retries += 1
+                add_value("retries", 1)
+                print(f"Model call failed with {status} ({type(e).__name__}), retry {attempt}/{self.max_retries} "
+                      f"in {delay:.1f}s, concurrency now {self.concurrency}")
+                time.sleep(delay)
+                add_time("rate_limit_wait", delay)
+                continue
+            if not hold:
+                self._leave("ok")
+            return result
+
+    # Charges the difference between the estimate and the real token count once a call has finished
+    def settle(self, estimated_tokens: float, response):
+        total = getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+        if total:
+            self.tokens.adjust(total - estimated_tokens)
+
+    def stats(self) -> dict:
+        return {"concurrency": self.concurrency, "in_flight": self.in_flight, "retries": self.retries,
+                "failures": self.failures}
+
+
+# HTTP status of a transient error, or None if the error should not be retried.
+# google.api_core errors carry the status in .code; dropped connections and timeouts count as 503.
+def error_status(error: Exception):
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code if code in RETRYABLE_STATUS else None
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return 503
+    return None
+
+
+# Prompt tokens (text at about 4 characters per token, images at a flat rate) plus the expected response
+def estimate_tokens(prompt) -> int:
+    parts = prompt if isinstance(prompt, (list, tuple)) else [prompt]
+    prompt_tokens = sum(len(part) // 4 if isinstance(part, str) else IMAGE_TOKENS for part in parts)
+    return prompt_tokens + EXPECTED_RESPONSE_TOKENS
+
+
+default_limiter = None if os.environ.get("AUTOLAB_RATE_LIMIT") == "0" else RateLimiter(
+    requests_per_minute=float(os.environ.get("AUTOLAB_RPM", "60")),
+    tokens_per_minute=float(os.environ.get("AUTOLAB_TPM", "1000000")),
+    max_concurrency=int(os.environ.get("AUTOLAB_MAX_CONCURRENCY", "8")),
+)
@@ -0,0 +1,229 @@
+#Scores how well an extracted entity set matches the drawing it came from.
+#The entities are rasterized into the source image's frame (after fitting scale and offset), then compared
+#with the binarized source: pixel IoU with a small tolerance, and chamfer distance via a distance transform.
+#Everything runs at a reduced working resolution with NumPy, so scoring takes milliseconds per drawing.
+
+import json
+import math
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from entity_store import EntityStore
+from preprocess import otsu_threshold
+
+DEFAULT_WORKING_EDGE = 256
+DEFAULT_TOLERANCE_PX = 2
+DISTANCE_CAP = 32
+
+
+# Binarized source image at working resolution, True where there is ink.
+# Thresholding happens at full resolution and the mask is then max-pooled, so thin lines survive downscaling.
+def source_mask(image_path: str, max_edge: int = DEFAULT_WORKING_EDGE) -> np.ndarray:
+    img = ImageOps.exif_transpose(Image.open(image_path)).convert("L")
+    threshold = otsu_threshold(img)
+    ink = img.point(lambda v: 255 if v < threshold else 0)
+    scale = min(1.0, max_edge / max(ink.size))
+    if scale < 1.0:
+        ink = ink.resize((max(1, round(ink.width * scale)), max(1, round(ink.height * scale))), Image.BOX)
+    return np.asarray(ink) > 0
+
+
+# Euclidean distance from every pixel to the nearest True pixel, capped at cap pixels.
+# First the distance along each column, then the exact minimum over horizontal offsets up to cap.
+def distance_transform(mask: np.ndarray, cap: int = DISTANCE_CAP) -> np.ndarray:
+    h, w = mask.shape
+    rows = np.arange(h)[:, None]
+    far = h + w
+    above = np.maximum.accumulate(np.where(mask, rows, -far), axis=0)
+    below = np.minimum.accumulate(np.where(mask, rows, 2 * far)[::-1], axis=0)[::-1]
+    g2 = np.minimum(np.minimum(rows - above, below - rows), cap).astype(np.float32) ** 2
+
+    out = g2.copy()
+    for d in range(1, min(cap, w - 1) + 1):
+        d2 = np.float32(d * d)
+        np.minimum(out[:, d:], g2[:, :-d] + d2, out=out[:, d:])
+        np.minimum(out[:, :-d], g2[:, d:] + d2, out=out[:, :-d])
+    return np.minimum(np.sqrt(out), cap)
+
+
+# For each item with counts[i] samples, the owning item and a parameter t running from 0 to 1
+def _samples(counts: np.ndarray):
+    owner = np.repeat(np.arange(len(counts)), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    step = np.repeat(np.maximum(counts - 1, 1), counts)
+    return owner, (np.arange(len(owner)) - starts) / step
+
+
+# Points along every entity in drawing coordinates, at most spacing apart
+def sample_points(store: EntityStore, spacing: float) -> np.ndarray:
+    points = []
+
+    lines = store.lines
+    if len(lines):
+        start, end = lines["start"], lines["end"]
+        counts = np.ceil(np.hypot(*(end - start).T) / spacing).astype(np.int64) + 2
+        owner, t = _samples(counts)
+        points.append(start[owner] + (end - start)[owner] * t[:, None])
+
+    centers = np.concatenate([store.circles["center"], store.arcs["center"]])
+    radii = np.concatenate([store.circles["radius"], store.arcs["radius"]])
+    start_angles = np.radians(np.concatenate([np.zeros(len(store.circles)), store.arcs["start_angle"]]))
+    sweeps = np.mod(store.arcs["end_angle"] - store.arcs["start_angle"], 360.0)
+    sweeps[sweeps == 0] = 360.0
+    sweeps = np.radians(np.concatenate([np.full(len(store.circles), 360.0), sweeps]))
+    if len(radii):
+        counts = np.ceil(radii * sweeps / spacing).astype(np.int64) + 2
+        owner, t = _samples(counts)
+        angle = start_angles[owner] + sweeps[owner] * t
+        points.append(centers[owner] + radii[owner, None] * np.column_stack([np.cos(angle), np.sin(angle)]))
+
+    if not points:
+        return np.zeros((0, 2))
+    return np.concatenate(points)
+
+
+# Drawing coordinates to (column, row) pixel indices; drawing y points up, image rows point down
+def _to_pixels(points: np.ndarray, scale: float, offset: tuple) -> np.ndarray:
+    return np.rint(np.column_stack([points[:, 0] * scale + offset[0], offset[1] - points[:, 1] * scale])).astype(np.int64)
+
+
+def rasterize(points: np.ndarray, shape: tuple, scale: float, offset: tuple) -> np.ndarray:
+    mask = np.zeros(shape, dtype=bool)
+    pixels = _to_pixels(points, scale, offset)
+    inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < shape[1]) & (pixels[:, 1] >= 0) & (pixels[:, 1] < shape[0])
+    mask[pixels[inside, 1], pixels[inside, 0]] = True
+    return mask
+
+
+# Mean distance from the placed entity points to the nearest source ink. padded_distance is the source
+# distance transform with a one pixel border of DISTANCE_CAP, so points off the image count as far away.
+def _placement_cost(points: np.ndarray, padded_distance: np.ndarray, scale: float, offset: tuple) -> float:
+    h, w = padded_distance.shape
+    cols = np.rint(points[:, 0] * scale + (offset[0] + 1)).astype(np.int64)
+    rows = np.rint((offset[1] + 1) - points[:, 1] * scale).astype(np.int64)
+    np.minimum(np.maximum(cols, 0, out=cols), w - 1, out=cols)
+    np.minimum(np.maximum(rows, 0, out=rows), h - 1, out=rows)
+    return float(padded_distance[rows, cols].mean())
+
+
+# Local search around a starting placement: nudge scale and offset while the cost drops, then halve the steps.
+# Scale stays within 50% of the start so the drawing cannot shrink into a dense patch of ink.
+def _refine_fit(points: np.ndarray, padded_distance: np.ndarray, scale: float, offset: tuple):
+    min_scale, max_scale = scale * 0.5, scale * 1.5
+    best = (_placement_cost(points, padded_distance, scale, offset), scale, offset)
+    scale_step, offset_step = 0.05, 4.0
+    while offset_step >= 0.5:
+        cost, scale, (ox, oy) = best
+        moves = [
+            (scale * (1 + scale_step), (ox, oy)), (scale * (1 - scale_step), (ox, oy)),
+            (scale, (ox + offset_step, oy)), (scale, (ox - offset_step, oy)),
+            (scale, (ox, oy + offset_step)), (scale, (ox, oy - offset_step)),
+        ]
+        improved = False
+        for move_scale, move_offset in moves:
+            if not min_scale <= move_scale <= max_scale:
+                continue
+            move_cost = _placement_cost(points, padded_distance, move_scale, move_offset)
+            if move_cost < best[0]:
+                best = (move_cost, move_scale, move_offset)
+                improved = True
+        if not improved:
+            scale_step /= 2
+            offset_step /= 2
+    return best
+
+
+# Candidate placements of the entity bounding box on the ink bounding box of the source.
+# The source box usually also contains dimensions and text, so both axis scales and two anchors are tried.
+def _candidate_fits(store: EntityStore, mask: np.ndarray) -> list:
+    bbox = store.bbox()
+    ink_rows, ink_cols = np.nonzero(mask)
+    if bbox is None or len(ink_rows) == 0:
+        return []
+    x0, y0, x1, y1 = bbox
+    c0, c1, r0, r1 = ink_cols.min(), ink_cols.max(), ink_rows.min(), ink_rows.max()
+
+    scales = []
+    if x1 > x0:
+        scales.append((c1 - c0) / (x1 - x0))
+    if y1 > y0:
+        scales.append((r1 - r0) / (y1 - y0))
+    if len(scales) == 2:
+        scales.append(min(scales))
+
+    fits = []
+    for scale in scales:
+        # Bottom-left corners together, and centers together
+        fits.append((scale, (c0 - x0 * scale, r1 + y0 * scale)))
+        fits.append((scale, ((c0 + c1 - (x0 + x1) * scale) / 2, (r0 + r1 + (y0 + y1) * scale) / 2)))
+    return fits
+
+
+def score_store(store: EntityStore, mask: np.ndarray, tolerance_px: float = DEFAULT_TOLERANCE_PX) -> dict:
+    empty = {"iou": 0.0, "chamfer_px": float(DISTANCE_CAP), "chamfer_norm": 1.0, "scale": None, "offset": None}
+    fits = _candidate_fits(store, mask)
+    if not fits:
+        return empty
+
+    # Sample finely enough for the largest scale tried, so the rendering has no gaps.
+    # Fitting only needs a sparse subset, about one point every 3 pixels.
+    points = sample_points(store, 1.0 / (max(scale for scale, _ in fits) * 1.5))
+    fit_points = points[::4]
+    source_distance = distance_transform(mask)
+    padded = np.pad(source_distance, 1, constant_values=DISTANCE_CAP)
+
+    # Only the two most promising starting placements are refined
+    starts = sorted(fits, key=lambda fit: _placement_cost(fit_points, padded, *fit))[:2]
+    _, scale, offset = min(_refine_fit(fit_points, padded, scale, offset) for scale, offset in starts)
+    to_source = _placement_cost(points, padded, scale, offset)
+
+    rendered = rasterize(points, mask.shape, scale, offset)
+    if not rendered.any():
+        return empty
+    rendered_distance = distance_transform(rendered)
+    to_rendered = float(rendered_distance[mask].mean())
+    chamfer = (to_source + to_rendered) / 2
+
+    source_band = source_distance <= tolerance_px
+    rendered_band = rendered_distance <= tolerance_px
+    union = np.logical_or(source_band, rendered_band).sum()
+    iou = float(np.logical_and(source_band, rendered_band).sum() / union) if union else 0.0
+
+    return {
+        "iou": iou,
+        "chamfer_px": chamfer,
+        "chamfer_norm": chamfer / math.hypot(*mask.shape),
+        "scale": float(scale),
+        "offset": [float(offset[0]), float(offset[1])],
+    }
+
+
+def score_reconstruction(image_path: str, data: dict, max_edge: int = DEFAULT_WORKING_EDGE,
+                         tolerance_px: float = DEFAULT_TOLERANCE_PX) -> dict:
+    store = EntityStore.from_json(data)
+    store.drop_invalid()
+    return score_store(store, source_mask(image_path, max_edge), tolerance_px)
+
+
+# Scores a batch of (image_path, json_path) pairs and prints one line per drawing
+def score_files(pairs: list, max_edge: int = DEFAULT_WORKING_EDGE) -> list:
+    results = []
+    for image_path, json_path in pairs:
+        start = time.perf_counter()
+        with open(json_path, "r") as f:
+            data = json.load(f)
+        scores = score_reconstruction(image_path, data, max_edge)
+        scores["seconds"] = time.perf_counter() - start
+        print(f"{json_path}: IoU {scores['iou']:.3f}  chamfer {scores['chamfer_px']:.2f}px  "
+              f"({scores['seconds'] * 1000:.1f} ms)")
+        results.append(scores)
+    return results
+
+
+if __name__ == "__main__":
+    # python reconstruction_quality.py <image> <entities json> [<image> <entities json> ...]
+    args = sys.argv[1:]
+    score_files(list(zip(args[0::2], args[1::2])))
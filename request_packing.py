@@ -0,0 +1,145 @@
+#Sends several small drawings in one request, so the long geometry instructions are sent once per group
+#instead of once per image. Each drawing gets an ID in the prompt, the model answers with one entity list per ID,
+#and the answer is split back into per-image JSON and DXF files.
+#Drawings whose part of the answer is missing or unreadable, or whose files could not be written, are retried one
+#by one with sixthTask3.extract_json; the drawings of the group that did work are kept.
+#
+#   python request_packing.py <image directory> [pack size]
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from entity_binary import write_output
+from batch import ImageResult, list_images, print_summary
+from instrumentation import instrumented, stage
+from json_extract import parse_model_json
+from preprocess import preprocess_image
+from response_cache import generate_text
+from prompts import CAD_GEOMETRY_V2, prompt_parts
+from dxf_writer import json_to_dxf
+from sixthTask3 import extract_json, model
+
+DEFAULT_PACK_SIZE = 4
+
+PACKING_INSTRUCTIONS = """
+            **Several drawings:** This request contains {count} separate drawings, each one introduced by a line
+            "Drawing <id>:" right before its image. Analyze every drawing on its own, with its own origin.
+            Instead of a single "entities" list, return one JSON object with a root key "drawings": a list with one
+            item per drawing, {{"id": "<id>", "entities": [...]}}, where "entities" follows the schema above.
+            Use exactly these ids: {ids}.
+"""
+
+
+def drawing_id(index: int) -> str:
+    return f"D{index + 1}"
+
+
+# instructions are the prompt parts from prompts.prompt_parts
+def pack_prompt(images: list, instructions: list) -> list:
+    ids = [drawing_id(i) for i in range(len(images))]
+    prompt = instructions + [PACKING_INSTRUCTIONS.format(count=len(images), ids=", ".join(ids))]
+    for image_id, img in zip(ids, images):
+        prompt.append(f"Drawing {image_id}:")
+        prompt.append(img)
+    return prompt
+
+
+# The per-drawing data in a packed answer, by ID. A plain {"entities": [...]} answer counts for a single drawing.
+# Raises ValueError when none of the ids is in the answer, so it is not cached.
+def split_response(data, ids: list) -> dict:
+    if isinstance(data, dict) and "drawings" not in data and "entities" in data and len(ids) == 1:
+        return {ids[0]: {"entities": data["entities"]}}
+    drawings = data.get("drawings", []) if isinstance(data, dict) else data
+    out = {}
+    for item in drawings if isinstance(drawings, list) else []:
+        if isinstance(item, dict) and str(item.get("id")) in ids and isinstance(item.get("entities"), list):
+            out[str(item["id"])] = {"entities": item["entities"]}
+    if not out:
+        raise ValueError(f"None of the drawings {', '.join(ids)} is in the packed answer")
+    return out
+
+
+# One packed request for a group of images. Returns {image_path: data} for the drawings found in the answer.
+@instrumented
+def extract_group(image_paths: list, output_filenames: list) -> dict:
+    images = [preprocess_image(path) for path in image_paths]
+    ids = [drawing_id(i) for i in range(len(image_paths))]
+    instructions = prompt_parts("cad_geometry", CAD_GEOMETRY_V2.version)
+    by_id = generate_text(model, pack_prompt(images, instructions),
+                          parse=lambda raw_text: split_response(parse_model_json(raw_text), ids))
+
+    found = {}
+    for image_id, image_path, output_filename in zip(ids, image_paths, output_filenames):
+        data = by_id.get(image_id)
+        if data is None:
+            continue
+        try:
+            write_output(data, output_filename)
+            with stage("dxf_write"):
+                json_to_dxf(data, output_filename.replace(".json", ".dxf"))
+        except Exception as e:
+            # Only this drawing is sent again, the rest of the answer is still good
+            print(f"Writing {output_filename} from the packed answer failed ({type(e).__name__}: {e})")
+            continue
+        found[image_path] = data
+    return found
+
+
+# Returns the results of the group and how many drawings had to be sent on their own
+def _run_group(image_paths: list, output_for):
+    output_filenames = [output_for(path) for path in image_paths]
+    start = time.perf_counter()
+    try:
+        found = extract_group(image_paths, output_filenames)
+    except Exception as e:
+        print(f"Packed request for {len(image_paths)} drawings failed ({type(e).__name__}: {e})")
+        found = {}
+    # Time of the packed request, shared out over the drawings it answered
+    share = (time.perf_counter() - start) / len(image_paths)
+
+    results = []
+    singles = 0
+    for image_path, output_filename in zip(image_paths, output_filenames):
+        if image_path in found:
+            results.append(ImageResult(image_path, output_filename, found[image_path], seconds=share))
+            continue
+        print(f"{image_path} missing from the packed answer or not written, sending it on its own")
+        singles += 1
+        single_start = time.perf_counter()
+        data = extract_json(image_path, output_filename)
+        error = None if data is not None else "Extraction returned no data, see the log above"
+        results.append(ImageResult(image_path, output_filename, data, error, share + time.perf_counter() - single_start))
+    return results, singles
+
+
+# Extracts every image in groups of pack_size, with at most max_in_flight requests at once.
+# Results come back in input order, like batch.run_batch.
+def run_packed(image_paths: list, output_for, pack_size: int = DEFAULT_PACK_SIZE, max_in_flight: int = 4) -> list:
+    if pack_size < 1:
+        raise ValueError("pack_size must be at least 1")
+    groups = [image_paths[i:i + pack_size] for i in range(0, len(image_paths), pack_size)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        groups_done = list(pool.map(lambda group: _run_group(group, output_for), groups))
+    elapsed = time.perf_counter() - start
+
+    results = [result for group_results, _ in groups_done for result in group_results]
+    singles = sum(count for _, count in groups_done)
+    print_summary(results, elapsed)
+    print(f"Packed {len(image_paths)} drawings into {len(groups)} requests of up to {pack_size}, "
+          f"{singles} sent again on their own ({len(groups) + singles} requests in total)")
+    return results
+
+
+def output_file_for(image_path: str) -> str:
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    return f"packed_{base_name}.json"
+
+
+if __name__ == "__main__":
+    image_directory = sys.argv[1] if len(sys.argv) > 1 else "D:\\AutoLab\\cad_image"
+    pack_size = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PACK_SIZE
+    run_packed(list_images(image_directory), output_file_for, pack_size=pack_size)
@@ -0,0 +1,291 @@
+#On-disk cache for model responses, keyed by a hash of the image bytes, the prompt text and the model name.
+#Re-running the same image with the same prompt and model reads the stored response instead of calling the API again.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from PIL import Image
+
+from instrumentation import add_time, add_usage, add_value, stage
+from rate_limiter import default_limiter, estimate_tokens
+
+DEFAULT_CACHE_DIR = ".response_cache"
+
+
+class ResponseCache:
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = 200 * 1024 * 1024,
+                 ttl_seconds: float = 30 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # Bytes in the directory: counted by the first put, then kept up to date, so only a put that goes over
+        # max_bytes has to list the directory
+        self._size = None
+        self._lock = threading.Lock()
+
+    # generation_config (e.g. a response schema) changes the answer, so it is part of the key when given
+    def key(self, prompt, model_name: str, generation_config: dict = None) -> str:
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        if generation_config:
+            digest.update(b"config:" + json.dumps(generation_config, sort_keys=True, default=repr).encode("utf-8"))
+        parts = prompt if isinstance(prompt, (list, tuple)) else [prompt]
+        for part in parts:
+            digest.update(b"\0")
+            if isinstance(part, str):
+                digest.update(b"text:" + part.encode("utf-8"))
+            elif isinstance(part, Image.Image):
+                digest.update(b"image:" + _image_bytes(part))
+            else:
+                digest.update(b"other:" + repr(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self.discard(key)
+            self._count(hit=False)
+            return None
+
+        # Touch the file so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return entry["text"]
+
+    def put(self, key: str, text: str, model_name: str = ""):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "model": model_name, "text": text}, f)
+        replaced = _size(path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += _size(path) - replaced
+            full = self._size > self.max_bytes
+        if full:
+            self.evict()
+
+    # Removes the entry, e.g. a response the caller could not use
+    def discard(self, key: str):
+        path = self._path(key)
+        size = _size(path)
+        _remove(path)
+        with self._lock:
+            if self._size is not None:
+                self._size = max(0, self._size - size)
+
+    # Removes least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+            self._size = total
+
+    # (mtime, size, path) of every entry in the directory
+    def _entries(self) -> list:
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _image_bytes(img: Image.Image) -> bytes:
+    # Images opened from disk are uploaded as the original file, so hash the file itself
+    filename = getattr(img, "filename", None)
+    if filename and os.path.isfile(filename):
+        with open(filename, "rb") as f:
+            return f.read()
+    return f"{img.mode}:{img.size}:".encode("utf-8") + img.tobytes()
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# AUTOLAB_RESPONSE_CACHE=0 turns the default cache off, e.g. for load tests against the replay backend
+default_cache = None if os.environ.get("AUTOLAB_RESPONSE_CACHE") == "0" else ResponseCache()
+
+
+# Returns the response text for the prompt, calling model.generate_content only on a cache miss.
+# Pass cache=None to always call the model. generation_config is passed on to generate_content.
+# With parse (e.g. parse_model_json) the parsed response is returned instead, and a response is only stored once it
+# has parsed: one that does not is raised and asked for again on the next run instead of being replayed.
+def generate_text(model, prompt, cache=default_cache, generation_config: dict = None, parse=None):
+    if cache is None:
+        return _parse(_call_model(model, prompt, generation_config), parse)
+
+    model_name = getattr(model, "model_name", type(model).__name__)
+    key = cache.key(prompt, model_name, generation_config)
+    text = cache.get(key)
+    if text is not None:
+        add_value("cache_hits", 1)
+        try:
+            return _parse(text, parse)
+        except Exception:
+            # Stored before this parse existed, or by an older version of it
+            cache.discard(key)
+            raise
+
+    text = _call_model(model, prompt, generation_config)
+    result = _parse(text, parse)
+    cache.put(key, text, model_name)
+    return result
+
+
+def _parse(text: str, parse):
+    if parse is None:
+        return text
+    with stage("json_parse"):
+        return parse(text)
+
+
+# The call goes through the shared rate limiter (if enabled), so "model" time includes waiting for quota
+# and retries; the waiting on its own is recorded as rate_limit_wait.
+def _call_model(model, prompt, generation_config: dict = None) -> str:
+    def call():
+        if generation_config:
+            response = model.generate_content(prompt, generation_config=generation_config)
+        else:
+            response = model.generate_content(prompt)
+        return response, response.text
+
+    with stage("model"):
+        if default_limiter is None:
+            response, text = call()
+        else:
+            estimate = estimate_tokens(prompt)
+            response, text = default_limiter.call(call, estimate)
+            default_limiter.settle(estimate, response)
+    add_usage(response)
+    return text
+
+
+# Streaming version of generate_text, yields the response text chunk by chunk as the model produces it.
+# A cached response is yielded as a single chunk, a fresh one is stored once the stream has finished, and only if
+# parse (when given) accepts the whole text without raising.
+def stream_text(model, prompt, cache=default_cache, parse=None):
+    if cache is None:
+        yield from _stream_model(model, prompt)
+        return
+
+    model_name = getattr(model, "model_name", type(model).__name__)
+    key = cache.key(prompt, model_name)
+    text = cache.get(key)
+    if text is not None:
+        add_value("cache_hits", 1)
+        yield text
+        return
+
+    parts = []
+    for chunk_text in _stream_model(model, prompt):
+        parts.append(chunk_text)
+        yield chunk_text
+    text = "".join(parts)
+    if parse is not None:
+        try:
+            parse(text)
+        except Exception as e:
+            print(f"Not caching a response that does not parse ({type(e).__name__}: {e})")
+            return
+    cache.put(key, text, model_name)
+
+
+# Only the time spent waiting for chunks counts as model time, not the time the caller spends on each chunk.
+# Opening the stream and getting the first chunk goes through the rate limiter and is retried there;
+# an error after the first chunk has been handed out cannot be retried and is raised.
+# The stream keeps its concurrency slot until it has finished, failed or been closed by the caller.
+# The token counts are on the last chunk.
+def _stream_model(model, prompt):
+    def first():
+        chunks = iter(model.generate_content(prompt, stream=True))
+        return chunks, next(chunks, None)
+
+    start = time.perf_counter()
+    estimate = estimate_tokens(prompt)
+    with stage("model"):
+        if default_limiter is None:
+            chunks, chunk = first()
+        else:
+            chunks, chunk = default_limiter.call(first, estimate, hold=True)
+    last = None
+    error = None
+    try:
+        while chunk is not None:
+            if last is None:
+                add_time("model_first_chunk", time.perf_counter() - start)
+            last = chunk
+            yield chunk.text
+            with stage("model"):
+                chunk = next(chunks, None)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if default_limiter is not None:
+            default_limiter.release(error)
+    if last is not None:
+        add_usage(last)
+        if default_limiter is not None:
+            default_limiter.settle(estimate, last)
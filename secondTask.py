@@ -5,34 +5,29 @@
 import os
 import json
 import sys
-import google.generativeai as genai
-from PIL import Image
-from dotenv import load_dotenv
+from backends import DIMENSION_RECORDINGS, create_backend
+from preprocess import preprocess_image
+from instrumentation import instrumented
+from json_extract import parse_model_json
+from response_cache import default_cache, generate_text
+from batch import list_images, run_batch
+from job_store import DEFAULT_DB, JobStore
 
-load_dotenv()
+# The backend is picked by AUTOLAB_BACKEND, see backends.py
+vision_model = create_backend('gemini-1.5-flash-latest', DIMENSION_RECORDINGS)
 
-try:
-    API_KEY = os.environ["gemini_api_key"]
-except KeyError:
-    print("Error: The 'gemini_api_key' environment variable is not set.")
-    print("Please check your .env file or environment variables.")
-    sys.exit(1)
+# Pass model to use a different backend (e.g. a local fake with the same generate_content interface)
+@instrumented
+def extract_dimensions_to_json(image_path: str, output_filename: str, model=None):
+    model = model or vision_model
 
-genai.configure(api_key=API_KEY)
-
-import google.generativeai as genai
-
-vision_model = genai.GenerativeModel('gemini-1.5-flash-latest')
-
-def extract_dimensions_to_json(image_path: str, output_filename: str):
-    
     print(f"\n--- Analyzing image: {image_path} ---")
     if not os.path.exists(image_path):
         print(f"Error: Image file not found at {image_path}")
-        return
+        return None
 
     try:
-        img = Image.open(image_path)
+        img = preprocess_image(image_path)
         
         prompt = [
             "You are an expert CAD analyst. Extract all visible dimensions and return them in JSON format. The JSON should have a 'dimensions' key, which is an array of objects. Each object has a 'name' and 'value'."
@@ -44,43 +39,51 @@ def extract_dimensions_to_json(image_path: str, output_filename: str):
             "Analyze the attached image and provide a response in the same format.",
             img
         ]
-        response = vision_model.generate_content(prompt)
+        # Finds the JSON in the response, with or without a ```json block, and repairs small defects
+        data = generate_text(model, prompt, parse=parse_model_json)
         
-        # This part cleans the raw response to extract the JSON block
-        json_start = response.text.find('```json')
-        json_end = response.text.rfind('```')
-        
-        if json_start != -1 and json_end != -1:
-            json_str = response.text[json_start+7:json_end].strip()
-            data = json.loads(json_str)
-            
-            with open(output_filename, 'w') as f:
-                json.dump(data, f, indent=4)
-            print(f"Successfully saved dimensions to {output_filename}")
-            print(json.dumps(data, indent=4))
-        else:
-            print("Error: Could not find JSON block in the model's response.")
-            print("Raw response:")
-            print(response.text)
+        with open(output_filename, 'w') as f:
+            json.dump(data, f, indent=4)
+        print(f"Successfully saved dimensions to {output_filename}")
+        print(json.dumps(data, indent=4))
+        return data
 
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON: {e}")
         print("Raw response was:")
-        print(response.text)
+        print(e.doc)
     except Exception as e:
         print(f"An error occurred: {e}")
+    return None
+
+
+def output_file_for(img_path: str) -> str:
+    # Create a unique output filename for each image
+    base_name = os.path.splitext(os.path.basename(img_path))[0]
+    return f"extracted_dimensions_{base_name}.json"
+
 
 # --- Main execution ---
+# python secondTask.py [image directory] [--retry-failed] [--fresh]
 if __name__ == "__main__":
-    image_directory = "D:\\AutoLab\\images"
-    
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    image_directory = args[0] if args else "D:\\AutoLab\\images"
+    # Number of images sent to the model at the same time, set to 1 to process them one by one
+    max_in_flight = 8
+
+    # Progress is kept in the job store, so a rerun after a crash only sends the images that are not done yet
+    jobs = JobStore(DEFAULT_DB)
+    # Cleared through SQLite rather than by deleting the file, which would leave the -wal/-shm files of a crashed run
+    if "--fresh" in sys.argv:
+        print(f"Cleared {jobs.clear()} jobs")
+    if "--retry-failed" in sys.argv:
+        print(f"Re-queued {jobs.requeue_failed()} failed images")
+
     # Images in the directory
-    image_files = [os.path.join(image_directory, f) for f in os.listdir(image_directory) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif'))]
+    image_files = list_images(image_directory)
 
-    # Loop through each image and process it
-    for img_path in image_files:
-        # Create a unique output filename for each image
-        base_name = os.path.splitext(os.path.basename(img_path))[0]
-        output_file = f"extracted_dimensions_{base_name}.json"
-        
-        extract_dimensions_to_json(img_path, output_file)
\ No newline at end of file
+    results = run_batch(image_files, extract_dimensions_to_json, output_file_for, max_in_flight=max_in_flight,
+                        job_store=jobs)
+    print(f"Job store: {jobs.counts()}")
+    if default_cache is not None:
+        print(f"Response cache: {default_cache.stats()}")
\ No newline at end of file
@@ -0,0 +1,164 @@
+#Dimensions, entity counts and geometry from one model call.
+#thirdTask (dimensions) and sixthTask3 (geometry) each upload the same image; here the model is asked for both at once
+#in JSON mode with a response schema, so the answer is always a bare JSON object of the right shape.
+#The result is validated, saved as JSON and converted to DXF.
+
+import os
+import json
+from backends import COMBINED_RECORDINGS, create_backend
+from preprocess import preprocess_image
+from instrumentation import instrumented, stage
+from json_extract import parse_model_json
+from response_cache import generate_text
+from dxf_writer import json_to_dxf
+from entity_binary import write_output
+
+# The backend is picked by AUTOLAB_BACKEND, see backends.py
+model = create_backend('gemini-2.5-flash', COMBINED_RECORDINGS)
+
+ENTITY_TYPES = ["LINE", "CIRCLE", "ARC"]
+
+_POINT = {"type": "array", "items": {"type": "number"}}
+
+# One params object for all entity types, each type fills in the fields it needs
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "dimensions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"name": {"type": "string"}, "value": {"type": "string"}},
+                "required": ["name", "value"],
+            },
+        },
+        "entity_count": {"type": "integer"},
+        "entity_names": {"type": "array", "items": {"type": "string"}},
+        "entities": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string", "format": "enum", "enum": ENTITY_TYPES},
+                    "params": {
+                        "type": "object",
+                        "properties": {
+                            "start_point": _POINT,
+                            "end_point": _POINT,
+                            "center": _POINT,
+                            "radius": {"type": "number"},
+                            "start_angle": {"type": "number"},
+                            "end_angle": {"type": "number"},
+                        },
+                    },
+                },
+                "required": ["type", "params"],
+            },
+        },
+    },
+    "required": ["dimensions", "entity_count", "entity_names", "entities"],
+}
+
+GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": RESPONSE_SCHEMA}
+
+REQUIRED_PARAMS = {
+    "LINE": ("start_point", "end_point"),
+    "CIRCLE": ("center", "radius"),
+    "ARC": ("center", "radius", "start_angle", "end_angle"),
+}
+
+POINT_PARAMS = ("start_point", "end_point", "center")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# A list of at least 2 numbers (x, y and maybe z)
+def _is_point(value) -> bool:
+    return isinstance(value, list) and len(value) >= 2 and all(_is_number(v) for v in value)
+
+
+# Checks the parts the schema cannot express (which params each type needs, 2D points).
+# Entities that fail are dropped, returns the list of problems found.
+def validate_combined(data: dict) -> list:
+    problems = []
+    for key in RESPONSE_SCHEMA["required"]:
+        if key not in data:
+            problems.append(f"missing '{key}'")
+
+    entities = []
+    for i, entity in enumerate(data.get("entities", [])):
+        type_ = entity.get("type") if isinstance(entity, dict) else None
+        params = entity.get("params") if isinstance(entity, dict) else None
+        params = params if isinstance(params, dict) else {}
+        bad = [name for name in REQUIRED_PARAMS.get(type_, ())
+               if not (_is_point(params.get(name)) if name in POINT_PARAMS else _is_number(params.get(name)))]
+        if type_ not in REQUIRED_PARAMS:
+            problems.append(f"entity {i}: unknown type {type_}")
+        elif bad:
+            problems.append(f"entity {i} ({type_}): missing or bad {', '.join(bad)}")
+        else:
+            entities.append(entity)
+    data["entities"] = entities
+    return problems
+
+
+@instrumented
+def extract_drawing(image_path: str, output_filename: str):
+    print(f"\n--- Analyzing image: {image_path} ---")
+    if not os.path.exists(image_path):
+        print(f"Error: Image file not found at {image_path}")
+        return None
+
+    try:
+        img = preprocess_image(image_path)
+
+        prompt = [
+            """
+            You are an expert CAD analyst. Analyze the attached 2D drawing and return, in one JSON object:
+
+            1. "dimensions": every dimension written on the drawing, as {"name": ..., "value": "value with units"}.
+            2. "entity_count" and "entity_names": the number of drawn entities and their kinds
+               (lines, arcs, circles, rectangles, arrows, etc.).
+            3. "entities": the geometry as LINE, CIRCLE and ARC entities readable by ezdxf.
+               - The origin (0, 0) is the bottom-left corner of the object's primary bounding box.
+               - LINE params: start_point [x, y], end_point [x, y]
+               - CIRCLE params: center [x, y], radius
+               - ARC params: center [x, y], radius, start_angle, end_angle in degrees.
+                 Arcs always run anti-clockwise, so a C shaped arc starts at 90 and ends at 270.
+               - Use the dimensions on the drawing to make the coordinates as precise as possible.
+            """,
+            img
+        ]
+
+        # JSON mode returns a bare JSON object, so this is a plain json parse (with repair if it was cut off)
+        data = generate_text(model, prompt, generation_config=GENERATION_CONFIG, parse=parse_model_json)
+        problems = validate_combined(data)
+        for problem in problems:
+            print(f"Validation: {problem}")
+
+        write_output(data, output_filename)
+        print(f"Successfully extracted {len(data.get('dimensions', []))} dimensions and "
+              f"{len(data['entities'])} entities to {output_filename}")
+
+        dxf_output_file = output_filename.replace(".json", ".dxf")
+        with stage("dxf_write"):
+            json_to_dxf(data, dxf_output_file)
+        return data
+
+    except json.JSONDecodeError as e:
+        print(f"\n--- ERROR: Failed to decode JSON from model response ---")
+        print(f"Error details: {e}")
+        print("\n--- Raw Response Text ---")
+        print(e.doc)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+    return None
+
+
+if __name__ == "__main__":
+    image_file = r"D:\AutoLab\cad_image\circles.png"
+    output_file = "seventhTask.json"
+
+    extract_drawing(image_file, output_file)
@@ -1,57 +1,33 @@
+import os
 import json
-import ezdxf
+import dxf_writer
+from dxf_preview import DEFAULT_DPI, render_doc
 import matplotlib.pyplot as plt
 from ezdxf.addons.drawing import RenderContext, Frontend
 from ezdxf.addons.drawing.matplotlib import MatplotlibBackend
 
-def json_to_dxf(json_file: str, dxf_file: str):
+# Writes the DXF with dxf_writer (invalid entities dropped, cleanup, ANGULAR_DIMENSION support),
+# polylines=True writes connected LINE/ARC chains as single LWPOLYLINE entities,
+# show=True opens the interactive matplotlib window, otherwise a PNG preview is saved next to the DXF
+def json_to_dxf(json_file: str, dxf_file: str, clean: bool = True, polylines: bool = False,
+                show: bool = True, dpi: int = DEFAULT_DPI):
     with open(json_file, "r") as f:
         data = json.load(f)
 
-    doc = ezdxf.new(dxfversion="R2010")
-    msp = doc.modelspace()
-
-    for entity in data.get("entities", []):
-        etype = entity.get("type")
-        params = entity.get("params", {})
-
-        if etype == "LINE":
-            msp.add_line(params["start_point"], params["end_point"])
-
-        elif etype == "CIRCLE":
-            msp.add_circle(center=params["center"], radius=params["radius"])
-
-        elif etype == "ARC":
-            msp.add_arc(
-                center=params["center"],
-                radius=params["radius"],
-                start_angle=params["start_angle"],
-                end_angle=params["end_angle"]
-            )
-
-        elif etype == "ANGULAR_DIMENSION":
-            dim = msp.add_arc_dim_cra(
-                center=params["center"],
-                radius=params["radius"],
-                start_angle=params["start_angle"],
-                end_angle=params["end_angle"],
-                distance=params.get("distance", 2),
-                dimstyle=params.get("dimstyle", "EZ_CURVED"),
-            )
-            dim.render()
-
-        else:
-            print(f"Unsupported entity type: {etype}")
-
-    doc.saveas(dxf_file)
-    print(f"DXF file saved as {dxf_file}")
+    doc = dxf_writer.json_to_dxf(data, dxf_file, clean=clean, polylines=polylines, dxfversion="R2010")
 
     # -------- Visualization --------
+    if not show:
+        png_file = os.path.splitext(dxf_file)[0] + ".png"
+        render_doc(doc, png_file, dpi=dpi)
+        print(f"Preview saved as {png_file}")
+        return
+
     fig, ax = plt.subplots()
     ax.set_aspect("equal")
     ctx = RenderContext(doc)
     out = MatplotlibBackend(ax)
-    Frontend(ctx, out).draw_layout(msp, finalize=True)
+    Frontend(ctx, out).draw_layout(doc.modelspace(), finalize=True)
     plt.show()
 
 
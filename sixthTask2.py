@@ -1,143 +1,203 @@
 import os
 import json
-import sys
-import google.generativeai as genai
-from PIL import Image
-from dotenv import load_dotenv
+import math
+import time
+from backends import GEOMETRY_RECORDINGS, create_backend
+from preprocess import preprocess_image
+from prompts import CAD_GEOMETRY_V1, prompt_parts
+from instrumentation import instrumented, stage
+from rate_limiter import default_limiter, error_status
+from json_extract import parse_model_json, parse_with_repairs
+from response_cache import generate_text, stream_text
+from stream_entities import EntityStreamParser, iter_entities
+from vector_input import VECTOR_EXTENSIONS, extract_vector
 import ezdxf
+from entity_binary import write_output
+from entity_store import EntityStore
+from geometry_cleanup import clean_geometry
+from dxf_writer import add_other_entities, build_doc, json_to_dxf
 
 # --- Configuration and API Key Loading ---
-load_dotenv()
-
-try:
-    API_KEY = os.environ["gemini_api_key"]
-except KeyError:
-    print("Error: The 'gemini_api_key' environment variable is not set.")
-    sys.exit(1)
-
-genai.configure(api_key=API_KEY)
-
-model = genai.GenerativeModel('gemini-2.5-flash')
-
-
-def extract_cad_data_to_json(image_path: str, output_filename: str):
+# The backend is picked by AUTOLAB_BACKEND, see backends.py
+model = create_backend('gemini-2.5-flash', GEOMETRY_RECORDINGS)
+
+MAX_STREAM_RESTARTS = 3
+
+
+# With stream=True, entities are added to the DXF as soon as the model has finished writing each one.
+# With tiled=True, large sheets are sent as overlapping tiles at full resolution (see tiling.py), in the same
+# drawing units.
+# SVG and PDF drawings are read directly, without a model call (see vector_input.py).
+# Returns the extracted data, or None on failure.
+@instrumented
+def extract_cad_data_to_json(image_path: str, output_filename: str, stream: bool = False, tiled: bool = False):
+    if image_path.lower().endswith(VECTOR_EXTENSIONS):
+        return extract_vector(image_path, output_filename)
+    if tiled:
+        from tiling import extract_tiled
+        return extract_tiled(image_path, output_filename)
     print(f"\n--- Analyzing image: {image_path} ---")
     if not os.path.exists(image_path):
         print(f"Error: Image file not found at {image_path}")
         return
 
     try:
-        img = Image.open(image_path)
-
-        prompt = [
-            """
-            You are an expert CAD analyst and programmer specializing in converting 2D drawings into structured vector data readable by software like ezdxf. Your task is to analyze the provided CAD drawing image and extract detailed geometric information for each individual entity.
-
-            **Instructions & Rules:**
-            1.  **Coordinate System:** Assume the origin (0, 0) is at the bottom-left corner of the object's primary bounding box. All coordinates must be relative to this origin.
-            2.  **Output Format:** Your response MUST be a single, clean JSON object. Do not include any explanatory text, comments, or markdown formatting like ```json.
-            3.  **Entity Schema:** The JSON object must have a single root key "entities", which is a list of objects. Each object in the list represents a single geometric entity and must have two keys: "type" and "params".
-            4.  **Parameter Extraction:** Infer the geometric parameters (coordinates, radii, angles, etc.) as precisely as possible from the visual information and dimensions in the drawing. Angles are in degrees.
-
-            For an arc, you know that arc always rotates anti clockwise, so for C shaped arc, the start angle is 90 and the end angle is 270. Formirrored C, the start angle is 270 and the end angle is 90. 
-
-            **JSON Schema and Examples:**
-            {
-              "entities": [
-                {
-                  "type": "LINE",
-                  "params": {
-                    "start_point": [x1, y1],
-                    "end_point": [x2, y2]
-                  }
-                },
-                {
-                  "type": "CIRCLE",
-                  "params": {
-                    "center": [cx, cy],
-                    "radius": r
-                  }
-                },
-                {
-                  "type": "ARC",
-                  "params": {
-                    "center": [cx, cy],
-                    "radius": r,
-                    "start_angle": angle1,
-                    "end_angle": angle2
-                  }
-                }
-              ]
-            }
-
-            Now, analyze the attached image and generate the JSON output based on these instructions.
-            """,
-            img
-        ]
-
-        response = model.generate_content(prompt)
-        raw_text = response.text
-        json_str = raw_text
-
-        if '```json' in raw_text:
-            json_start = raw_text.find('```json') + 7
-            json_end = raw_text.rfind('```')
-            json_str = raw_text[json_start:json_end].strip()
-
-        data = json.loads(json_str)
-
-        # Save JSON
-        with open(output_filename, 'w') as f:
-            json.dump(data, f, indent=4)
+        img = preprocess_image(image_path)
+
+        prompt = prompt_parts("cad_geometry", CAD_GEOMETRY_V1.version) + [img]
+
+        dxf_output_file = output_filename.replace(".json", ".dxf")
+
+        if stream:
+            data = stream_cad_data_to_dxf(prompt, dxf_output_file)
+        else:
+            data = generate_text(model, prompt, parse=parse_model_json)
+
+        # Save JSON (or .npz, see entity_binary.py)
+        write_output(data, output_filename)
 
         print(f"Successfully extracted CAD data to {output_filename}")
         print("--- Generated JSON ---")
         print(json.dumps(data, indent=4))
 
         # Convert JSON to DXF
-        dxf_output_file = output_filename.replace(".json", ".dxf")
-        json_to_dxf(data, dxf_output_file)
+        if not stream:
+            with stage("dxf_write"):
+                json_to_dxf(data, dxf_output_file)
+        return data
 
     except json.JSONDecodeError as e:
         print(f"\n--- ERROR: Failed to decode JSON from model response ---")
         print(f"Error details: {e}")
         print("\n--- Raw Response Text ---")
-        print(response.text)
+        print(e.doc)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-
-
-def json_to_dxf(data: dict, dxf_filename: str):
+    return None
+
+
+# The JSON object in a model response, with or without a ```json block around it (see json_extract.py)
+def parse_response(raw_text: str) -> dict:
+    with stage("json_parse"):
+        return parse_model_json(raw_text)
+
+
+# A stream that breaks off with a quota or server error is started again from scratch
+def stream_cad_data_to_dxf(prompt: list, dxf_filename: str) -> dict:
+    restarts = 0
+    while True:
+        try:
+            return _stream_cad_data_to_dxf(prompt, dxf_filename)
+        except Exception as e:
+            if error_status(e) is None or restarts >= MAX_STREAM_RESTARTS:
+                raise
+            restarts += 1
+            delay = default_limiter.backoff(restarts) if default_limiter is not None else 1.0
+            print(f"Stream failed with {type(e).__name__}, starting over in {delay:.1f}s "
+                  f"({restarts}/{MAX_STREAM_RESTARTS})")
+            time.sleep(delay)
+
+
+# Invalid entities (zero radius, zero length, missing numbers) and objects that are not valid JSON even after
+# repair are skipped as they arrive. Once the stream has ended the same cleanup as json_to_dxf runs over everything
+# received, and if it changed anything the DXF is written from the cleaned entities instead of the document built
+# while streaming.
+def _stream_cad_data_to_dxf(prompt: list, dxf_filename: str) -> dict:
     doc = ezdxf.new(setup=True)
     msp = doc.modelspace()
-
-    for entity in data.get("entities", []):
-        type_ = entity.get("type")
-        params = entity.get("params", {})
-
-        if type_ == "LINE":
-            start = tuple(params.get("start_point", [0, 0]))
-            end = tuple(params.get("end_point", [0, 0]))
-            msp.add_line(start, end)
-
-        elif type_ == "CIRCLE":
-            center = tuple(params.get("center", [0, 0]))
-            radius = params.get("radius", 0)
-            msp.add_circle(center, radius)
-
-        elif type_ == "ARC":
-            center = tuple(params.get("center", [0, 0]))
-            radius = params.get("radius", 0)
-            start_angle = params.get("start_angle", 0)
-            end_angle = params.get("end_angle", 0)
-            msp.add_arc(center, radius, start_angle, end_angle)
-
-    doc.saveas(dxf_filename)
-    print(f"Successfully converted JSON to DXF: {dxf_filename}")
+    entities = []
+    skipped = 0
+    parser = EntityStreamParser()
+
+    start_time = time.perf_counter()
+    for entity in iter_entities(stream_text(model, prompt, parse=parse_with_repairs), parser):
+        if not entities and not skipped:
+            print(f"First entity received after {time.perf_counter() - start_time:.2f}s")
+        if not _valid_entity(entity):
+            skipped += 1
+            continue
+        add_entity(msp, entity)
+        entities.append(entity)
+    print(f"Received {len(entities) + skipped} entities in {time.perf_counter() - start_time:.2f}s")
+    if skipped:
+        print(f"Skipped {skipped} invalid entities")
+    if parser.repaired or parser.malformed:
+        print(f"Repaired {parser.repaired} streamed entities, skipped {parser.malformed} that could not be parsed")
+
+    store = EntityStore.from_json({"entities": entities})
+    report = clean_geometry(store)
+    print(f"Geometry cleanup merged {report['merged_entities']} entities "
+          f"and snapped {report['snapped_endpoints']} endpoints")
+    with stage("dxf_write"):
+        if report["merged_entities"] or report["snapped_endpoints"]:
+            # Includes the entities of other types (store.other), which the cleanup leaves as they were streamed
+            doc = build_doc(store)
+        doc.saveas(dxf_filename)
+    print(f"Successfully streamed entities to DXF: {dxf_filename}")
+    return store.to_json()
+
+
+# Whether a streamed entity has all its numbers and passes the checks of EntityStore.drop_invalid (other types
+# always pass)
+def _valid_entity(entity: dict) -> bool:
+    type_ = entity.get("type")
+    if type_ not in ("LINE", "CIRCLE", "ARC"):
+        return True
+    params = entity.get("params")
+    if not isinstance(params, dict):
+        return False
+    if type_ == "LINE":
+        start, end = _point(params.get("start_point")), _point(params.get("end_point"))
+        return start is not None and end is not None and start != end
+    center, radius = _point(params.get("center")), _number(params.get("radius"))
+    if center is None or radius is None or radius <= 0:
+        return False
+    return type_ == "CIRCLE" or (_number(params.get("start_angle")) is not None
+                                 and _number(params.get("end_angle")) is not None)
+
+
+# A finite number as float, or None
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+# The first two coordinates of a point as a tuple of floats, or None
+def _point(value):
+    if not isinstance(value, (list, tuple)) or len(value) < 2:
+        return None
+    x, y = _number(value[0]), _number(value[1])
+    return None if x is None or y is None else (x, y)
+
+
+def add_entity(msp, entity: dict):
+    type_ = entity.get("type")
+    params = entity.get("params", {})
+
+    if type_ == "LINE":
+        start = tuple(params.get("start_point", [0, 0]))
+        end = tuple(params.get("end_point", [0, 0]))
+        msp.add_line(start, end)
+
+    elif type_ == "CIRCLE":
+        center = tuple(params.get("center", [0, 0]))
+        radius = params.get("radius", 0)
+        msp.add_circle(center, radius)
+
+    elif type_ == "ARC":
+        center = tuple(params.get("center", [0, 0]))
+        radius = params.get("radius", 0)
+        start_angle = params.get("start_angle", 0)
+        end_angle = params.get("end_angle", 0)
+        msp.add_arc(center, radius, start_angle, end_angle)
+
+    else:
+        add_other_entities(msp, [entity])
 
 
 if __name__ == "__main__":
     image_file = r"D:\AutoLab\cad_image\single_fillet_plate.jpeg"
     output_file = "sixthTask2.json"
 
-    extract_cad_data_to_json(image_file, output_file)
\ No newline at end of file
+    extract_cad_data_to_json(image_file, output_file, stream=True)
\ No newline at end of file
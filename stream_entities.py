@@ -0,0 +1,104 @@
+#Incremental parser for streamed model responses.
+#Yields each {"type", "params"} object of the "entities" array as soon as its closing brace arrives,
+#so entities can be added to the DXF while the model is still generating the rest.
+#An object that is not valid JSON goes through the same repairs as whole responses (json_extract.py); one that
+#cannot be repaired, or is not an object, is skipped and counted in malformed instead of ending the stream.
+
+import json
+import re
+
+from json_extract import parse_with_repairs
+
+ENTITIES_START = re.compile(r'"entities"\s*:\s*\[')
+
+
+class EntityStreamParser:
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        self.repaired = 0
+        self.malformed = 0
+
+    # Adds a chunk of response text and returns the entities completed by it
+    def feed(self, chunk: str) -> list:
+        if self._done:
+            return []
+        self._buffer += chunk
+
+        if not self._in_array:
+            match = ENTITIES_START.search(self._buffer)
+            if match is None:
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        entities = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._object_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # End of the entities array
+                    self._done = True
+                    i += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and ch == "}":
+                    entity = self._parse_object(buffer[self._object_start:i + 1])
+                    if entity is not None:
+                        entities.append(entity)
+                    self._object_start = None
+            i += 1
+
+        # Drop text that has been fully consumed so the buffer stays small
+        if self._object_start is None:
+            self._buffer = buffer[i:]
+            self._pos = 0
+        else:
+            self._buffer = buffer[self._object_start:]
+            self._pos = i - self._object_start
+            self._object_start = 0
+        return entities
+
+    def _parse_object(self, text: str):
+        try:
+            entity, repairs = parse_with_repairs(text)
+        except json.JSONDecodeError:
+            self.malformed += 1
+            return None
+        if not isinstance(entity, dict):
+            self.malformed += 1
+            return None
+        self.repaired += bool(repairs)
+        return entity
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+
+# parser can be passed in to read its repaired/malformed counts once the stream has ended
+def iter_entities(chunks, parser: EntityStreamParser = None):
+    parser = parser or EntityStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
@@ -0,0 +1,13 @@
+#The modules live at the top of the repo, next to the scripts; run the tests from there with python -m pytest.
+#The defaults below keep the tests off the network and out of the working directory (no metrics files, no
+#response cache, no rate limiting, recorded responses instead of Gemini).
+
+import os
+import sys
+
+os.environ.setdefault("AUTOLAB_METRICS", "0")
+os.environ.setdefault("AUTOLAB_RESPONSE_CACHE", "0")
+os.environ.setdefault("AUTOLAB_RATE_LIMIT", "0")
+os.environ.setdefault("AUTOLAB_BACKEND", "replay")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
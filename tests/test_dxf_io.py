@@ -0,0 +1,98 @@
+import ezdxf
+
+from dxf_reader import diff_stores, iter_dxf_entities, read_dxf
+from dxf_writer import json_to_dxf
+from entity_store import EntityStore
+from fast_dxf import write_fast_dxf
+
+DRAWING = {"entities": [
+    {"type": "LINE", "params": {"start_point": [0, 0], "end_point": [50, 0]}},
+    {"type": "LINE", "params": {"start_point": [50, 0], "end_point": [50, 30]}},
+    {"type": "CIRCLE", "params": {"center": [25, 15], "radius": 5}},
+    {"type": "ARC", "params": {"center": [0, 30], "radius": 10, "start_angle": 270, "end_angle": 90}},
+]}
+
+
+def _counts(path) -> dict:
+    counts = {}
+    for entity in ezdxf.readfile(str(path)).modelspace():
+        counts[entity.dxftype()] = counts.get(entity.dxftype(), 0) + 1
+    return counts
+
+
+def test_json_to_dxf_writes_every_entity(tmp_path):
+    path = tmp_path / "drawing.dxf"
+    json_to_dxf(DRAWING, str(path))
+    assert _counts(path) == {"LINE": 2, "CIRCLE": 1, "ARC": 1}
+
+
+def test_json_to_dxf_drops_invalid_entities(tmp_path):
+    data = {"entities": DRAWING["entities"] + [
+        {"type": "CIRCLE", "params": {"center": [0, 0], "radius": 0}},
+        {"type": "LINE", "params": {"start_point": [1, 1], "end_point": [1, 1]}},
+    ]}
+    path = tmp_path / "drawing.dxf"
+    json_to_dxf(data, str(path))
+    assert _counts(path) == {"LINE": 2, "CIRCLE": 1, "ARC": 1}
+
+
+def test_json_to_dxf_does_not_modify_a_store(tmp_path):
+    store = EntityStore.from_json(DRAWING)
+    before = store.to_json()
+    json_to_dxf(store, str(tmp_path / "drawing.dxf"))
+    assert store.to_json() == before
+
+
+def test_json_to_dxf_writes_polylines(tmp_path):
+    path = tmp_path / "drawing.dxf"
+    json_to_dxf(DRAWING, str(path), polylines=True)
+    counts = _counts(path)
+    assert counts.get("LWPOLYLINE", 0) >= 1
+    assert counts.get("LINE", 0) < 2
+
+
+def test_angular_dimension_is_written(tmp_path):
+    data = {"entities": [{"type": "ANGULAR_DIMENSION", "params": {
+        "center": [0, 0], "radius": 10, "start_angle": 0, "end_angle": 60, "distance": 2}}]}
+    path = tmp_path / "drawing.dxf"
+    json_to_dxf(data, str(path))
+    assert _counts(path) == {"ARC_DIMENSION": 1}
+
+
+def test_reader_round_trips_the_ezdxf_writer(tmp_path):
+    path = tmp_path / "drawing.dxf"
+    json_to_dxf(DRAWING, str(path), clean=False)
+    diff = diff_stores(EntityStore.from_json(DRAWING), read_dxf(str(path)))
+    assert diff["unchanged"] == 4
+    assert len(diff["removed"]) == len(diff["added"]) == 0
+
+
+def test_reader_round_trips_the_fast_writer(tmp_path):
+    path = tmp_path / "drawing.dxf"
+    store = EntityStore.from_json(DRAWING)
+    assert write_fast_dxf(store, str(path)) == 4
+    assert _counts(path) == {"LINE": 2, "CIRCLE": 1, "ARC": 1}
+    assert diff_stores(store, read_dxf(str(path)))["unchanged"] == 4
+
+
+def test_reader_splits_polylines_and_counts_skipped_types(tmp_path):
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    msp.add_lwpolyline([(0, 0), (10, 0), (10, 10)], close=True)
+    msp.add_text("note")
+    path = tmp_path / "drawing.dxf"
+    doc.saveas(str(path))
+
+    skipped = {}
+    entities = list(iter_dxf_entities(str(path), skipped))
+    assert [entity["type"] for entity in entities] == ["LINE", "LINE", "LINE"]
+    assert skipped == {"TEXT": 1}
+
+
+def test_diff_finds_moved_entities():
+    old = EntityStore.from_json(DRAWING)
+    moved = EntityStore.from_json(DRAWING)
+    moved.circles["center"] += 1.0
+    diff = diff_stores(old, moved)
+    assert diff["unchanged"] == 3
+    assert len(diff["removed"]) == len(diff["added"]) == 1
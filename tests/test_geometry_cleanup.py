@@ -0,0 +1,68 @@
+import numpy as np
+
+from entity_store import EntityStore
+from geometry_cleanup import clean_geometry, connected_components, join_arcs
+
+
+def _line(start, end) -> dict:
+    return {"type": "LINE", "params": {"start_point": list(start), "end_point": list(end)}}
+
+
+def _arc(center, radius, start_angle, end_angle) -> dict:
+    return {"type": "ARC", "params": {"center": list(center), "radius": radius,
+                                      "start_angle": start_angle, "end_angle": end_angle}}
+
+
+def _store(*entities) -> EntityStore:
+    return EntityStore.from_json({"entities": list(entities)})
+
+
+def test_near_coincident_endpoints_are_snapped():
+    store = _store(_line((0, 0), (10, 0)), _line((10.004, 0.003), (10, 10)))
+    report = clean_geometry(store)
+    assert report["snapped_endpoints"] == 2
+    assert np.array_equal(store.lines["end"][0], store.lines["start"][1])
+
+
+def test_overlapping_collinear_lines_are_merged():
+    store = _store(_line((0, 0), (6, 0)), _line((4, 0), (10, 0)), _line((0, 5), (10, 5)))
+    report = clean_geometry(store)
+    assert report["merged_lines"] == 1
+    assert len(store.lines) == 2
+    merged = sorted(store.to_json()["entities"], key=lambda e: e["params"]["start_point"][1])[0]["params"]
+    assert sorted([merged["start_point"][0], merged["end_point"][0]]) == [0, 10]
+
+
+def test_duplicate_circles_and_contained_arcs_are_dropped():
+    circle = {"type": "CIRCLE", "params": {"center": [0, 0], "radius": 5}}
+    store = _store(circle, circle, _arc((0, 0), 5, 0, 90), _arc((0, 0), 8, 0, 90))
+    report = clean_geometry(store)
+    assert report["duplicate_circles"] == 1
+    assert report["contained_arcs"] == 1
+    assert len(store.circles) == 1
+    assert store.arcs["radius"].tolist() == [8]
+
+
+def test_separate_entities_are_left_alone():
+    store = _store(_line((0, 0), (10, 0)), _line((0, 1), (10, 1)), _arc((20, 20), 3, 0, 180))
+    report = clean_geometry(store)
+    assert report["merged_entities"] == 0
+    assert report["snapped_endpoints"] == 0
+    assert len(store) == 3
+
+
+def test_arc_pieces_are_joined_and_full_turns_become_circles():
+    store = _store(_arc((0, 0), 5, 0, 90), _arc((0, 0), 5, 90, 200), _arc((20, 0), 2, 0, 180),
+                   _arc((20, 0), 2, 180, 360))
+    assert join_arcs(store) > 0
+    assert len(store.arcs) == 1
+    assert (store.arcs["start_angle"][0], store.arcs["end_angle"][0]) == (0, 200)
+    assert len(store.circles) == 1
+    assert store.circles["radius"].tolist() == [2]
+
+
+def test_connected_components():
+    labels = connected_components(5, np.array([[0, 1], [1, 2], [3, 4]]))
+    assert labels[0] == labels[1] == labels[2]
+    assert labels[3] == labels[4]
+    assert labels[0] != labels[3]
@@ -0,0 +1,80 @@
+import os
+
+from job_store import JobStore
+
+
+def _image(tmp_path, name: str, content: bytes = b"image") -> str:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_new_images_are_pending(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    images = [_image(tmp_path, "a.png"), _image(tmp_path, "b.png")]
+    store.add(images)
+    assert store.todo(images) == images
+    assert store.counts() == {"pending": 2}
+
+
+def test_done_image_is_skipped_while_its_outputs_exist(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    image = _image(tmp_path, "a.png")
+    output = tmp_path / "a.json"
+    output.write_text("{}")
+    store.add([image])
+    store.start(image)
+    store.finish(image, [str(output)], seconds=0.5)
+    assert store.todo([image]) == []
+
+    os.remove(output)
+    assert store.todo([image]) == [image]
+
+
+def test_interrupted_image_runs_again(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    image = _image(tmp_path, "a.png")
+    store.add([image])
+    store.start(image)
+    store.close()
+
+    reopened = JobStore(str(tmp_path / "jobs.sqlite3"))
+    assert reopened.todo([image]) == [image]
+
+
+def test_failed_image_waits_for_requeue(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    images = [_image(tmp_path, "a.png"), _image(tmp_path, "b.png")]
+    store.add(images)
+    for image in images:
+        store.start(image)
+        store.finish(image, [], error="ValueError: bad response")
+    assert store.todo(images) == []
+    assert [row[0] for row in store.failed()] == images
+
+    assert store.requeue_failed([images[0]]) == 1
+    assert store.todo(images) == [images[0]]
+    assert store.requeue_failed() == 1
+    assert store.todo(images) == images
+
+
+def test_changed_image_goes_back_to_pending(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    image = _image(tmp_path, "a.png")
+    output = tmp_path / "a.json"
+    output.write_text("{}")
+    store.add([image])
+    store.start(image)
+    store.finish(image, [str(output)])
+
+    _image(tmp_path, "a.png", b"edited image")
+    store.add([image])
+    assert store.todo([image]) == [image]
+
+
+def test_clear_forgets_everything(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    images = [_image(tmp_path, "a.png"), _image(tmp_path, "b.png")]
+    store.add(images)
+    assert store.clear() == 2
+    assert store.counts() == {}
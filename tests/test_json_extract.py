@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from json_extract import parse_model_json, parse_with_repairs
+from stream_entities import EntityStreamParser, iter_entities
+
+LINE = {"type": "LINE", "params": {"start_point": [0, 0], "end_point": [10, 0]}}
+CIRCLE = {"type": "CIRCLE", "params": {"center": [5, 5], "radius": 2}}
+
+
+def test_plain_and_fenced_json():
+    assert parse_model_json('{"entities": []}') == {"entities": []}
+    assert parse_model_json('Here you go:\n```json\n{"entities": []}\n```\nDone.') == {"entities": []}
+
+
+def test_valid_json_needs_no_repairs():
+    assert parse_with_repairs(json.dumps({"entities": [LINE]})) == ({"entities": [LINE]}, [])
+
+
+@pytest.mark.parametrize("text", [
+    '{"entities": [{"type": "CIRCLE", "params": {"center": [5, 5], "radius": 2,},},]}',
+    "{'entities': [{'type': 'CIRCLE', 'params': {'center': [5, 5], 'radius': 2}}]}",
+    '{entities: [{type: "CIRCLE", params: {center: [5, 5], radius: 2}}]}',
+    '{"entities": [ // the only circle\n{"type": "CIRCLE", /* hole */ "params": {"center": [5, 5], "radius": 2}}]}',
+])
+def test_common_defects_are_repaired(text):
+    data, repairs = parse_with_repairs(text)
+    assert data == {"entities": [CIRCLE]}
+    assert repairs
+
+
+def test_python_literals_are_repaired():
+    data, _ = parse_with_repairs('{"closed": True, "layer": None, "hidden": False}')
+    assert data == {"closed": True, "layer": None, "hidden": False}
+
+
+def test_truncated_response_keeps_the_complete_entities():
+    text = json.dumps({"entities": [LINE, CIRCLE]})
+    cut = text[:text.rindex('"radius"')]
+    data, repairs = parse_with_repairs(cut)
+    assert data == {"entities": [LINE]}
+    assert repairs
+
+
+def test_text_without_json_raises():
+    with pytest.raises(json.JSONDecodeError):
+        parse_model_json("Sorry, I cannot read this drawing.")
+
+
+def test_stream_parser_yields_entities_as_they_complete():
+    text = json.dumps({"entities": [LINE, CIRCLE]})
+    parser = EntityStreamParser()
+    split = text.index("CIRCLE")
+    assert parser.feed(text[:split]) == [LINE]
+    assert parser.feed(text[split:]) == [CIRCLE]
+    assert parser.done
+
+
+def test_stream_parser_handles_braces_in_strings():
+    entity = {"type": "TEXT", "params": {"text": "R5 {typ} ]"}}
+    text = json.dumps({"entities": [entity, LINE]})
+    assert list(iter_entities(text[i:i + 7] for i in range(0, len(text), 7))) == [entity, LINE]
+
+
+def test_stream_parser_repairs_or_skips_bad_objects():
+    text = ('{"entities": [{"type": "LINE", "params": {"start_point": [0, 0], "end_point": [10, 0],},},'
+            ' {"type": LINE "params"}, ' + json.dumps(CIRCLE) + ']}')
+    parser = EntityStreamParser()
+    assert list(iter_entities([text], parser)) == [LINE, CIRCLE]
+    assert parser.repaired == 1
+    assert parser.malformed == 1
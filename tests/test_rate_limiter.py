@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from rate_limiter import RateLimiter, TokenBucket, error_status, estimate_tokens
+
+
+class ApiError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+def _limiter(**kwargs) -> RateLimiter:
+    # No backoff sleeps, and buckets large enough never to block
+    options = dict(requests_per_minute=60000, tokens_per_minute=1e9, max_concurrency=4, base_delay=0.0)
+    options.update(kwargs)
+    return RateLimiter(**options)
+
+
+def test_error_status():
+    assert error_status(ApiError(429)) == 429
+    assert error_status(ApiError(503)) == 503
+    assert error_status(ApiError(400)) is None
+    assert error_status(ConnectionError()) == 503
+    assert error_status(ValueError()) is None
+
+
+def test_estimate_tokens_counts_text_and_images():
+    assert estimate_tokens(["x" * 400]) == estimate_tokens([]) + 100
+    assert estimate_tokens(["text", object()]) > estimate_tokens(["text"])
+
+
+def test_bucket_blocks_until_refilled():
+    bucket = TokenBucket(per_minute=600, capacity=1)
+    bucket.acquire()
+    start = time.monotonic()
+    bucket.acquire()
+    # 600 per minute is one every 0.1s
+    assert time.monotonic() - start >= 0.08
+
+
+def test_transient_errors_are_retried():
+    limiter = _limiter()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ApiError(500)
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert len(attempts) == 3
+    assert limiter.stats()["retries"] == 2
+
+
+def test_other_errors_are_raised_at_once():
+    limiter = _limiter()
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limiter.call(broken)
+    assert len(attempts) == 1
+    assert limiter.in_flight == 0
+
+
+def test_retries_give_up_after_max_retries():
+    limiter = _limiter(max_retries=2)
+    with pytest.raises(ApiError):
+        limiter.call(lambda: (_ for _ in ()).throw(ApiError(503)))
+    assert limiter.stats()["failures"] == 1
+
+
+def test_quota_error_halves_concurrency_and_successes_grow_it_back():
+    limiter = _limiter(max_retries=0)
+    with pytest.raises(ApiError):
+        limiter.call(lambda: (_ for _ in ()).throw(ApiError(429)))
+    assert limiter.concurrency == 2
+
+    for _ in range(2):
+        limiter.call(lambda: None)
+    assert limiter.concurrency == 3
+
+
+def test_in_flight_never_exceeds_concurrency():
+    limiter = _limiter(max_concurrency=2)
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            peak.append(limiter.in_flight)
+        time.sleep(0.02)
+
+    threads = [threading.Thread(target=limiter.call, args=(work,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) <= limiter.max_concurrency
+    assert limiter.in_flight == 0
+
+
+def test_held_slot_is_released_explicitly():
+    limiter = _limiter()
+    limiter.call(lambda: None, hold=True)
+    assert limiter.in_flight == 1
+    limiter.release()
+    assert limiter.in_flight == 0
@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from json_extract import parse_model_json
+from response_cache import ResponseCache, generate_text, stream_text
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeModel:
+    model_name = "fake-model"
+
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        text = self.texts[min(self.calls, len(self.texts) - 1)]
+        self.calls += 1
+        if stream:
+            return iter([FakeResponse(text[:len(text) // 2]), FakeResponse(text[len(text) // 2:])])
+        return FakeResponse(text)
+
+
+def test_key_depends_on_prompt_model_and_config(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    key = cache.key(["prompt"], "model")
+    assert key == cache.key(["prompt"], "model")
+    assert key != cache.key(["other prompt"], "model")
+    assert key != cache.key(["prompt"], "other model")
+    assert key != cache.key(["prompt"], "model", {"response_mime_type": "application/json"})
+
+
+def test_second_call_is_served_from_the_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    model = FakeModel('{"entities": []}')
+    assert generate_text(model, ["prompt"], cache, parse=parse_model_json) == {"entities": []}
+    assert generate_text(model, ["prompt"], cache, parse=parse_model_json) == {"entities": []}
+    assert model.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_response_that_does_not_parse_is_not_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    model = FakeModel("no json here", '{"entities": []}')
+    with pytest.raises(json.JSONDecodeError):
+        generate_text(model, ["prompt"], cache, parse=parse_model_json)
+    assert os.listdir(tmp_path) == []
+
+    assert generate_text(model, ["prompt"], cache, parse=parse_model_json) == {"entities": []}
+    assert model.calls == 2
+
+
+def test_cached_entry_that_no_longer_parses_is_discarded(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    key = cache.key(["prompt"], FakeModel.model_name)
+    cache.put(key, "stored before parsing", FakeModel.model_name)
+    with pytest.raises(json.JSONDecodeError):
+        generate_text(FakeModel('{"entities": []}'), ["prompt"], cache, parse=parse_model_json)
+    assert cache.get(key) is None
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_seconds=-1)
+    key = cache.key(["prompt"], "model")
+    cache.put(key, "text", "model")
+    assert cache.get(key) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_eviction_keeps_the_most_recently_used_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    keys = [cache.key([f"prompt {i}"], "model") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, "x" * 100, "model")
+        # mtime is the recency eviction goes by, keep the order unambiguous
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    cache.put(cache.key(["prompt 3"], "model"), "x" * 100, "model")
+
+    assert cache.get(keys[0]) is None
+    total = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+    assert total <= 250
+    assert cache._size == total
+
+
+def test_stream_is_stored_only_when_it_parses(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert "".join(stream_text(FakeModel('{"entities": [] broken'), ["prompt"], cache,
+                               parse=lambda text: json.loads(text))) == '{"entities": [] broken'
+    assert os.listdir(tmp_path) == []
+
+    model = FakeModel('{"entities": []}')
+    assert "".join(stream_text(model, ["prompt"], cache, parse=json.loads)) == '{"entities": []}'
+    assert "".join(stream_text(model, ["prompt"], cache, parse=json.loads)) == '{"entities": []}'
+    assert model.calls == 1
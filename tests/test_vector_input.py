@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+import vector_input
+from vector_input import PDF_POINT_MM, read_pdf, read_svg
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def _by_type(data: dict) -> dict:
+    out = {}
+    for entity in data["entities"]:
+        out.setdefault(entity["type"], []).append(entity["params"])
+    return out
+
+
+def test_svg_shapes_paths_and_transforms():
+    entities = _by_type(read_svg(os.path.join(DATA, "drawing.svg")))
+    # Rectangle (4), the two legs of the U path and the translated line; the filled arrowhead and text are skipped
+    assert len(entities["LINE"]) == 7
+    assert entities["CIRCLE"] == [{"center": [60.0, 50.0], "radius": 15.0}]
+    arc = entities["ARC"][0]
+    assert arc["center"] == pytest.approx([160.0, 70.0])
+    assert arc["radius"] == pytest.approx(20.0)
+    # y is flipped, so the bottom of the U runs anti clockwise from 180 to 0 degrees
+    assert (arc["start_angle"], arc["end_angle"]) == pytest.approx((180.0, 0.0))
+
+
+def test_svg_scale():
+    entities = _by_type(read_svg(os.path.join(DATA, "drawing.svg"), scale=2.0))
+    assert entities["CIRCLE"][0]["radius"] == 30.0
+
+
+def test_pdf_strokes_beziers_and_forms():
+    entities = _by_type(read_pdf(os.path.join(DATA, "drawing.pdf")))
+    # Stroked rectangle (4) and the line in the form XObject; the filled arrowhead, text and image are skipped
+    assert len(entities["LINE"]) == 5
+    circle = entities["CIRCLE"][0]
+    assert circle["radius"] == pytest.approx(20 * PDF_POINT_MM, rel=1e-3)
+    assert circle["center"] == pytest.approx([100 * PDF_POINT_MM, 50 * PDF_POINT_MM], rel=1e-3)
+    form_line = max(entities["LINE"], key=lambda params: params["start_point"][0])
+    assert form_line["start_point"][0] == pytest.approx(250 * PDF_POINT_MM)
+
+
+def test_pdf_decodes_only_the_streams_it_reads(monkeypatch):
+    decoded = []
+    decode = vector_input._decode
+
+    def counting_decode(text, data):
+        decoded.append(text)
+        return decode(text, data)
+
+    monkeypatch.setattr(vector_input, "_decode", counting_decode)
+    # The image XObject holds data that is not valid Flate, decoding it would raise
+    read_pdf(os.path.join(DATA, "drawing.pdf"))
+    assert len(decoded) == 2
+    assert not any("/Image" in text for text in decoded)
+
+
+def test_pdf_page_out_of_range():
+    with pytest.raises(ValueError):
+        read_pdf(os.path.join(DATA, "drawing.pdf"), page=1)
+
+
+def test_extract_vector_writes_json_and_dxf(tmp_path):
+    output = str(tmp_path / "drawing.json")
+    data = vector_input.extract_vector(os.path.join(DATA, "drawing.svg"), output)
+    with open(output) as f:
+        assert json.load(f) == data
+    assert os.path.exists(str(tmp_path / "drawing.dxf"))
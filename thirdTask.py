@@ -2,25 +2,16 @@
 
 import os
 import json
-import sys
-import google.generativeai as genai
-from PIL import Image
-from dotenv import load_dotenv
-import google.generativeai as genai
+from backends import DIMENSION_RECORDINGS, create_backend
+from preprocess import preprocess_image
+from instrumentation import instrumented
+from json_extract import parse_model_json
+from response_cache import generate_text
 
-load_dotenv()
-
-try:
-    API_KEY = os.environ["gemini_api_key"]
-except KeyError:
-    print("Error: The 'gemini_api_key' environment variable is not set.")
-    print("Please check your .env file or environment variables.")
-    sys.exit(1)
-
-genai.configure(api_key=API_KEY)
-
-vision_model = genai.GenerativeModel('gemini-2.5-flash')
+# The backend is picked by AUTOLAB_BACKEND, see backends.py
+vision_model = create_backend('gemini-2.5-flash', DIMENSION_RECORDINGS)
 
+@instrumented
 def extract_dimensions_to_json(image_path: str, output_filename: str):
   
     print(f"\n--- Analyzing image: {image_path} ---")
@@ -29,7 +20,7 @@ def extract_dimensions_to_json(image_path: str, output_filename: str):
         return
 
     try:
-        img = Image.open(image_path)
+        img = preprocess_image(image_path)
 
 
         #dimensions_and_entities.json
@@ -61,29 +52,19 @@ def extract_dimensions_to_json(image_path: str, output_filename: str):
             "Do not include any text outside the JSON. Only output JSON based on the attached image.",
             img
         ]
-        response = vision_model.generate_content(prompt)
-        
-        # This part cleans the raw response to extract the JSON block
-        json_start = response.text.find('```json')
-        json_end = response.text.rfind('```')
+        # Finds the JSON in the response, with or without a ```json block, and repairs small defects
+        data = generate_text(vision_model, prompt, parse=parse_model_json)
         
-        if json_start != -1 and json_end != -1:
-            json_str = response.text[json_start+7:json_end].strip()
-            data = json.loads(json_str)
-            
-            with open(output_filename, 'w') as f:
-                json.dump(data, f, indent=4)
-            print(f"Successfully saved dimensions to {output_filename}")
-            print(json.dumps(data, indent=4))
-        else:
-            print("Error: Could not find JSON block in the model's response.")
-            print("Raw response:")
-            print(response.text)
+        with open(output_filename, 'w') as f:
+            json.dump(data, f, indent=4)
+        print(f"Successfully saved dimensions to {output_filename}")
+        print(json.dumps(data, indent=4))
+        return data
 
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON: {e}")
         print("Raw response was:")
-        print(response.text)
+        print(e.doc)
     except Exception as e:
         print(f"An error occurred: {e}")
 
@@ -0,0 +1,180 @@
+#Tiled extraction for drawings too large to send as one image.
+#The sheet is cut into overlapping tiles at full resolution, every tile is sent to the model on its own (several at
+#once), and the model gives coordinates in pixels of the tile. Those are moved to sheet coordinates and the pieces
+#of entities cut at tile edges are stitched back together: collinear lines overlapping in the shared band are merged
+#(geometry_cleanup), arcs on the same circle are joined, and arcs that add up to a full turn become a circle.
+#The tiles are extracted in sheet pixels. To give the same drawing units as the single-image path, the whole
+#(downscaled) image is also sent once as a normal request, next to the tiles, and the stitched geometry is scaled
+#so its extent matches that answer; the tiles supply the detail, the whole-image answer the scale. Callers that
+#know the scale pass units_per_pixel instead and the extra request is skipped.
+#Origin at the bottom-left of the geometry.
+#A tile that fails is tried again; if it still fails the whole image is sent as one request instead.
+#
+#   python tiling.py <image> [output json] [tile size]
+
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from entity_binary import write_output
+from entity_store import EntityStore
+from geometry_cleanup import clean_geometry, join_arcs
+from instrumentation import instrumented, stage
+from json_extract import parse_model_json
+from preprocess import is_line_drawing, otsu_threshold, preprocess_image
+from prompts import CAD_GEOMETRY_V1, CAD_GEOMETRY_V2, prompt_parts
+from response_cache import generate_text
+from dxf_writer import json_to_dxf
+from sixthTask2 import extract_cad_data_to_json, model
+
+DEFAULT_TILE_SIZE = 1600
+DEFAULT_OVERLAP = 200
+DEFAULT_WORKERS = 4
+TILE_ATTEMPTS = 2
+# Stitching tolerances, in pixels and degrees: the model's pixel coordinates are only roughly right
+STITCH_TOLERANCE = 4.0
+STITCH_ANGLE_TOLERANCE = 1.0
+
+TILE_INSTRUCTIONS = """
+            **Tile of a larger sheet:** The image is a {width} x {height} pixel tile cut out of a larger drawing.
+            Ignore the origin rule above: give every coordinate and radius in pixels of this image, with (0, 0) at
+            its bottom-left corner and y pointing up. Entities that run off the edge of the image end exactly at
+            the edge (a line stops at the border, a cut circle becomes an ARC). Do not guess what lies outside.
+"""
+
+
+# (left, top, right, bottom) boxes covering a width x height image, neighbours sharing overlap pixels
+def plan_tiles(width: int, height: int, tile_size: int = DEFAULT_TILE_SIZE, overlap: int = DEFAULT_OVERLAP) -> list:
+    if overlap >= tile_size:
+        raise ValueError("overlap must be smaller than tile_size")
+
+    def starts(length: int) -> list:
+        if length <= tile_size:
+            return [0]
+        count = math.ceil((length - overlap) / (tile_size - overlap))
+        step = (length - tile_size) / (count - 1)
+        return [round(i * step) for i in range(count)]
+
+    return [(left, top, min(left + tile_size, width), min(top + tile_size, height))
+            for top in starts(height) for left in starts(width)]
+
+
+# The model's answer for one tile, moved to sheet pixels with y up (the sheet is height pixels tall)
+@instrumented
+def extract_tile(tile: Image.Image, box: tuple, height: int) -> EntityStore:
+    prompt = prompt_parts("cad_geometry", CAD_GEOMETRY_V2.version) + [TILE_INSTRUCTIONS.format(width=tile.width, height=tile.height), tile]
+    store = EntityStore.from_json(generate_text(model, prompt, parse=parse_model_json))
+    store.drop_invalid()
+    left, top, _, bottom = box
+    store.translate(left, height - bottom)
+    return store
+
+
+# The single-image answer for the whole drawing, in drawing units (the prompt sixthTask2 uses)
+def extract_whole(image_path: str) -> EntityStore:
+    prompt = prompt_parts("cad_geometry", CAD_GEOMETRY_V1.version) + [preprocess_image(image_path)]
+    store = EntityStore.from_json(generate_text(model, prompt, parse=parse_model_json))
+    store.drop_invalid()
+    return store
+
+
+# Drawing units per sheet pixel: the extent of the whole-image answer over the extent of the stitched tiles
+def drawing_scale(whole: EntityStore, stitched: EntityStore):
+    whole_box, pixel_box = whole.bbox(), stitched.bbox()
+    if whole_box is None or pixel_box is None:
+        return None
+    whole_size = (whole_box[2] - whole_box[0]) + (whole_box[3] - whole_box[1])
+    pixel_size = (pixel_box[2] - pixel_box[0]) + (pixel_box[3] - pixel_box[1])
+    return whole_size / pixel_size if whole_size > 0 and pixel_size > 0 else None
+
+
+# Splits the image into tiles, extracts them concurrently and stitches the results. Writes the JSON and DXF like
+# the scripts do and returns the data, or None on failure. Images that fit in one tile are sent whole.
+# units_per_pixel=None scales the result to the drawing units of the single-image path (see above).
+@instrumented
+def extract_tiled(image_path: str, output_filename: str, tile_size: int = DEFAULT_TILE_SIZE,
+                  overlap: int = DEFAULT_OVERLAP, workers: int = DEFAULT_WORKERS, units_per_pixel: float = None):
+    print(f"\n--- Analyzing image in tiles: {image_path} ---")
+    if not os.path.exists(image_path):
+        print(f"Error: Image file not found at {image_path}")
+        return None
+
+    img = ImageOps.exif_transpose(Image.open(image_path)).convert("L")
+    boxes = plan_tiles(img.width, img.height, tile_size, overlap)
+    if len(boxes) == 1:
+        return extract_cad_data_to_json(image_path, output_filename)
+
+    # One threshold for the whole sheet, so a tile of mostly paper is not binarized on its own histogram. Like
+    # preprocess_image, only line drawings are binarized.
+    sheet = img
+    if is_line_drawing(img):
+        threshold = otsu_threshold(img)
+        sheet = img.point(lambda v: 255 if v >= threshold else 0)
+    print(f"Split {img.width}x{img.height} into {len(boxes)} tiles of up to {tile_size}px ({overlap}px overlap)")
+
+    def run(box):
+        for attempt in range(1, TILE_ATTEMPTS + 1):
+            try:
+                return extract_tile(sheet.crop(box), box, img.height)
+            except Exception as e:
+                print(f"Tile {box} failed ({type(e).__name__}: {e}), attempt {attempt}/{TILE_ATTEMPTS}")
+        return None
+
+    def run_whole():
+        try:
+            return extract_whole(image_path)
+        except Exception as e:
+            print(f"Whole-image request for the scale failed ({type(e).__name__}: {e})")
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        whole = pool.submit(run_whole) if units_per_pixel is None else None
+        stores = list(pool.map(run, boxes))
+        whole = whole.result() if whole is not None else None
+    failed = sum(store is None for store in stores)
+    if failed:
+        # A partial drawing is worse than a less detailed one
+        print(f"{failed} of {len(boxes)} tiles failed, sending the whole image instead")
+        return extract_cad_data_to_json(image_path, output_filename)
+
+    store = EntityStore(
+        lines=np.concatenate([s.lines for s in stores]),
+        circles=np.concatenate([s.circles for s in stores]),
+        arcs=np.concatenate([s.arcs for s in stores]),
+        other=[entity for s in stores for entity in s.other],
+    )
+    pieces = len(store)
+    with stage("stitch"):
+        stitched = join_arcs(store, STITCH_TOLERANCE, STITCH_ANGLE_TOLERANCE)
+        report = clean_geometry(store, STITCH_TOLERANCE, STITCH_ANGLE_TOLERANCE)
+        store.shift_origin_to_bbox()
+    print(f"Stitched {pieces} entities from {len(boxes)} tiles into {len(store)} "
+          f"({stitched} arcs joined, {report['merged_entities']} lines and duplicates merged) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    if units_per_pixel is None:
+        units_per_pixel = drawing_scale(whole, store) if whole is not None else None
+        if units_per_pixel is None:
+            print("Could not work out the drawing units, sending the whole image instead")
+            return extract_cad_data_to_json(image_path, output_filename)
+        print(f"Scaled to drawing units: {units_per_pixel:.5g} per pixel")
+    store.scale(units_per_pixel)
+
+    data = store.to_json()
+    write_output(data, output_filename)
+    with stage("dxf_write"):
+        json_to_dxf(data, output_filename.replace(".json", ".dxf"))
+    return data
+
+
+if __name__ == "__main__":
+    image_file = sys.argv[1] if len(sys.argv) > 1 else r"D:\AutoLab\cad_image\circles.png"
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(os.path.basename(image_file))[0] + "_tiled.json"
+    tile = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_TILE_SIZE
+    extract_tiled(image_file, output_file, tile_size=tile)
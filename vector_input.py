@@ -0,0 +1,717 @@
+#Reads vector drawings (SVG, and PDF exported from CAD) straight into the {"entities": [...]} schema, no model call.
+#Stroked path segments become LINEs, SVG arcs and circles become ARCs and CIRCLEs, and cubic Beziers that follow a
+#circle (how CAD programs write arcs into PDF and SVG) become ARCs; other curves are split into short LINEs.
+#Arcs written as several Bezier pieces are joined again (geometry_cleanup.join_arcs), so a full circle comes back
+#as one CIRCLE. Filled-only shapes (arrowheads, text outlines) and text are skipped.
+#Only the standard library is used: SVG through ElementTree, PDF by reading the page content streams
+#(plain or Flate compressed, including object streams and form XObjects).
+#
+#Units: SVG user units, PDF points converted to millimetres on paper, both times scale. Origin at the bottom-left
+#of the geometry.
+#
+#   python vector_input.py <drawing.svg|drawing.pdf> [output json]
+
+import base64
+import math
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+
+from dxf_writer import json_to_dxf
+from entity_binary import write_output
+from entity_store import EntityStore
+from geometry_cleanup import clean_geometry, join_arcs
+from instrumentation import instrumented, stage
+
+VECTOR_EXTENSIONS = (".svg", ".pdf")
+PDF_POINT_MM = 25.4 / 72
+# Largest distance of a Bezier from the circle through its ends and middle, relative to the radius,
+# for it to count as an arc (the usual 4-piece circle is off by 0.03%)
+ARC_FIT_TOLERANCE = 1e-3
+CURVE_SEGMENTS = 16
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+# Affine matrices are (a, b, c, d, e, f): x' = a*x + c*y + e, y' = b*x + d*y + f.
+# multiply(first, then) applies first and then then.
+def multiply(first: tuple, then: tuple) -> tuple:
+    a1, b1, c1, d1, e1, f1 = first
+    a2, b2, c2, d2, e2, f2 = then
+    return (a1 * a2 + b1 * c2, a1 * b2 + b1 * d2,
+            c1 * a2 + d1 * c2, c1 * b2 + d1 * d2,
+            e1 * a2 + f1 * c2 + e2, e1 * b2 + f1 * d2 + f2)
+
+
+def apply(matrix: tuple, point: tuple) -> tuple:
+    a, b, c, d, e, f = matrix
+    x, y = point
+    return a * x + c * y + e, b * x + d * y + f
+
+
+# Uniform scale for a rotation/reflection plus scale matrix, None when it stretches or skews
+def _similarity_scale(matrix: tuple):
+    a, b, c, d = matrix[:4]
+    sx, sy = math.hypot(a, b), math.hypot(c, d)
+    if abs(sx - sy) > 1e-9 * max(sx, sy, 1.0) or abs(a * c + b * d) > 1e-9 * max(sx * sy, 1.0):
+        return None
+    return sx
+
+
+def _cubic_point(p0, p1, p2, p3, t: float) -> tuple:
+    u = 1 - t
+    return tuple(u * u * u * p0[k] + 3 * u * u * t * p1[k] + 3 * u * t * t * p2[k] + t * t * t * p3[k] for k in (0, 1))
+
+
+# Where the normals at the ends of a Bezier meet: the exact centre when the curve approximates a circular arc
+def _normals_center(p0, p1, p2, p3):
+    t0 = (p1[0] - p0[0], p1[1] - p0[1])
+    t3 = (p3[0] - p2[0], p3[1] - p2[1])
+    det = t0[0] * t3[1] - t0[1] * t3[0]
+    if abs(det) < 1e-12 * max(math.hypot(*t0) * math.hypot(*t3), 1e-300):
+        return None
+    # Solve p0 + s * perp(t0) = p3 + u * perp(t3)
+    dx, dy = p3[0] - p0[0], p3[1] - p0[1]
+    s = (dx * t3[0] + dy * t3[1]) / det
+    return p0[0] - s * t0[1], p0[1] + s * t0[0]
+
+
+def _circumcenter(p, q, r):
+    d = 2 * (p[0] * (q[1] - r[1]) + q[0] * (r[1] - p[1]) + r[0] * (p[1] - q[1]))
+    if abs(d) < 1e-12:
+        return None
+    p2, q2, r2 = p[0] ** 2 + p[1] ** 2, q[0] ** 2 + q[1] ** 2, r[0] ** 2 + r[1] ** 2
+    return ((p2 * (q[1] - r[1]) + q2 * (r[1] - p[1]) + r2 * (p[1] - q[1])) / d,
+            (p2 * (r[0] - q[0]) + q2 * (p[0] - r[0]) + r2 * (q[0] - p[0])) / d)
+
+
+# Collects entities in output coordinates (already transformed)
+class _Geometry:
+    def __init__(self):
+        self.entities = []
+
+    def line(self, start: tuple, end: tuple):
+        if start != end:
+            self.entities.append({"type": "LINE", "params": {"start_point": list(start), "end_point": list(end)}})
+
+    def circle(self, center: tuple, radius: float):
+        self.entities.append({"type": "CIRCLE", "params": {"center": list(center), "radius": radius}})
+
+    # Arc from start to end around center, anti-clockwise when ccw is True
+    def arc(self, center: tuple, start: tuple, end: tuple, ccw: bool):
+        if not ccw:
+            start, end = end, start
+        radius = math.hypot(start[0] - center[0], start[1] - center[1])
+        self.entities.append({"type": "ARC", "params": {
+            "center": list(center), "radius": radius,
+            "start_angle": math.degrees(math.atan2(start[1] - center[1], start[0] - center[0])) % 360.0,
+            "end_angle": math.degrees(math.atan2(end[1] - center[1], end[0] - center[0])) % 360.0,
+        }})
+
+    def polyline(self, points: list):
+        for start, end in zip(points, points[1:]):
+            self.line(start, end)
+
+    def cubic(self, p0, p1, p2, p3):
+        mid = _cubic_point(p0, p1, p2, p3, 0.5)
+        chord = math.hypot(p3[0] - p0[0], p3[1] - p0[1])
+        # Control points on the chord: a straight line written as a curve
+        if all(abs((p[0] - p0[0]) * (p3[1] - p0[1]) - (p[1] - p0[1]) * (p3[0] - p0[0])) <= 1e-9 * max(chord, 1.0) ** 2
+               for p in (p1, p2)):
+            self.line(p0, p3)
+            return
+        center = _normals_center(p0, p1, p2, p3) or _circumcenter(p0, mid, p3)
+        if center is not None and p0 != p3:
+            radius = math.hypot(p0[0] - center[0], p0[1] - center[1])
+            checks = [_cubic_point(p0, p1, p2, p3, t) for t in (0.125, 0.25, 0.75, 0.875)]
+            if all(abs(math.hypot(p[0] - center[0], p[1] - center[1]) - radius) <= ARC_FIT_TOLERANCE * radius
+                   for p in checks):
+                turn = (mid[0] - p0[0]) * (p3[1] - mid[1]) - (mid[1] - p0[1]) * (p3[0] - mid[0])
+                self.arc(center, p0, p3, turn > 0)
+                return
+        self.polyline([_cubic_point(p0, p1, p2, p3, i / CURVE_SEGMENTS) for i in range(CURVE_SEGMENTS + 1)])
+
+
+# Cleans up the collected entities (joins Bezier arcs into arcs and circles, merges duplicates) and moves the
+# origin to the bottom-left of the drawing
+def _finish(geometry: _Geometry, scale: float) -> dict:
+    store = EntityStore.from_json({"entities": geometry.entities})
+    store.drop_invalid()
+    if len(store) == 0:
+        return {"entities": []}
+    bbox = store.bbox()
+    tol = max(bbox[2] - bbox[0], bbox[3] - bbox[1], 1e-9) * 1e-6
+    join_arcs(store, tol)
+    clean_geometry(store, tol)
+    store.shift_origin_to_bbox()
+    if scale != 1.0:
+        store.scale(scale)
+    return store.to_json()
+
+
+# --- SVG ---
+
+_SVG_SKIP = {"defs", "clipPath", "mask", "marker", "symbol", "pattern", "text", "style", "metadata", "title",
+             "desc", "linearGradient", "radialGradient", "filter"}
+_NUMBER = r"[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?"
+_PATH_TOKEN = re.compile(r"[MmLlHhVvCcSsQqTtAaZz]|" + _NUMBER)
+_TRANSFORM = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+
+
+def _svg_transform(text: str) -> tuple:
+    matrix = IDENTITY
+    for name, args in _TRANSFORM.findall(text or ""):
+        v = [float(x) for x in re.findall(_NUMBER, args)]
+        if name == "matrix" and len(v) == 6:
+            step = tuple(v)
+        elif name == "translate":
+            step = (1.0, 0.0, 0.0, 1.0, v[0], v[1] if len(v) > 1 else 0.0)
+        elif name == "scale":
+            step = (v[0], 0.0, 0.0, v[1] if len(v) > 1 else v[0], 0.0, 0.0)
+        elif name == "rotate":
+            angle = math.radians(v[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step = (cos, sin, -sin, cos, 0.0, 0.0)
+            if len(v) == 3:
+                step = multiply(multiply((1.0, 0.0, 0.0, 1.0, -v[1], -v[2]), step), (1.0, 0.0, 0.0, 1.0, v[1], v[2]))
+        elif name == "skewX":
+            step = (1.0, 0.0, math.tan(math.radians(v[0])), 1.0, 0.0, 0.0)
+        elif name == "skewY":
+            step = (1.0, math.tan(math.radians(v[0])), 0.0, 1.0, 0.0, 0.0)
+        else:
+            continue
+        # The transforms in the list apply right to left
+        matrix = multiply(step, matrix)
+    return matrix
+
+
+def _svg_style(element, inherited: dict) -> dict:
+    style = dict(inherited)
+    for key in ("stroke", "display", "visibility"):
+        if element.get(key) is not None:
+            style[key] = element.get(key).strip()
+    for item in (element.get("style") or "").split(";"):
+        key, _, value = item.partition(":")
+        if key.strip() in ("stroke", "display", "visibility"):
+            style[key.strip()] = value.strip()
+    return style
+
+
+def _svg_float(element, name: str, default: float = 0.0) -> float:
+    match = re.match(_NUMBER, (element.get(name) or "").strip())
+    return float(match.group()) if match else default
+
+
+def read_svg(path: str, scale: float = 1.0) -> dict:
+    root = ET.parse(path).getroot()
+    geometry = _Geometry()
+    # SVG y grows downwards, drawings grow upwards
+    flip = (1.0, 0.0, 0.0, -1.0, 0.0, 0.0)
+    _svg_walk(root, flip, {"stroke": "none", "display": "inline", "visibility": "visible"}, geometry)
+    return _finish(geometry, scale)
+
+
+def _svg_walk(element, parent_matrix: tuple, inherited: dict, geometry: _Geometry):
+    tag = element.tag.rsplit("}", 1)[-1]
+    if tag in _SVG_SKIP:
+        return
+    matrix = multiply(_svg_transform(element.get("transform")), parent_matrix)
+    style = _svg_style(element, inherited)
+    if style["display"] == "none":
+        return
+    if style["stroke"] != "none" and style["visibility"] != "hidden":
+        _svg_shape(tag, element, matrix, geometry)
+    for child in element:
+        _svg_walk(child, matrix, style, geometry)
+
+
+def _svg_shape(tag: str, element, matrix: tuple, geometry: _Geometry):
+    def point(x, y):
+        return apply(matrix, (x, y))
+
+    if tag == "line":
+        geometry.line(point(_svg_float(element, "x1"), _svg_float(element, "y1")),
+                      point(_svg_float(element, "x2"), _svg_float(element, "y2")))
+    elif tag == "rect":
+        x, y = _svg_float(element, "x"), _svg_float(element, "y")
+        w, h = _svg_float(element, "width"), _svg_float(element, "height")
+        geometry.polyline([point(x, y), point(x + w, y), point(x + w, y + h), point(x, y + h), point(x, y)])
+    elif tag in ("polyline", "polygon"):
+        values = [float(v) for v in re.findall(_NUMBER, element.get("points") or "")]
+        points = [point(values[i], values[i + 1]) for i in range(0, len(values) - 1, 2)]
+        if tag == "polygon" and points:
+            points.append(points[0])
+        geometry.polyline(points)
+    elif tag in ("circle", "ellipse"):
+        cx, cy = _svg_float(element, "cx"), _svg_float(element, "cy")
+        rx = _svg_float(element, "r") if tag == "circle" else _svg_float(element, "rx")
+        ry = rx if tag == "circle" else _svg_float(element, "ry", rx)
+        size = _similarity_scale(matrix)
+        if rx > 0 and abs(rx - ry) <= 1e-9 * rx and size is not None:
+            geometry.circle(point(cx, cy), rx * size)
+        elif rx > 0 and ry > 0:
+            steps = 4 * CURVE_SEGMENTS
+            geometry.polyline([point(cx + rx * math.cos(2 * math.pi * i / steps), cy + ry * math.sin(2 * math.pi * i / steps))
+                               for i in range(steps + 1)])
+    elif tag == "path":
+        _svg_path(element.get("d") or "", matrix, geometry)
+
+
+def _svg_path(d: str, matrix: tuple, geometry: _Geometry):
+    tokens = _PATH_TOKEN.findall(d)
+    i = 0
+    command = None
+    current = start = (0.0, 0.0)
+    last_control = None
+
+    def number():
+        nonlocal i
+        value = float(tokens[i])
+        i += 1
+        return value
+
+    # Arc flags may be written without separators ("a5 5 0 014 4")
+    def flag():
+        nonlocal i
+        token = tokens[i]
+        if len(token) > 1 and token[0] in "01":
+            tokens[i] = token[1:]
+            return token[0] == "1"
+        i += 1
+        return token not in ("0", "0.0")
+
+    def emit_cubic(p0, p1, p2, p3):
+        geometry.cubic(apply(matrix, p0), apply(matrix, p1), apply(matrix, p2), apply(matrix, p3))
+
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            command = tokens[i]
+            i += 1
+            if command in "Zz":
+                geometry.line(apply(matrix, current), apply(matrix, start))
+                current = start
+                last_control = None
+                continue
+        if command is None:
+            break
+        relative = command.islower()
+        base = current if relative else (0.0, 0.0)
+        upper = command.upper()
+        try:
+            if upper == "M":
+                current = start = (base[0] + number(), base[1] + number())
+                # Further pairs after a moveto are linetos
+                command = "l" if relative else "L"
+                last_control = None
+                continue
+            if upper == "L":
+                end = (base[0] + number(), base[1] + number())
+                geometry.line(apply(matrix, current), apply(matrix, end))
+            elif upper == "H":
+                end = ((current[0] if relative else 0.0) + number(), current[1])
+                geometry.line(apply(matrix, current), apply(matrix, end))
+            elif upper == "V":
+                end = (current[0], (current[1] if relative else 0.0) + number())
+                geometry.line(apply(matrix, current), apply(matrix, end))
+            elif upper in "CS":
+                if upper == "C":
+                    c1 = (base[0] + number(), base[1] + number())
+                else:
+                    c1 = (2 * current[0] - last_control[0], 2 * current[1] - last_control[1]) if last_control else current
+                c2 = (base[0] + number(), base[1] + number())
+                end = (base[0] + number(), base[1] + number())
+                emit_cubic(current, c1, c2, end)
+                current, last_control = end, c2
+                continue
+            elif upper in "QT":
+                if upper == "Q":
+                    q = (base[0] + number(), base[1] + number())
+                else:
+                    q = (2 * current[0] - last_control[0], 2 * current[1] - last_control[1]) if last_control else current
+                end = (base[0] + number(), base[1] + number())
+                # A quadratic is the cubic with control points two thirds of the way to q
+                emit_cubic(current, (current[0] + 2 / 3 * (q[0] - current[0]), current[1] + 2 / 3 * (q[1] - current[1])),
+                           (end[0] + 2 / 3 * (q[0] - end[0]), end[1] + 2 / 3 * (q[1] - end[1])), end)
+                current, last_control = end, q
+                continue
+            elif upper == "A":
+                rx, ry, rotation = abs(number()), abs(number()), number()
+                large, sweep = flag(), flag()
+                end = (base[0] + number(), base[1] + number())
+                _svg_arc(current, end, rx, ry, rotation, large, sweep, matrix, geometry)
+            else:
+                break
+        except (IndexError, ValueError):
+            # Path data cut short, keep what was read
+            break
+        current = end
+        last_control = None
+
+
+# SVG endpoint arc to centre form (SVG spec, appendix B.2.4)
+def _svg_arc(p0: tuple, p1: tuple, rx: float, ry: float, rotation: float, large: bool, sweep: bool,
+             matrix: tuple, geometry: _Geometry):
+    if rx == 0 or ry == 0 or p0 == p1:
+        geometry.line(apply(matrix, p0), apply(matrix, p1))
+        return
+    phi = math.radians(rotation)
+    cos, sin = math.cos(phi), math.sin(phi)
+    dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+    x1, y1 = cos * dx + sin * dy, -sin * dx + cos * dy
+    grow = (x1 / rx) ** 2 + (y1 / ry) ** 2
+    if grow > 1:
+        rx, ry = rx * math.sqrt(grow), ry * math.sqrt(grow)
+    root = math.sqrt(max(0.0, (rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1)
+                         / (rx * rx * y1 * y1 + ry * ry * x1 * x1)))
+    if large == sweep:
+        root = -root
+    cxp, cyp = root * rx * y1 / ry, -root * ry * x1 / rx
+    center = (cos * cxp - sin * cyp + (p0[0] + p1[0]) / 2, sin * cxp + cos * cyp + (p0[1] + p1[1]) / 2)
+
+    a, b, c, d = matrix[:4]
+    size = _similarity_scale(matrix)
+    if abs(rx - ry) <= 1e-9 * rx and size is not None:
+        # sweep=1 means increasing angle in the SVG's own coordinates; a mirroring matrix turns that around
+        geometry.arc(apply(matrix, center), apply(matrix, p0), apply(matrix, p1), sweep != (a * d - b * c < 0))
+        return
+
+    theta0 = math.atan2((y1 - cyp) / ry, (x1 - cxp) / rx)
+    theta1 = math.atan2((-y1 - cyp) / ry, (-x1 - cxp) / rx)
+    delta = theta1 - theta0
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+    points = []
+    for k in range(CURVE_SEGMENTS + 1):
+        t = theta0 + delta * k / CURVE_SEGMENTS
+        x, y = rx * math.cos(t), ry * math.sin(t)
+        points.append(apply(matrix, (cos * x - sin * y + center[0], sin * x + cos * y + center[1])))
+    geometry.polyline(points)
+
+
+# --- PDF ---
+
+_OBJECT = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+_REF = r"(\d+)\s+\d+\s+R"
+_PDF_TOKEN = re.compile(rb"\s+|%[^\r\n]*|/[^\s/\[\]<>(){}%]*|<<|>>|\[|\]|<[0-9A-Fa-f\s]*>|\(|"
+                        rb"[-+]?(?:\d*\.\d+|\d+\.?)|[^\s/\[\]<>(){}%]+")
+_STROKE_OPS = {b"S", b"s", b"B", b"B*", b"b", b"b*"}
+_PAINT_OPS = _STROKE_OPS | {b"f", b"F", b"f*", b"n"}
+
+
+# Objects are found by offset up front, but only the dictionaries that are looked at are sliced out, and streams
+# are only decompressed when asked for (object streams, and the content streams of the page being read), so
+# embedded fonts and images in a large PDF are never decoded.
+class _Pdf:
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        # Later definitions (incremental updates) replace earlier ones
+        self.offsets = {int(m.group(1)): m.end() for m in _OBJECT.finditer(raw)}
+        self.packed = {}
+        for number in list(self.offsets):
+            text = self.dictionary(number)
+            if re.search(r"/Type\s*/ObjStm\b", text):
+                stream = self.object(number)[1]
+                if stream is not None:
+                    self._unpack(text, stream)
+
+    def _unpack(self, text: str, stream: bytes):
+        first = int(re.search(r"/First\s+(\d+)", text).group(1))
+        count = int(re.search(r"/N\s+(\d+)", text).group(1))
+        header = [int(v) for v in stream[:first].split()]
+        for k in range(count):
+            number, offset = header[2 * k], header[2 * k + 1]
+            end = header[2 * k + 3] if k + 1 < count else len(stream) - first
+            if number not in self.offsets:
+                self.packed[number] = stream[first + offset:first + end].decode("latin-1")
+
+    # (dictionary text, position of the stream keyword or -1)
+    def _locate(self, number: int):
+        if number in self.packed:
+            return self.packed[number], -1
+        pos = self.offsets.get(number)
+        if pos is None:
+            return "", -1
+        end = self.raw.find(b"endobj", pos)
+        stream_at = self.raw.find(b"stream", pos, end if end != -1 else len(self.raw))
+        if stream_at == -1:
+            return self.raw[pos:end].decode("latin-1"), -1
+        return self.raw[pos:stream_at].decode("latin-1"), stream_at
+
+    # The dictionary text of an object, without decoding its stream
+    def dictionary(self, number: int) -> str:
+        return self._locate(number)[0]
+
+    # (dictionary text, decoded stream bytes or None)
+    def object(self, number: int):
+        text, stream_at = self._locate(number)
+        if stream_at == -1:
+            return text, None
+        start = stream_at + len(b"stream")
+        start += 2 if self.raw[start:start + 2] == b"\r\n" else 1
+        length = re.search(r"/Length\s+(?:" + _REF + r"|(\d+))", text)
+        if length and length.group(1):
+            length_text = self.dictionary(int(length.group(1)))
+            size = int(length_text.split()[0]) if length_text.split() else None
+        else:
+            size = int(length.group(2)) if length else None
+        if size is None or self.raw[start + size:start + size + 20].lstrip()[:9] != b"endstream":
+            size = self.raw.find(b"endstream", start) - start
+        return text, _decode(text, self.raw[start:start + size])
+
+    def resolve(self, value: str) -> str:
+        match = re.fullmatch(r"\s*" + _REF + r"\s*", value)
+        return self.dictionary(int(match.group(1))) if match else value
+
+    def pages(self) -> list:
+        root = re.findall(rb"/Root\s+(\d+)\s+\d+\s+R", self.raw)
+        pages = []
+        if root:
+            catalog = self.dictionary(int(root[-1]))
+            tree = re.search(r"/Pages\s+" + _REF, catalog)
+            if tree:
+                self._collect_pages(int(tree.group(1)), pages, set())
+        if not pages:
+            pages = sorted(n for n in list(self.offsets) + list(self.packed)
+                           if re.search(r"/Type\s*/Page(?![s\w])", self.dictionary(n)))
+        return pages
+
+    def _collect_pages(self, number: int, pages: list, seen: set):
+        if number in seen:
+            return
+        seen.add(number)
+        text = self.dictionary(number)
+        kids = re.search(r"/Kids\s*\[([^\]]*)\]", text)
+        if kids:
+            for kid in re.findall(_REF, kids.group(1)):
+                self._collect_pages(int(kid), pages, seen)
+        elif re.search(r"/Type\s*/Page(?![s\w])", text):
+            pages.append(number)
+
+    # Content streams of a page, joined
+    def contents(self, page: int) -> bytes:
+        text = self.dictionary(page)
+        match = re.search(r"/Contents\s*(\[[^\]]*\]|" + _REF + ")", text)
+        if not match:
+            return b""
+        refs = re.findall(_REF, match.group(1))
+        return b"\n".join(self.object(int(ref))[1] or b"" for ref in refs)
+
+    # Form XObjects by name in the Resources of an object (looked up through /Parent for pages)
+    def forms(self, number: int) -> dict:
+        seen = set()
+        while number is not None and number not in seen:
+            seen.add(number)
+            text = self.dictionary(number)
+            resources = _dict_value(text, "Resources")
+            if resources is not None:
+                xobjects = _dict_value(self.resolve(resources), "XObject")
+                if xobjects is None:
+                    return {}
+                return {name.encode("latin-1"): int(ref)
+                        for name, ref in re.findall(r"/([^\s/]+)\s+" + _REF, self.resolve(xobjects))}
+            parent = re.search(r"/Parent\s+" + _REF, text)
+            number = int(parent.group(1)) if parent else None
+        return {}
+
+
+# The value of /key in a dictionary: a nested << >> dictionary or an indirect reference
+def _dict_value(text: str, key: str):
+    match = re.search(r"/" + key + r"\s*(<<|" + _REF + ")", text)
+    if match is None:
+        return None
+    if match.group(1) != "<<":
+        return match.group(1)
+    depth = 0
+    for k in range(match.start(1), len(text) - 1):
+        pair = text[k:k + 2]
+        if pair == "<<":
+            depth += 1
+        elif pair == ">>":
+            depth -= 1
+            if depth == 0:
+                return text[match.start(1):k + 2]
+    return text[match.start(1):]
+
+
+def _decode(text: str, data: bytes):
+    filters = re.findall(r"/(FlateDecode|Fl|ASCII85Decode|A85|ASCIIHexDecode|AHx|\w+Decode)\b",
+                         text.split("/Filter", 1)[1]) if "/Filter" in text else []
+    for name in filters:
+        if name in ("FlateDecode", "Fl"):
+            try:
+                data = zlib.decompress(data)
+            except zlib.error:
+                # Some writers add junk after the compressed data
+                data = zlib.decompressobj().decompress(data)
+        elif name in ("ASCIIHexDecode", "AHx"):
+            data = bytes.fromhex(re.sub(rb"[^0-9A-Fa-f]", b"", data.split(b">")[0]).decode())
+        elif name in ("ASCII85Decode", "A85"):
+            data = base64.a85decode(data.strip().removeprefix(b"<~").split(b"~>")[0])
+        else:
+            # Image filters (DCT, JBIG2, ...) are never content streams
+            return None
+    return data
+
+
+def _skip_string(data: bytes, i: int) -> int:
+    depth = 0
+    while i < len(data):
+        ch = data[i]
+        if ch == 0x5C:
+            i += 2
+            continue
+        if ch == 0x28:
+            depth += 1
+        elif ch == 0x29:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def read_pdf(path: str, scale: float = PDF_POINT_MM, page: int = 0) -> dict:
+    with open(path, "rb") as f:
+        pdf = _Pdf(f.read())
+    pages = pdf.pages()
+    if page >= len(pages):
+        raise ValueError(f"{path} has {len(pages)} pages, no page {page}")
+    geometry = _Geometry()
+    _run_content(pdf, pdf.contents(pages[page]), pdf.forms(pages[page]), IDENTITY, geometry, depth=0)
+    return _finish(geometry, scale)
+
+
+# Runs the path operators of a content stream; text, images and colours are ignored
+def _run_content(pdf: _Pdf, data: bytes, forms: dict, ctm: tuple, geometry: _Geometry, depth: int):
+    if depth > 8:
+        return
+    stack = []
+    operands = []
+    path = []
+    current = start = (0.0, 0.0)
+    i = 0
+    n = len(data)
+
+    def user(x, y):
+        return apply(ctm, (x, y))
+
+    while i < n:
+        match = _PDF_TOKEN.match(data, i)
+        if match is None:
+            i += 1
+            continue
+        token = match.group()
+        i = match.end()
+        first = token[:1]
+        if first.isspace() or first == b"%":
+            continue
+        if token == b"(":
+            i = _skip_string(data, i - 1)
+            operands.append(None)
+            continue
+        if first in b"/[]<>" or token in (b"<<", b">>"):
+            operands.append(token)
+            continue
+        if first in b"+-.0123456789":
+            operands.append(float(token))
+            continue
+
+        op = token
+        nums = [v for v in operands if isinstance(v, float)]
+        names = [v[1:] for v in operands if isinstance(v, bytes) and v.startswith(b"/")]
+        operands = []
+        try:
+            if op == b"q":
+                stack.append(ctm)
+            elif op == b"Q":
+                ctm = stack.pop() if stack else ctm
+            elif op == b"cm":
+                ctm = multiply(tuple(nums[-6:]), ctm)
+            elif op == b"m":
+                current = start = (nums[-2], nums[-1])
+            elif op == b"l":
+                end = (nums[-2], nums[-1])
+                path.append(("L", user(*current), user(*end)))
+                current = end
+            elif op in (b"c", b"v", b"y"):
+                if op == b"c":
+                    c1, c2, end = (nums[-6], nums[-5]), (nums[-4], nums[-3]), (nums[-2], nums[-1])
+                elif op == b"v":
+                    c1, c2, end = current, (nums[-4], nums[-3]), (nums[-2], nums[-1])
+                else:
+                    c1, c2, end = (nums[-4], nums[-3]), (nums[-2], nums[-1]), (nums[-2], nums[-1])
+                path.append(("C", user(*current), user(*c1), user(*c2), user(*end)))
+                current = end
+            elif op == b"re":
+                x, y, w, h = nums[-4:]
+                corners = [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]
+                path.extend(("L", user(*p), user(*q)) for p, q in zip(corners, corners[1:]))
+                current = start = (x, y)
+            elif op == b"h":
+                if current != start:
+                    path.append(("L", user(*current), user(*start)))
+                current = start
+            elif op in _PAINT_OPS:
+                if op in _STROKE_OPS:
+                    if op in (b"s", b"b", b"b*") and current != start:
+                        path.append(("L", user(*current), user(*start)))
+                    for segment in path:
+                        if segment[0] == "L":
+                            geometry.line(segment[1], segment[2])
+                        else:
+                            geometry.cubic(*segment[1:])
+                path = []
+            elif op == b"BI":
+                end = data.find(b"EI", i)
+                while end != -1 and not (data[end - 1:end].isspace() and data[end + 2:end + 3] in (b"", b" ", b"\n", b"\r", b"\t")):
+                    end = data.find(b"EI", end + 2)
+                i = n if end == -1 else end + 2
+            elif op == b"Do" and names:
+                number = forms.get(names[-1])
+                # Image XObjects are skipped before their stream is decoded
+                if number is not None and re.search(r"/Subtype\s*/Form\b", pdf.dictionary(number)):
+                    text, content = pdf.object(number)
+                    if content is not None:
+                        matrix = re.search(r"/Matrix\s*\[([^\]]*)\]", text)
+                        form_ctm = multiply(tuple(float(v) for v in matrix.group(1).split()), ctm) if matrix else ctm
+                        _run_content(pdf, content, pdf.forms(number) or forms, form_ctm, geometry, depth + 1)
+        except (IndexError, ValueError, TypeError):
+            # Malformed operator, skip it like a viewer would
+            path = [] if op in _PAINT_OPS else path
+
+
+# Reads a .svg or .pdf into the entities schema, writes the JSON and DXF like the scripts do and returns the data,
+# or None on failure. scale=None keeps the default units (SVG user units, PDF millimetres).
+@instrumented
+def extract_vector(path: str, output_filename: str, scale: float = None):
+    print(f"\n--- Reading vector drawing: {path} ---")
+    if not os.path.exists(path):
+        print(f"Error: File not found at {path}")
+        return None
+    try:
+        with stage("vector_read"):
+            if path.lower().endswith(".pdf"):
+                data = read_pdf(path) if scale is None else read_pdf(path, scale)
+            else:
+                data = read_svg(path) if scale is None else read_svg(path, scale)
+        if not data["entities"]:
+            print(f"No stroked geometry found in {path}")
+            return None
+
+        write_output(data, output_filename)
+        print(f"Read {len(data['entities'])} entities from {path} into {output_filename}")
+        with stage("dxf_write"):
+            json_to_dxf(data, output_filename.replace(".json", ".dxf"))
+        return data
+    except Exception as e:
+        print(f"Could not read {path}: {type(e).__name__}: {e}")
+    return None
+
+
+if __name__ == "__main__":
+    drawing_file = sys.argv[1] if len(sys.argv) > 1 else r"D:\AutoLab\cad_image\drawing.svg"
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(os.path.basename(drawing_file))[0] + "_vector.json"
+    extract_vector(drawing_file, output_file)
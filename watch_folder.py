@@ -0,0 +1,264 @@
+#Long-running ingestion daemon: watches input folders and runs every new drawing through extraction -> JSON -> DXF.
+#Folders are polled (works the same on Windows shares and Linux), and a file is only picked up once its size
+#and modification time have not changed for settle_seconds, so half-copied screenshots are not sent.
+#Progress is kept in the job store, so restarting the daemon does not reprocess finished drawings.
+#A drawing that fails is tried again after retry_after seconds (doubling each time), up to max_attempts times; after
+#that it is left alone until the file changes (it stays listed as failed in the job store, see
+#secondTask --retry-failed for putting failed images back). A restarted daemon does not retry earlier failures.
+#Queue depth, in-progress count and latency are printed periodically and written as a Prometheus text file.
+#
+#   python watch_folder.py images cad_image --output watch_output --workers 4
+
+import argparse
+import os
+import queue
+import threading
+import time
+
+from batch import IMAGE_EXTENSIONS
+from entity_binary import recording_outputs
+from job_store import JobStore
+
+METRICS_FILENAME = "autolab_watch.prom"
+# Separate from secondTask's job store: rows are keyed by image path only, and a drawing that is done there (dimension
+# extraction) still needs its geometry extracted here
+WATCH_DB = "autolab_watch_jobs.sqlite3"
+DEFAULT_RETRY_AFTER = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class WatchFolder:
+    def __init__(self, directories: list, output_directory: str, extract_fn=None, workers: int = 4,
+                 poll_interval: float = 1.0, settle_seconds: float = 2.0, job_store: JobStore = None,
+                 metrics_path: str = METRICS_FILENAME, report_interval: float = 30.0,
+                 retry_after: float = DEFAULT_RETRY_AFTER, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        if extract_fn is None:
+            from sixthTask2 import extract_cad_data_to_json as extract_fn
+        self.directories = directories
+        self.output_directory = output_directory
+        self.extract_fn = extract_fn
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.job_store = job_store or JobStore(WATCH_DB)
+        self.metrics_path = metrics_path
+        self.report_interval = report_interval
+        self.retry_after = retry_after
+        self.max_attempts = max_attempts
+
+        self.queue = queue.Queue()
+        self.in_progress = 0
+        self.processed = 0
+        self.failed = 0
+        self.latency_sum = 0.0
+        self.processing_sum = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        # path -> (size, mtime, time first seen with that size and mtime)
+        self._pending = {}
+        # paths that are queued or being processed, with the (size, mtime) they were queued with
+        self._queued = {}
+        # paths already handled, with the (size, mtime) they had; dropped when the file leaves the folder
+        self._handled = {}
+        # paths that failed and will be tried again: (size, mtime), failed attempts, monotonic time of the retry
+        self._retries = {}
+
+    def output_for(self, image_path: str) -> str:
+        folder = os.path.basename(os.path.dirname(os.path.abspath(image_path)))
+        base = os.path.splitext(os.path.basename(image_path))[0]
+        return os.path.join(self.output_directory, f"{folder}_{base}.json")
+
+    # One pass over the input folders; queues files that have settled and still need processing
+    def scan(self):
+        now = time.monotonic()
+        seen = set()
+        for directory in self.directories:
+            try:
+                names = os.listdir(directory)
+            except OSError as e:
+                print(f"Cannot read {directory}: {e}")
+                continue
+            for name in names:
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                seen.add(path)
+                signature = (stat.st_size, stat.st_mtime)
+                with self._lock:
+                    if signature in (self._queued.get(path), self._handled.get(path)):
+                        continue
+                    retry = self._retries.get(path)
+                if retry is not None and retry[0] == signature:
+                    if now >= retry[2]:
+                        self.job_store.requeue_failed([path])
+                        self._submit(path, signature, now)
+                    continue
+                previous = self._pending.get(path)
+                if previous is None or previous[:2] != signature:
+                    self._pending[path] = (*signature, now)
+                elif stat.st_size > 0 and now - previous[2] >= self.settle_seconds:
+                    del self._pending[path]
+                    self._submit(path, signature, now)
+
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+        with self._lock:
+            for known in (self._handled, self._retries):
+                for path in list(known):
+                    if path not in seen:
+                        del known[path]
+
+    def _submit(self, path: str, signature: tuple, detected: float):
+        self.job_store.add([path])
+        todo = bool(self.job_store.todo([path]))
+        with self._lock:
+            if todo:
+                self._queued[path] = signature
+            else:
+                self._handled[path] = signature
+        if todo:
+            self.queue.put((path, signature, detected))
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            path, signature, detected = item
+            with self._lock:
+                self.in_progress += 1
+            output_filename = self.output_for(path)
+            self.job_store.start(path)
+            start = time.monotonic()
+            error = None
+            with recording_outputs() as written:
+                try:
+                    if self.extract_fn(path, output_filename) is None:
+                        error = "Extraction returned no data, see the log above"
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            finished = time.monotonic()
+            outputs = (written or [output_filename]) + [output_filename.replace(".json", ".dxf")]
+            self.job_store.finish(path, outputs, error, finished - start)
+            with self._lock:
+                # The file may have been queued again with a new signature while this worker had it
+                if self._queued.get(path) == signature:
+                    del self._queued[path]
+                retry = self._retries.pop(path, None)
+                if error is None:
+                    self._handled[path] = signature
+                else:
+                    attempts = retry[1] + 1 if retry is not None and retry[0] == signature else 1
+                    if attempts < self.max_attempts:
+                        delay = self.retry_after * 2 ** (attempts - 1)
+                        self._retries[path] = (signature, attempts, finished + delay)
+                        error += f" (attempt {attempts}/{self.max_attempts}, retrying in {delay:.0f}s)"
+                    else:
+                        self._handled[path] = signature
+                        error += f" (attempt {attempts}/{self.max_attempts}, giving up until the file changes)"
+                self.in_progress -= 1
+                self.processed += 1
+                self.failed += error is not None
+                self.processing_sum += finished - start
+                # Latency counts from the moment the file had settled in the folder
+                self.latency_sum += finished - detected
+            print(f"{path}: {'ok' if error is None else 'FAILED (' + error + ')'} in {finished - start:.2f}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.processed
+            return {
+                "queue_depth": self.queue.qsize(),
+                "in_progress": self.in_progress,
+                "waiting_retry": len(self._retries),
+                "processed": done,
+                "failed": self.failed,
+                "mean_latency": self.latency_sum / done if done else 0.0,
+                "mean_processing": self.processing_sum / done if done else 0.0,
+            }
+
+    def write_metrics(self):
+        stats = self.stats()
+        lines = [
+            "# HELP autolab_watch_queue_depth Drawings waiting for a worker",
+            "# TYPE autolab_watch_queue_depth gauge",
+            f"autolab_watch_queue_depth {stats['queue_depth']}",
+            "# HELP autolab_watch_in_progress Drawings being processed",
+            "# TYPE autolab_watch_in_progress gauge",
+            f"autolab_watch_in_progress {stats['in_progress']}",
+            "# HELP autolab_watch_waiting_retry Failed drawings that will be tried again",
+            "# TYPE autolab_watch_waiting_retry gauge",
+            f"autolab_watch_waiting_retry {stats['waiting_retry']}",
+            "# HELP autolab_watch_processed_total Drawings processed, by result",
+            "# TYPE autolab_watch_processed_total counter",
+            f'autolab_watch_processed_total{{status="ok"}} {stats["processed"] - stats["failed"]}',
+            f'autolab_watch_processed_total{{status="error"}} {stats["failed"]}',
+            "# HELP autolab_watch_latency_seconds Time from a drawing settling in the folder until its DXF is written",
+            "# TYPE autolab_watch_latency_seconds summary",
+            f"autolab_watch_latency_seconds_sum {self.latency_sum:.6f}",
+            f"autolab_watch_latency_seconds_count {stats['processed']}",
+        ]
+        tmp_path = self.metrics_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.metrics_path)
+
+    def start(self):
+        os.makedirs(self.output_directory, exist_ok=True)
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # Asks run() to return; it lets the workers finish what is queued first
+    def stop(self):
+        self._stop.set()
+
+    def _shutdown(self):
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.write_metrics()
+
+    def run(self):
+        self.start()
+        print(f"Watching {', '.join(self.directories)} with {self.workers} workers, output in {self.output_directory}")
+        last_report = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                self.scan()
+                self.write_metrics()
+                if time.monotonic() - last_report >= self.report_interval:
+                    print(f"Watch status: {self.stats()}")
+                    last_report = time.monotonic()
+                self._stop.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            print("Stopping, waiting for queued drawings to finish")
+        self._shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch folders and convert new drawings to JSON and DXF")
+    parser.add_argument("directories", nargs="+")
+    parser.add_argument("--output", default="watch_output")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between folder scans")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged")
+    parser.add_argument("--jobs", default=WATCH_DB, help="job store database")
+    parser.add_argument("--retry-after", type=float, default=DEFAULT_RETRY_AFTER,
+                        help="seconds before a failed drawing is tried again (doubles on every failure)")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="attempts per drawing before it is left alone until the file changes")
+    args = parser.parse_args()
+
+    WatchFolder(args.directories, args.output, workers=args.workers, poll_interval=args.poll,
+                settle_seconds=args.settle, job_store=JobStore(args.jobs), retry_after=args.retry_after,
+                max_attempts=args.max_attempts).run()